@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+bench_relatorio.py
+
+Mede o tempo e o pico de memória da leitura (le_planilha) e da normalização (normaliza)
+usadas por mm._relatorio, com planilhas sintéticas de 1k, 10k e 100k linhas.
+
+Uso:
+  python -m benchmarks.bench_relatorio                     # compara com a baseline
+  python -m benchmarks.bench_relatorio --salvar-baseline   # grava a baseline atual
+  python -m benchmarks.bench_relatorio --tamanhos 1000 10000 --tolerancia 0.2
+
+Sai com código 1 se alguma medida piorar além da tolerância.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from core.relatorio import le_planilha, normaliza
+from benchmarks.planilha_sintetica import gera_planilha
+
+try:
+    import psutil  # opcional: memória residente (RSS) do processo
+except Exception:
+    psutil = None
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(PASTA, "baseline_relatorio.json")
+TAMANHOS = [1000, 10000, 100000]
+
+
+# Memória residente atual do processo, em MB (None se psutil não estiver instalado)
+def _rss_mb():
+    if psutil is None:
+        return None
+    return psutil.Process(os.getpid()).memory_info().rss / 2 ** 20
+
+
+# Executa uma etapa medindo tempo, pico do tracemalloc e variação de RSS
+def _mede(funcao, *args):
+    gc.collect()
+    rss_antes = _rss_mb()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_depois = _rss_mb()
+    medida = {"segundos": round(segundos, 4), "pico_mb": round(pico / 2 ** 20, 2)}
+    if rss_antes is not None:
+        medida["rss_mb"] = round(rss_depois - rss_antes, 2)
+    return resultado, medida
+
+
+# Gera (ou reaproveita) a planilha sintética e mede leitura e normalização
+def mede_tamanho(linhas, pasta_cache):
+    """
+    Args:
+        linhas: quantidade de linhas da planilha sintética.
+        pasta_cache: pasta onde as planilhas geradas são guardadas entre execuções.
+
+    Returns:
+        dict com as medidas de 'leitura' e 'normalizacao'.
+    """
+    arquivo = os.path.join(pasta_cache, "hospedagem_{}.xlsx".format(linhas))
+    if not os.path.exists(arquivo):
+        print("Gerando planilha sintética com {} linhas...".format(linhas))
+        gera_planilha(arquivo, linhas)
+    data, leitura = _mede(le_planilha, arquivo)
+    _, normalizacao = _mede(normaliza, data)
+    return {"leitura": leitura, "normalizacao": normalizacao}
+
+
+# Compara as medidas atuais com a baseline e devolve a lista de regressões encontradas
+def compara(atual, baseline, tolerancia):
+    """
+    Args:
+        atual: resultado de mede_tamanho por tamanho.
+        baseline: o mesmo formato, lido de BASELINE.
+        tolerancia: piora relativa aceita (0.25 = 25%).
+
+    Returns:
+        Lista de mensagens, uma por medida que piorou além da tolerância.
+    """
+    regressoes = []
+    for tamanho, etapas in atual.items():
+        for etapa, medidas in etapas.items():
+            referencia = baseline.get(tamanho, {}).get(etapa, {})
+            for chave in ("segundos", "pico_mb"):
+                antes = referencia.get(chave)
+                agora = medidas.get(chave)
+                if not antes or agora is None:
+                    continue
+                variacao = (agora - antes) / antes
+                if variacao > tolerancia:
+                    regressoes.append("{} linhas / {} / {}: {} -> {} (+{:.0%})".format(
+                        tamanho, etapa, chave, antes, agora, variacao))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de leitura e normalização do _relatorio")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS)
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--salvar-baseline", action="store_true")
+    parser.add_argument("--cache", default=os.path.join(tempfile.gettempdir(), "bench_relatorio"))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.cache, exist_ok=True)
+    atual = {}
+    for linhas in args.tamanhos:
+        atual[str(linhas)] = mede_tamanho(linhas, args.cache)
+        print("{:>7} linhas: {}".format(linhas, json.dumps(atual[str(linhas)], ensure_ascii=False)))
+
+    if args.salvar_baseline:
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(atual, f, indent=2, ensure_ascii=False)
+        print("Baseline gravada em: {}".format(BASELINE))
+        return 0
+
+    if not os.path.exists(BASELINE):
+        print("Nenhuma baseline encontrada. Rode com --salvar-baseline para criá-la.")
+        return 0
+
+    with open(BASELINE, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressoes = compara(atual, baseline, args.tolerancia)
+    for mensagem in regressoes:
+        print("REGRESSÃO: {}".format(mensagem))
+    if not regressoes:
+        print("Nenhuma regressão acima de {:.0%}.".format(args.tolerancia))
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
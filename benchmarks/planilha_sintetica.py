@@ -0,0 +1,101 @@
+# Gera planilhas sintéticas com o mesmo leiaute da planilha de hospedagem, para medir o _relatorio
+import datetime as dt
+import random
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+# Colunas de resultado gravadas pelos fluxos (AS ... BH), com o cabeçalho usado na planilha
+COLUNAS_RESULTADO = {
+    'AS': 'Data RC', 'AT': 'RC', 'AU': 'N° LINHA DA RC', 'AV': 'Conclusao RC',
+    'AX': 'Data PC', 'AY': 'PC', 'AZ': 'Conclusao PC', 'BA': 'Status PC',
+    'BB': 'FRS', 'BC': 'Data FRS', 'BD': 'Conclusao FRS',
+    'BF': 'GD', 'BG': 'Data GD', 'BH': 'Conclusao GD',
+}
+
+# Colunas de entrada, a partir da coluna A (as demais até AR são preenchidas com texto livre)
+COLUNAS_ENTRADA = ['CNPJ_Fornecedor', 'Fornecedor', 'Nota fiscal', 'Data Emissao', 'Matricula',
+                   'Passageiro', 'Data In', 'Data Out', 'Requisicao de Viagem', 'Reserva de Recurso',
+                   'Centro de Custo', 'DOMICILIO', 'Liquido a Pagar', 'SST']
+
+
+# Monta o cabeçalho completo, de A até BH
+def cabecalho():
+    """
+    Returns:
+        Lista com o nome de cada coluna da planilha sintética, de A até BH.
+    """
+    ultima = column_index_from_string('BH')
+    nomes = []
+    for indice in range(1, ultima + 1):
+        letra = get_column_letter(indice)
+        if letra in COLUNAS_RESULTADO:
+            nomes.append(COLUNAS_RESULTADO[letra])
+        elif indice <= len(COLUNAS_ENTRADA):
+            nomes.append(COLUNAS_ENTRADA[indice - 1])
+        else:
+            nomes.append('Obs {}'.format(letra))
+    return nomes
+
+
+# Sorteia um centro de custo (K), uma ordem/operação (N) ou um elemento PEP (P)
+def _centro_de_custo(aleatorio):
+    tipo = aleatorio.random()
+    if tipo < 0.6:
+        return str(aleatorio.randint(1000000, 9999999))
+    if tipo < 0.85:
+        return '1{:09d}{:04d}'.format(aleatorio.randint(0, 999999999), aleatorio.randint(10, 9999))
+    return 'P.{:05d}.{:02d}.{:02d}'.format(aleatorio.randint(0, 99999), aleatorio.randint(1, 99), aleatorio.randint(1, 99))
+
+
+# Gera uma linha de dados compatível com o cabeçalho
+def _linha(aleatorio, numero, nomes):
+    emissao = dt.datetime(2024, 1, 1) + dt.timedelta(days=aleatorio.randint(0, 600))
+    entrada = emissao - dt.timedelta(days=aleatorio.randint(1, 10))
+    valores = {
+        'CNPJ_Fornecedor': '{:014d}'.format(aleatorio.randint(10 ** 12, 10 ** 14 - 1)),
+        'Fornecedor': 'HOTEL {:05d} LTDA'.format(aleatorio.randint(0, 99999)),
+        'Nota fiscal': str(100000 + numero),
+        'Data Emissao': emissao,
+        'Matricula': '{:03d}.{:03d}-{}'.format(aleatorio.randint(0, 999), aleatorio.randint(0, 999), aleatorio.randint(0, 9)),
+        'Passageiro': 'PASSAGEIRO {}'.format(numero),
+        'Data In': entrada,
+        'Data Out': entrada + dt.timedelta(days=aleatorio.randint(1, 7)),
+        'Requisicao de Viagem': str(aleatorio.randint(10 ** 7, 10 ** 8 - 1)),
+        'Reserva de Recurso': str(aleatorio.randint(10 ** 9, 10 ** 10 - 1)) if aleatorio.random() < 0.3 else None,
+        'Centro de Custo': _centro_de_custo(aleatorio),
+        'DOMICILIO': 'RJ {:07d}'.format(aleatorio.randint(0, 9999999)),
+        'Liquido a Pagar': round(aleatorio.uniform(150, 9000), 2),
+        'SST': str(aleatorio.randint(1, 9)),
+    }
+    return [valores.get(nome) for nome in nomes]
+
+
+# Grava a planilha sintética em modo write_only (rápido e com pouca memória, mesmo com 100 mil linhas)
+def gera_planilha(caminho, linhas, semente=2024):
+    """
+    Gera uma planilha sintética no leiaute da planilha de hospedagem.
+
+    Args:
+        caminho: arquivo .xlsx de destino.
+        linhas: quantidade de linhas de dados.
+        semente: semente do gerador aleatório, para que o arquivo seja reproduzível.
+
+    Returns:
+        O caminho do arquivo gerado.
+    """
+    aleatorio = random.Random(semente)
+    nomes = cabecalho()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(nomes)
+    for numero in range(linhas):
+        ws.append(_linha(aleatorio, numero, nomes))
+    wb.save(caminho)
+    return caminho
+
+
+if __name__ == "__main__":
+    import sys
+    destino = sys.argv[1] if len(sys.argv) > 1 else 'planilha_sintetica.xlsx'
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print(gera_planilha(destino, quantidade))
@@ -0,0 +1,139 @@
+# Anexos dos pedidos (GOS) enviados por uma thread própria, em outra sessão SAP, enquanto os pedidos seguem sendo criados
+import logging
+import queue
+import threading
+import time
+
+import pythoncom
+
+from .sessoes import MAXIMO_SESSOES, abre_sessoes, localiza_sessao, fecha_sessao
+
+
+# Abre o pedido na ME23N e anexa o arquivo pelo menu de serviços do objeto (GOS)
+def anexa_nf_pedido(session, pedido, pasta, nome_arquivo):
+    """
+    Args:
+        session: a sessão SAP usada para o anexo.
+        pedido: número do pedido.
+        pasta: pasta do arquivo.
+        nome_arquivo: nome do arquivo (ex.: "NF 123.pdf").
+    """
+    session.findById("wnd[0]/tbar[0]/okcd").text = "/NME23N"
+    session.findById("wnd[0]").sendVKey(0)
+    # Outro pedido: garante que é este pedido, e não o último exibido, que recebe o anexo
+    session.findById("wnd[0]/tbar[1]/btn[17]").press()
+    session.findById("wnd[1]/usr/subSUB0:SAPLMEGUI:0003/ctxtMEPO_SELECT-EBELN").text = str(pedido)
+    session.findById("wnd[1]").sendVKey(0)
+    session.findById("wnd[0]/titl/shellcont/shell").pressContextButton("%GOS_TOOLBOX")
+    session.findById("wnd[0]/titl/shellcont/shell").selectContextMenuItem("%GOS_PCATTA_CREA")
+    session.findById("wnd[1]/usr/ctxtDY_PATH").text = pasta
+    session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = nome_arquivo
+    session.findById("wnd[1]/usr/ctxtDY_FILENAME").caretPosition = 9
+    session.findById("wnd[1]/tbar[0]/btn[0]").press()
+
+
+# Fila de anexos processada em outra sessão do mesmo usuário, com novas tentativas e relatório final
+class TrabalhadorAnexos:
+    """
+    A thread do fluxo abre uma sessão nova na mesma conexão e só enfileira (pedido, arquivo); a thread
+    de anexos inicializa o COM, localiza essa sessão pelo número e envia os arquivos.
+
+    Args:
+        sessao_principal: a sessão do fluxo (usada só para identificar a conexão e abrir a nova sessão).
+        pasta: pasta dos arquivos a anexar.
+        metricas: registro de métricas (opcional).
+        tentativas: quantas vezes cada anexo é tentado antes de ir para o relatório de pendências.
+        espera: segundos entre as tentativas (dobra a cada falha).
+    """
+
+    def __init__(self, sessao_principal, pasta, metricas=None, tentativas=3, espera=2):
+        self.pasta = pasta
+        self.metricas = metricas
+        self.tentativas = tentativas
+        self.espera = espera
+        self.pendentes = []
+        self.anexados = 0
+        self._fila = queue.Queue()
+        info = sessao_principal.Info
+        self._usuario = info.User
+        self._sistema = info.SystemName
+        # Abre a sessão extra a partir da thread do fluxo, dona da sessão principal, e guarda o número dela
+        # (o que não existia antes do createSession): a thread de anexos nunca usa uma sessão aberta pelo usuário
+        novas = abre_sessoes(sessao_principal, 1)
+        if not novas:
+            raise RuntimeError(f"nenhuma sessão extra disponível (limite de {MAXIMO_SESSOES} por conexão?)")
+        self._numero = novas[0]
+        self._thread = threading.Thread(target=self._laco, name="anexos-gos", daemon=True)
+        self._thread.start()
+
+    def enfileira(self, pedido, nome_arquivo):
+        self._fila.put((pedido, nome_arquivo))
+        self._publica()
+
+    # Aguarda o envio de tudo o que foi enfileirado e devolve o que não pôde ser anexado
+    def finaliza(self):
+        """
+        Returns:
+            Lista de (pedido, arquivo) que ficaram sem anexo.
+        """
+        self._fila.put(None)
+        self._thread.join()
+        print(f"Anexos dos pedidos: {self.anexados} enviado(s), {len(self.pendentes)} pendente(s).")
+        for pedido, nome_arquivo in self.pendentes:
+            print(f"AVISO: Pedido {pedido} ficou sem o anexo '{nome_arquivo}'.")
+        return self.pendentes
+
+    def _laco(self):
+        pythoncom.CoInitialize()
+        session = None
+        try:
+            try:
+                session = localiza_sessao(self._usuario, self._sistema, self._numero)
+            except Exception as e:
+                logging.error(f"Anexos: não foi possível obter uma sessão SAP própria: {e}")
+                session = None
+            while True:
+                item = self._fila.get()
+                if item is None:
+                    break
+                if session is None or not self._envia(session, *item):
+                    self.pendentes.append(item)
+                self._publica()
+        finally:
+            # Fecha a sessão de anexos para não acumular sessões a cada execução
+            if session is not None:
+                fecha_sessao(session)
+            pythoncom.CoUninitialize()
+
+    def _envia(self, session, pedido, nome_arquivo):
+        espera = self.espera
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                anexa_nf_pedido(session, pedido, self.pasta, nome_arquivo)
+                self.anexados += 1
+                self._conta("ok")
+                return True
+            except Exception as e:
+                logging.warning(f"Anexo '{nome_arquivo}' no pedido {pedido}: tentativa {tentativa} falhou: {e}")
+                self._conta("nova_tentativa")
+                # Fecha diálogos que tenham ficado abertos antes de tentar de novo
+                try:
+                    if session.Children.Count > 1:
+                        session.findById("wnd[1]").close()
+                    session.findById("wnd[0]/tbar[0]/okcd").text = "/N"
+                    session.findById("wnd[0]").sendVKey(0)
+                except Exception:
+                    pass
+                if tentativa < self.tentativas:
+                    time.sleep(espera)
+                    espera *= 2
+        self._conta("falha")
+        return False
+
+    def _conta(self, resultado):
+        if self.metricas is not None:
+            self.metricas.incrementa("anexos_total", resultado=resultado)
+
+    def _publica(self):
+        if self.metricas is not None:
+            self.metricas.define("fila_anexos", self._fila.qsize())
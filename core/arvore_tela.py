@@ -0,0 +1,176 @@
+# Foto da árvore de controles de uma janela do SAP GUI em uma única chamada (GuiSession.GetObjectTree):
+# existência de elementos, leiaute e textos (barra de status, popups) lidos da foto, sem um findById por controle
+import json
+
+# Propriedades pedidas para cada controle (as que não se aplicam a um tipo de controle vêm vazias)
+PROPRIEDADES = ("Id", "Type", "Text", "MessageType")
+
+
+# O SAP GUI não oferece GetObjectTree (versões anteriores à 7.70) ou a chamada falhou
+class ArvoreIndisponivel(Exception):
+    pass
+
+
+# "/app/con[0]/ses[0]/wnd[0]/usr/txtX" -> "wnd[0]/usr/txtX" (a forma usada nos findById dos fluxos)
+def id_relativo(id_elemento):
+    id_elemento = str(id_elemento)
+    posicao = id_elemento.find("wnd[")
+    return id_elemento[posicao:] if posicao >= 0 else id_elemento
+
+
+# Percorre o JSON do GetObjectTree ({"properties": {...}, "children": [...]}) acumulando os controles
+def _percorre(no, elementos):
+    if isinstance(no, list):
+        for filho in no:
+            _percorre(filho, elementos)
+        return
+    if not isinstance(no, dict):
+        return
+    propriedades = no.get("properties") or {}
+    if propriedades.get("Id"):
+        elementos[id_relativo(propriedades["Id"])] = propriedades
+    _percorre(no.get("children") or [], elementos)
+
+
+# Controles de uma janela (ou da sessão inteira) lidos de uma vez
+class FotoTela:
+    """
+    A foto vale para a tela em que foi tirada: depois de um press(), sendVKey() ou troca de aba,
+    tire outra. Os IDs são os relativos à sessão (ex.: "wnd[0]/sbar").
+
+    Args:
+        elementos: dict {id relativo: {propriedade: valor}}.
+    """
+
+    def __init__(self, elementos):
+        self.elementos = elementos
+
+    def existe(self, id_elemento):
+        return id_elemento in self.elementos
+
+    def propriedade(self, id_elemento, nome, padrao=""):
+        valor = self.elementos.get(id_elemento, {}).get(nome)
+        return padrao if valor is None else valor
+
+    def texto(self, id_elemento):
+        return str(self.propriedade(id_elemento, "Text"))
+
+    # O primeiro dos IDs presente na tela (ex.: as variantes de leiaute do ME21N); None se nenhum estiver
+    def primeiro(self, *ids):
+        return next((id_elemento for id_elemento in ids if self.existe(id_elemento)), None)
+
+    # Objeto COM do controle (a foto só tem as propriedades: um findById)
+    def obtem(self, session, id_elemento):
+        return session.findById(id_elemento)
+
+    # IDs dos filhos diretos de um controle, na ordem da tela
+    def filhos(self, id_pai):
+        prefixo = id_pai.rstrip("/") + "/"
+        return [id_elemento for id_elemento in self.elementos
+                if id_elemento.startswith(prefixo) and "/" not in id_elemento[len(prefixo):]]
+
+    # IDs das janelas abertas (wnd[0], wnd[1], ...)
+    def janelas(self):
+        return [id_elemento for id_elemento in self.elementos if "/" not in id_elemento and id_elemento.startswith("wnd[")]
+
+
+# Mesma interface da FotoTela, respondida com uma chamada por controle (SAP GUI sem GetObjectTree)
+class FotoPorChamada:
+    """
+    Cada controle consultado é lido uma vez (findById sem exceção quando o controle não existe) e
+    guardado, de modo que consultas repetidas à mesma foto não voltam ao SAP.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._lidos = {}
+
+    def _elemento(self, id_elemento):
+        if id_elemento not in self._lidos:
+            try:
+                self._lidos[id_elemento] = self.session.findById(id_elemento, False)
+            except Exception:
+                self._lidos[id_elemento] = None
+        return self._lidos[id_elemento]
+
+    def existe(self, id_elemento):
+        return self._elemento(id_elemento) is not None
+
+    def propriedade(self, id_elemento, nome, padrao=""):
+        elemento = self._elemento(id_elemento)
+        if elemento is None:
+            return padrao
+        try:
+            valor = getattr(elemento, nome)
+        except Exception:
+            return padrao
+        return padrao if valor is None else valor
+
+    def texto(self, id_elemento):
+        return str(self.propriedade(id_elemento, "Text"))
+
+    def primeiro(self, *ids):
+        return next((id_elemento for id_elemento in ids if self.existe(id_elemento)), None)
+
+    # O controle já lido na consulta de existência é reaproveitado
+    def obtem(self, session, id_elemento):
+        return self._elemento(id_elemento) or session.findById(id_elemento)
+
+    def filhos(self, id_pai):
+        elemento = self._elemento(id_pai)
+        if elemento is None:
+            return []
+        try:
+            return [id_relativo(elemento.Children(k).Id) for k in range(elemento.Children.Count)]
+        except Exception:
+            return []
+
+    def janelas(self):
+        try:
+            return [f"wnd[{k}]" for k in range(self.session.Children.Count)]
+        except Exception:
+            return []
+
+
+# Lê a árvore de controles com uma chamada ao SAP
+def foto_arvore(session, raiz=None, propriedades=PROPRIEDADES):
+    """
+    Args:
+        session: a sessão SAP (ou a SessaoMedida que a envolve).
+        raiz: ID do controle de partida, relativo à sessão como nos findById (ex.: "wnd[0]", "wnd[0]/sbar");
+              None = a sessão inteira (uma chamada a mais, para ler o ID da sessão).
+        propriedades: propriedades lidas de cada controle.
+
+    Returns:
+        FotoTela com a raiz e todos os controles abaixo dela.
+
+    Raises:
+        ArvoreIndisponivel: o SAP GUI não oferece GetObjectTree ou a resposta não traz a raiz.
+    """
+    try:
+        conteudo = session.GetObjectTree(str(session.Id) if raiz is None else raiz, list(propriedades))
+        elementos = {}
+        _percorre(json.loads(conteudo), elementos)
+    except Exception as e:
+        raise ArvoreIndisponivel(str(e)) from e
+    # Sem a raiz na resposta, a foto diria que nenhum controle existe
+    if not elementos or (raiz is not None and raiz not in elementos):
+        raise ArvoreIndisponivel(f"'{raiz or 'sessão'}' ausente na árvore devolvida")
+    return FotoTela(elementos)
+
+
+# Foto da tela: uma chamada se o SAP GUI tiver GetObjectTree; senão, uma chamada por controle consultado
+def fotografa(session, raiz=None, arvore=True):
+    """
+    Args:
+        arvore: False usa direto a FotoPorChamada (ex.: GetObjectTree já falhou nesta execução).
+
+    Returns:
+        (foto, True se veio do GetObjectTree).
+    """
+    if arvore:
+        try:
+            return foto_arvore(session, raiz), True
+        except ArvoreIndisponivel:
+            pass
+    return FotoPorChamada(session), False
@@ -0,0 +1,656 @@
+# Backends de execução: como cada documento chega ao SAP. O mm percorre a planilha, monta os documentos
+# (core/documentos.py) e grava os resultados; o backend só executa as operações abaixo
+import itertools
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from .exportacao import area_de_transferencia
+from .documentos import CONTA_RESERVA
+from .anexos import anexa_nf_pedido
+
+# Coluna da grade da MLGDC com o número do protocolo
+COLUNA_PROTOCOLO = "PROTC"
+
+# Primeiro número devolvido pelo backend de gravação (fora das faixas reais de RC, pedido, FRS e protocolo)
+NUMERO_SIMULADO = 9900000000
+
+
+# Interface dos backends: uma operação por documento, sempre na sessão informada pelo mm
+class Backend(ABC):
+    """
+    Operações:
+      - requisição: inicia_requisicao(), adiciona_item_rc() por linha e grava_requisicao() ao final;
+      - pedido: cria_pedido() por linha e anexa_nf_pedido() após a gravação;
+      - FRS: lanca_frs() por linha;
+      - protocolo: cria_protocolo() por linha e anexa_frs_protocolos() ao final;
+      - encerra(): sai da transação ao final do fluxo.
+
+    simulado = True indica que nada chega ao SAP: o mm dispensa a sessão e não grava a planilha.
+    As operações são abstratas: um backend sem alguma delas falha ao ser criado, não no meio de um lote.
+    """
+
+    nome = ""
+    simulado = False
+
+    # Backend equivalente para outra instância do mm (ex.: as sessões extras de lotes e contas)
+    def copia(self, automacao):
+        return self
+
+    @abstractmethod
+    def inicia_requisicao(self, session):
+        pass
+
+    @abstractmethod
+    def adiciona_item_rc(self, session, item):
+        pass
+
+    @abstractmethod
+    def grava_requisicao(self, session):
+        """
+        Returns:
+            O número da requisição.
+        """
+
+    @abstractmethod
+    def cria_pedido(self, session, pedido):
+        """
+        Returns:
+            (número do pedido, status) ou None se o pedido não pôde ser iniciado (a linha é pulada).
+        """
+
+    @abstractmethod
+    def anexa_nf_pedido(self, session, numero, pasta, nome_arquivo):
+        pass
+
+    @abstractmethod
+    def lanca_frs(self, session, folha):
+        """
+        Returns:
+            O número da folha de registro de serviço.
+        """
+
+    @abstractmethod
+    def cria_protocolo(self, session, protocolo, pasta_nf):
+        """
+        Returns:
+            O número do protocolo.
+        """
+
+    @abstractmethod
+    def anexa_frs_protocolos(self, session, pendentes, pasta_frs):
+        """
+        Args:
+            pendentes: dict {número do protocolo: nota fiscal}; os protocolos anexados são removidos dele.
+        """
+
+    def encerra(self, session):
+        pass
+
+
+# Pedido: número e status no texto da barra de status após a gravação
+def _numero_pedido(barra):
+    texto = barra.split()
+    return int(texto[8]), texto[4]
+
+
+# SAP GUI Scripting: as telas gravadas no SAPScripting, na sessão do mm (navegador, modo rápido e leiaute dinâmico)
+class BackendGui(Backend):
+    nome = "gui"
+
+    def __init__(self, automacao):
+        self.automacao = automacao
+        self._grade_rc = None
+
+    def copia(self, automacao):
+        return BackendGui(automacao)
+
+    # ----------------------- Requisição (ME51N) -----------------------
+    def inicia_requisicao(self, session):
+        self.automacao._inicia_transacao(session, "ME51n")
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON").press()
+        # A grade é usada em todos os itens: fica retida até o fim do fluxo
+        self._grade_rc = self.automacao.proxies.retem(session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell"))
+
+    # Preenche um item na grade da RC (a linha da grade é o número do item - 1)
+    def adiciona_item_rc(self, session, item):
+        id = item["BNFPO"]
+        codcusto = self._grade_rc
+        if id == 1:
+            # Preenche dados no SAP, se for K (Centro de Custo)
+            if item["KNTTP"] == "K":
+
+                codcusto.modifyCell(id-1,"BNFPO",id)
+                codcusto.modifyCell(id-1,"KNTTP",item["KNTTP"])
+                codcusto.modifyCell(id-1,"EKGRP",item["EKGRP"])
+                codcusto.modifyCell(id-1,"TXZ01",item["TXZ01"])
+                codcusto.modifyCell(id-1,"BEDNR",item["BEDNR"])
+                codcusto.modifyCell(id-1,"WGBEZ",item["WGBEZ"])
+                codcusto.modifyCell(id-1,"EPSTP",item["EPSTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").currentCellColumn = "EPSTP"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
+                time.sleep(1)
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = item["KTEXT1"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = item["MENGE"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = item["MEINS"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = item["TBTWR"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
+                session.findById("wnd[0]").sendVKey(0)
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").text = item["KOSTL"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").caretPosition = 7
+                session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = item["ZZTPCOD_TLC"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
+                session.findById("wnd[0]").sendVKey(0)
+
+            # Preenche dados do item, se for N (Ordem e Operação)
+            elif item["KNTTP"] == "N":
+
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BNFPO", id)
+                codcusto.modifyCell(id-1,"KNTTP",item["KNTTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EKGRP",item["EKGRP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"TXZ01",item["TXZ01"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BEDNR", item["BEDNR"])
+                codcusto.modifyCell(id-1,"WGBEZ",item["WGBEZ"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EPSTP",item["EPSTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").currentCellColumn = "EPSTP"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
+                time.sleep(1)
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = item["KTEXT1"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = item["MENGE"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = item["MEINS"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = item["TBTWR"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
+                session.findById("wnd[0]").sendVKey(0)
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-NPLNR").text = item["NPLNR"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").text = item["VORNR"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").setFocus()
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").caretPosition = 2
+                session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = item["ZZTPCOD_TLC"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
+                session.findById("wnd[0]").sendVKey(0)
+
+            # Preenche dados do item, se for P (Projeto)
+            else:
+
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BNFPO", id)
+                codcusto.modifyCell(id-1,"KNTTP",item["KNTTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EKGRP",item["EKGRP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"TXZ01", item["TXZ01"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BEDNR", item["BEDNR"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"WGBEZ",item["WGBEZ"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EPSTP",item["EPSTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").currentCellColumn = "EPSTP"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
+                time.sleep(1)
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = item["KTEXT1"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = item["MENGE"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = item["MEINS"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = item["TBTWR"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
+                session.findById("wnd[0]").sendVKey(0)
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").text = item["PS_POSID"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").setFocus()
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").caretPosition = 0
+                session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = item["ZZTPCOD_TLC"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
+                session.findById("wnd[0]").sendVKey(0)
+
+        # Percorre a lista, a partir do segundo item da requisição
+        else:
+
+            codcust1 = session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell")
+
+            # Preenche dados no SAP, se for K (Centro de Custo)
+            if item["KNTTP"] == "K":
+
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BNFPO",id)
+                codcust1.modifyCell(id-1,"KNTTP",item["KNTTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EKGRP",item["EKGRP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"TXZ01",item["TXZ01"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BEDNR", item["BEDNR"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EPSTP",item["EPSTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").setCurrentCell(id-1,"EPSTP")
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
+                time.sleep(1)
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = item["KTEXT1"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = item["MENGE"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = item["MEINS"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = item["TBTWR"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
+                session.findById("wnd[0]").sendVKey(0)
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").text = item["KOSTL"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").caretPosition = 7
+                session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = item["ZZTPCOD_TLC"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
+                session.findById("wnd[0]").sendVKey(0)
+
+            # Preenche dados do item, se for N (Ordem e Operação)
+            elif item["KNTTP"] == "N":
+
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BNFPO",id)
+                codcust1.modifyCell(id-1,"KNTTP",item["KNTTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EKGRP",item["EKGRP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"TXZ01",item["TXZ01"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BEDNR", item["BEDNR"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EPSTP",item["EPSTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").setCurrentCell(id-1,"EPSTP")
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
+                time.sleep(1)
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = item["KTEXT1"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = item["MENGE"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = item["MEINS"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = item["TBTWR"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
+                session.findById("wnd[0]").sendVKey(0)
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-NPLNR").text = item["NPLNR"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").text = item["VORNR"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").setFocus()
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").caretPosition = 4
+                session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = item["ZZTPCOD_TLC"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
+                session.findById("wnd[0]").sendVKey(0)
+
+            # Preenche dados do item, se for P (Projeto)
+            else:
+
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BNFPO",id)
+                codcust1.modifyCell(id-1,"KNTTP",item["KNTTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EKGRP",item["EKGRP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"TXZ01",item["TXZ01"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"BEDNR",item["BEDNR"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(id-1,"EPSTP",item["EPSTP"])
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").setCurrentCell(id-1,"EPSTP")
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
+                time.sleep(1)
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = item["KTEXT1"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = item["MENGE"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = item["MEINS"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = item["TBTWR"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
+                session.findById("wnd[0]").sendVKey(0)
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").text = item["PS_POSID"]
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").setFocus()
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").caretPosition = 24
+                session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = item["ZZTPCOD_TLC"]
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
+                session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
+                session.findById("wnd[0]").sendVKey(0)
+
+    def grava_requisicao(self, session):
+        session.findById("wnd[0]/tbar[0]/btn[11]").press()
+        poCode = self.automacao.texto_barra(session)
+        poCode = poCode.split()
+        poCode = poCode[6]
+        return int(poCode)
+
+    # ----------------------- Pedido (ME21N) -----------------------
+    def cria_pedido(self, session, pedido):
+        # Abre a ME21N apenas se a sessão não estiver na tela de pedido novo (após gravar o anterior)
+        def _abre_me21n():
+            self.automacao._maximiza(session)
+            session.findById("wnd[0]/tbar[0]/okcd").text = "/NME21N"
+            session.findById("wnd[0]").sendVKey(0)
+        self.automacao.navegador.vai_para(session, "ME21N", _abre_me21n, "pedido")
+        # IDs possíveis para o superfield
+        id_superfield_13 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-SUPERFIELD"
+        id_superfield_16 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-SUPERFIELD"
+
+
+        # Encontra o elemento UMA VEZ do leiaute dinâmico
+        campo_superfield = self.automacao.encontrar_elemento(id_superfield_13, id_superfield_16)
+
+        # Realiza TODAS as ações na variável
+        if campo_superfield:
+            campo_superfield.caretPosition = 0
+            campo_superfield.setFocus()
+        else:
+            logging.warning("Campo Superfield não encontrado. Pulando item.")
+            return None
+
+        if pedido["LIFNR"]:
+            # Fornecedor já localizado pelo índice: informado direto, sem a ajuda de pesquisa
+            campo_superfield.text = pedido["LIFNR"]
+            session.findById("wnd[0]").sendVKey(0)
+        else:
+            session.findById("wnd[0]").sendVKey(4)
+            session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/btnG_SELFLD_TAB-MORE[6,56]").press()
+            session.findById("wnd[2]/usr/tabsTAB_STRIP/tabpNOSV").select()
+            session.findById("wnd[2]/usr/tabsTAB_STRIP/tabpNOSV/ssubSCREEN_HEADER:SAPLALDB:3030/tblSAPLALDBSINGLE_E/ctxtRSCSEL_255-SLOW_E[1,0]").text = "X"
+            session.findById("wnd[2]/usr/tabsTAB_STRIP/tabpNOSV/ssubSCREEN_HEADER:SAPLALDB:3030/tblSAPLALDBSINGLE_E/ctxtRSCSEL_255-SLOW_E[1,0]").caretPosition = 1
+            session.findById("wnd[2]/tbar[0]/btn[8]").press()
+            session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[7,24]").text = pedido["STCD1"]
+            session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[7,24]").setFocus()
+            session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[7,24]").caretPosition = 14
+            session.findById("wnd[1]").sendVKey(0)
+            session.findById("wnd[1]").sendVKey(0)
+
+        # IDs possíveis para o campo de data
+        id_data_13 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-BEDAT"
+        id_data_16 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-BEDAT"
+
+        # Uma foto da tela identifica o leiaute para a data e para o botão (nenhum dos dois muda a tela)
+        foto = self.automacao.foto_tela(session)
+
+        # Encontra o elemento UMA VEZ
+        campo_data = self.automacao.encontrar_elemento(id_data_13, id_data_16, foto)
+
+        # Realiza TODAS as ações na variável
+        if campo_data:
+            campo_data.text = pedido["BEDAT"]
+            campo_data.setFocus()
+            campo_data.caretPosition = 2
+
+        # IDs possíveis para o botão
+        id_botao_13 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON"
+        id_botao_16 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON"
+
+        # Encontra o elemento UMA VEZ
+        botao_visao_geral = self.automacao.encontrar_elemento(id_botao_13, id_botao_16, foto)
+
+        # Realiza a ação na variável
+        if botao_visao_geral:
+            botao_visao_geral.press()
+
+        # Linhas de código extraídas do SAPScripting que navega em campos e telas do SAP
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT9/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1221/ctxtMEPO1222-EKGRP").text = pedido["EKGRP"]
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT9/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1221/ctxtMEPO1222-EKGRP").caretPosition = 3
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT1").select()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT1/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1226/ctxtMEPO1226-INCO1").text = pedido["INCO1"]
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/ctxtMEPO1211-BANFN[25,0]").text = pedido["BANFN"]
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/txtMEPO1211-BNFPO[26,0]").text = pedido["BNFPO"]
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/txtMEPO1211-BNFPO[26,0]").setFocus()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/txtMEPO1211-BNFPO[26,0]").caretPosition = 2
+        session.findById("wnd[0]").sendVKey(0)
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT7/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1317/ctxtMEPO1317-MWSKZ").text = pedido["MWSKZ"]
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT7/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1317/ctxtMEPO1317-MWSKZ").caretPosition = 2
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT6").select()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT6/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1313/txtMEPO1313-PLIFZ").text = "1"
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT6/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1313/txtMEPO1313-PLIFZ").caretPosition = 1
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5").select()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1320/tblSAPLMEGUITC_1320/ctxtMEPO1320-EEIND[2,0]").text = pedido["EEIND"]
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1320/tblSAPLMEGUITC_1320/ctxtMEPO1320-EEIND[2,0]").setFocus()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1320/tblSAPLMEGUITC_1320/ctxtMEPO1320-EEIND[2,0]").caretPosition = 10
+        session.findById("wnd[0]").sendVKey(0)
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON").press()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11").select()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMODLICIT").text = "DP1"
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMULTA").text = "0"
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZTPOBJ").text = "S"
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZBNAME").text = "SD0H"
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMULTA").setFocus()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMULTA").caretPosition = 1
+        session.findById("wnd[0]").sendVKey(0)
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/btnBT_GERFIS").press()
+        session.findById("wnd[1]/usr/btnBT_INSERT_FIS").press()
+        session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").text = "M359"
+        session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").caretPosition = 4
+        session.findById("wnd[2]/tbar[0]/btn[8]").press()
+        session.findById("wnd[1]/usr/btnBT_INSERT_FIS").press()
+        session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").text = "T3HV"
+        session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").caretPosition = 4
+        session.findById("wnd[2]/tbar[0]/btn[8]").press()
+        session.findById("wnd[1]/usr/btnBT_INSERT_FIS").press()
+        session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").text = "TFEX"
+        session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").caretPosition = 4
+        session.findById("wnd[2]/tbar[0]/btn[8]").press()
+        session.findById("wnd[1]/tbar[0]/btn[8]").press()
+        session.findById("wnd[1]/tbar[0]/btn[8]").press()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB4_0101").select()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB4_0101/ssubSUB04:SAPLXM06:9104/ctxtEKKO_CI-ZZTPCOD_TLC").text = "8.8"
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB4_0101/ssubSUB04:SAPLXM06:9104/ctxtEKKO_CI-ZZTPCOD_TLC").caretPosition = 3
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT3").select()
+        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT3/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1230/subTEXTS:SAPLMMTE:0100/subEDITOR:SAPLMMTE:0101/cntlTEXT_EDITOR_0101/shellcont/shell").text = pedido["texto"]
+
+        # Sem reserva de recursos, basta gravar; com reserva, informa o número e a linha antes de gravar
+        if pedido["KBLNR"] is None:
+            session.findById("wnd[0]/tbar[0]/btn[11]").press()
+        else:
+            session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT3/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1230/subTEXTS:SAPLMMTE:0100/subEDITOR:SAPLMMTE:0101/cntlTEXT_EDITOR_0101/shellcont/shell").setSelectionIndexes(9,9)
+            session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT1").select()
+            session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/btnACCASS").press()
+            session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KBLNR").text = pedido["KBLNR"]
+            if pedido["KBLPOS"]:
+                # Linha da reserva já localizada pelo índice: informada direto, sem a ajuda de pesquisa
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KBLPOS").text = pedido["KBLPOS"]
+            else:
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KBLPOS").setFocus()
+                session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KBLPOS").caretPosition = 0
+                session.findById("wnd[1]").sendVKey(4)
+                session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[2,24]").text = pedido["KBLNR"]
+                session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/ctxtG_SELFLD_TAB-LOW[7,24]").text = CONTA_RESERVA
+                session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/ctxtG_SELFLD_TAB-LOW[7,24]").setFocus()
+                session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/ctxtG_SELFLD_TAB-LOW[7,24]").caretPosition = 8
+                session.findById("wnd[2]").sendVKey(0)
+                session.findById("wnd[2]").sendVKey(0)
+            session.findById("wnd[1]").sendVKey(0)
+            session.findById("wnd[0]/tbar[0]/btn[11]").press()
+            session.findById("wnd[1]/usr/btnSPOP-VAROPTION1").press()
+        return _numero_pedido(self.automacao.texto_barra(session))
+
+    def anexa_nf_pedido(self, session, numero, pasta, nome_arquivo):
+        anexa_nf_pedido(session, numero, pasta, nome_arquivo)
+        # A ME23N tira a sessão da tela de pedido novo
+        self.automacao.navegador.invalida()
+
+    # ----------------------- FRS (ML81N) -----------------------
+    def lanca_frs(self, session, folha):
+        # Abre a ML81N apenas se a sessão não estiver na tela de seleção do pedido; caso esteja,
+        # basta informar o número do pedido
+        self.automacao.navegador.vai_para(session, "ML81N", lambda: self.automacao._inicia_transacao(session, "ML81N"), "frs")
+
+        # Linhas de código extraídas do SAPScripting que navega em campos e telas do SAP
+        session.findById("wnd[1]/usr/ctxtRM11R-EBELN").text = folha["EBELN"]
+        session.findById("wnd[1]/usr/ctxtRM11R-EBELN").caretPosition = 10
+        session.findById("wnd[1]").sendVKey(0)
+        session.findById("wnd[0]/tbar[1]/btn[13]").press()
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA").select()
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG").select()
+        session.findById("wnd[0]/usr/txtESSR-TXZ01").text = folha["TXZ01"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-LBLNE").text = folha["LBLNE"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/ctxtESSR-DLORT").text = folha["DLORT"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/ctxtESSR-LZVON").text = folha["LZVON"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/ctxtESSR-LZBIS").text = folha["LZBIS"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-SBNAMAN").text = folha["SBNAMAN"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA/ssubSUB_ACCEPTANCE:SAPLMLSR:0420/ctxtESSR-BLDAT").text = folha["BLDAT"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA/ssubSUB_ACCEPTANCE:SAPLMLSR:0420/txtESSR-XBLNR").text = folha["XBLNR"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA/ssubSUB_ACCEPTANCE:SAPLMLSR:0420/txtESSR-BKTXT").text = folha["BKTXT"]
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-SBNAMAN").setFocus()
+        session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-SBNAMAN").caretPosition = 6
+        session.findById("wnd[0]/usr/subSERVICE:SAPLMLSP:0400/btnSELEKTION").press()
+        session.findById("wnd[1]/tbar[0]/btn[0]").press()
+        session.findById("wnd[0]/tbar[1]/btn[9]").press()
+        session.findById("wnd[0]/tbar[0]/btn[11]").press()
+        session.findById("wnd[1]/tbar[0]/btn[9]").press()
+
+        # Grava a FRS e extrai o número gerado na barra de status
+        session.findById("wnd[1]/tbar[0]/btn[8]").press()
+        frs = self.automacao.texto_barra(session)
+        frs = frs[31:42]
+        return int(frs)
+
+    # ----------------------- Protocolo (MLGD) -----------------------
+    def cria_protocolo(self, session, protocolo, pasta_nf):
+        # Abre a MLGD apenas se a sessão não estiver na tela inicial da transação
+        self.automacao.navegador.vai_para(session, "MLGD", lambda: self.automacao._inicia_transacao(session, "MLGD"), "gd")
+
+        # Linhas de código extraídas do SAPScripting que navegam em campos e telas do SAP
+        session.findById("wnd[0]/usr/radRB_NF_SERVICO").setFocus()
+        session.findById("wnd[0]/usr/radRB_NF_SERVICO").select()
+        session.findById("wnd[0]/usr/txtV_SF_TOMA").text = protocolo["SF_TOMA"]
+        session.findById("wnd[0]/usr/txtV_NFS").text = protocolo["NFS"]
+        session.findById("wnd[0]/usr/ctxtW_PROTCAB-BLDAT").text = protocolo["BLDAT"]
+        session.findById("wnd[0]/usr/ctxtW_PROTCAB-STCD1").text = protocolo["STCD1"]
+        session.findById("wnd[0]/usr/ctxtW_PROTCAB-TXJCD").text = protocolo["TXJCD"]
+        session.findById("wnd[0]/usr/ctxtGV_FRS").text = protocolo["FRS"]
+        session.findById("wnd[0]/usr/ctxtGV_FRS").setFocus()
+        session.findById("wnd[0]/usr/ctxtGV_FRS").caretPosition = 10
+        session.findById("wnd[0]/tbar[1]/btn[8]").press()
+        session.findById("wnd[1]/usr/btnBT_SIM").press()
+        session.findById("wnd[1]/usr/radRB_LOCAL").select()
+        session.findById("wnd[1]/usr/radRB_LOCAL").setFocus()
+        session.findById("wnd[1]/usr/btnBT_OK").press()
+        session.findById("wnd[1]/usr/ctxtDY_PATH").setFocus()
+        session.findById("wnd[1]/usr/ctxtDY_PATH").caretPosition = 0
+        session.findById("wnd[1]").sendVKey(4)
+        #Localiza a pasta onde fica o documento fiscal e o anexa ao protocolo
+        session.findById("wnd[2]/usr/ctxtDY_PATH").text = pasta_nf
+        session.findById("wnd[2]/usr/ctxtDY_FILENAME").text = protocolo["arquivo_nf"]
+        session.findById("wnd[2]/usr/ctxtDY_FILENAME").caretPosition = 13
+        session.findById("wnd[2]/tbar[0]/btn[0]").press()
+        # Grava o protocolo e extrai o número gerado na barra de status
+        session.findById("wnd[1]/tbar[0]/btn[0]").press()
+        gd = self.automacao.texto_barra(session)
+        GD = gd[10:20]
+        return int(GD)
+
+    # Anexa as FRS aos protocolos com uma única execução da MLGDC (seleção múltipla de protocolos)
+    def anexa_frs_protocolos(self, session, pendentes, pasta_frs):
+        # Acessa a transação MLGDC (Consulta protocolo) e seleciona todos os protocolos da execução
+        self.automacao._inicia_transacao(session, "MLGDC")
+        self.automacao.navegador.invalida()
+        session.findById("wnd[0]/usr/ctxtSO_BUKRS-LOW").text = "01"
+        session.findById("wnd[0]/usr/btn%_SO_PROTC_%_APP_%-VALU_PUSH").press()
+        with area_de_transferencia(sorted(pendentes)):
+            session.findById("wnd[1]/tbar[0]/btn[24]").press()  # carregar da área de transferência
+        session.findById("wnd[1]/tbar[0]/btn[8]").press()
+        session.findById("wnd[0]/tbar[1]/btn[8]").press()
+
+        # Percorre a grade do resultado e anexa a FRS correspondente a cada protocolo
+        grade = session.findById("wnd[0]/usr/shell")
+        for linha in range(grade.RowCount):
+            try:
+                protocolo = int(str(grade.GetCellValue(linha, COLUNA_PROTOCOLO)).strip())
+            except ValueError:
+                continue
+            nota = pendentes.get(protocolo)
+            if nota is None:
+                continue
+            try:
+                grade.selectedRows = str(linha)
+                session.findById("wnd[0]/tbar[1]/btn[13]").press()
+                session.findById("wnd[1]/usr/radRB_LOCAL").select()
+                session.findById("wnd[1]/usr/radRB_LOCAL").setFocus()
+                session.findById("wnd[1]/usr/btnBT_OK").press()
+                session.findById("wnd[1]/usr/ctxtDY_PATH").text = pasta_frs
+                session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = "FRS {}.pdf".format(nota)
+                session.findById("wnd[1]/usr/ctxtDY_FILENAME").caretPosition = 11
+                session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                del pendentes[protocolo]
+            except Exception as e:
+                logging.error(f"Protocolo {protocolo}: falha ao anexar 'FRS {nota}.pdf': {e}")
+            # A grade é recriada após o anexo
+            grade = session.findById("wnd[0]/usr/shell")
+
+    def encerra(self, session):
+        session.findById("wnd[0]/tbar[0]/btn[15]").press()
+
+
+# Gravação (simulação): registra cada operação com o documento e a duração, sem falar com o SAP
+class BackendGravacao(Backend):
+    """
+    Para simulações (conferir o mapeamento da planilha sem criar documentos) e medições de vazão
+    do restante do fluxo: cada operação vira uma linha JSON em `arquivo` (se informado) e devolve
+    números sequenciais a partir de NUMERO_SIMULADO. Com `latencia`, cada operação espera esse
+    tempo (s), simulando o SAP. A mesma instância serve a várias sessões (thread-safe).
+
+    Args:
+        arquivo: caminho do registro JSON-lines (None = só em memória, em `operacoes`).
+        latencia: espera (s) de cada operação.
+    """
+
+    nome = "gravacao"
+    simulado = True
+
+    def __init__(self, arquivo=None, latencia=0.0):
+        self.arquivo = arquivo
+        self.latencia = latencia
+        self.operacoes = []
+        self._numeros = itertools.count(NUMERO_SIMULADO)
+        self._itens_rc = {}
+        self._trava = threading.Lock()
+
+    def _registra(self, operacao, documento=None, numero=None):
+        inicio = time.perf_counter()
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._trava:
+            if numero is None:
+                numero = next(self._numeros)
+            registro = {"operacao": operacao, "thread": threading.current_thread().name, "numero": numero,
+                        "documento": documento, "segundos": round(time.perf_counter() - inicio, 6),
+                        "momento": time.time()}
+            self.operacoes.append(registro)
+            if self.arquivo:
+                with open(self.arquivo, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        return numero
+
+    def inicia_requisicao(self, session):
+        self._itens_rc[threading.get_ident()] = []
+
+    def adiciona_item_rc(self, session, item):
+        self._itens_rc.setdefault(threading.get_ident(), []).append(item)
+        self._registra("item_rc", item, numero=item["BNFPO"])
+
+    def grava_requisicao(self, session):
+        return self._registra("requisicao", {"itens": len(self._itens_rc.pop(threading.get_ident(), []))})
+
+    def cria_pedido(self, session, pedido):
+        return self._registra("pedido", pedido), "simulado"
+
+    def anexa_nf_pedido(self, session, numero, pasta, nome_arquivo):
+        self._registra("anexo_nf", {"pedido": numero, "arquivo": nome_arquivo}, numero=numero)
+
+    def lanca_frs(self, session, folha):
+        return self._registra("frs", folha)
+
+    def cria_protocolo(self, session, protocolo, pasta_nf):
+        return self._registra("protocolo", protocolo)
+
+    def anexa_frs_protocolos(self, session, pendentes, pasta_frs):
+        for numero, nota in sorted(pendentes.items()):
+            self._registra("anexo_frs", {"protocolo": numero, "arquivo": "FRS {}.pdf".format(nota)}, numero=numero)
+        pendentes.clear()
+
+
+# Backend pelo nome (ex.: opção de linha de comando ou configuração): "gui" ou "gravacao"
+def cria_backend(nome, automacao, **opcoes):
+    if nome == BackendGui.nome:
+        return BackendGui(automacao)
+    if nome == BackendGravacao.nome:
+        return BackendGravacao(**opcoes)
+    raise ValueError(f"Backend de execução desconhecido: '{nome}' (use 'gui' ou 'gravacao').")
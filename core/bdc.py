@@ -0,0 +1,134 @@
+# Batch input (BDC) das folhas de registro de serviço: em vez do diálogo da ML81N linha a linha, um arquivo
+# com os registros BDCDATA de todas as FRS, para ser processado no servidor em uma única pasta (SM35)
+import datetime as dt
+import json
+import logging
+import os
+
+import pandas as pd
+
+from .documentos import folha_servico
+
+# Arquivo opcional, na pasta da planilha, com o roteiro de telas da ML81N (mesmo formato de ROTEIRO_ML81N)
+ARQUIVO_ROTEIRO = "bdc_ml81n.json"
+
+TRANSACAO_FRS = "ML81N"
+
+# Roteiro de telas da ML81N, na ordem do _frs: seleção do pedido, nova folha, cabeçalho e aceitação,
+# seleção de serviços, aceite, gravação e as duas confirmações. Campos de cada tela:
+#   programa / tela: o dynpro (BDCDATA-PROGRAM / DYNPRO);
+#   okcode: o código de função enviado ao final da tela (BDC_OKCODE);
+#   campos: {campo da tela: chave do documento de core/documentos.folha_servico()};
+#   fixos: {campo da tela: valor literal}.
+# Os códigos de função seguem a gravação da ML81N (SHDB); se o sistema usar outros, crie ARQUIVO_ROTEIRO
+ROTEIRO_ML81N = [
+    {"programa": "SAPLMLSR", "tela": "0400", "okcode": "=SELP"},
+    {"programa": "SAPLMLSR", "tela": "0340", "okcode": "=ENTE", "campos": {"RM11R-EBELN": "EBELN"}},
+    {"programa": "SAPLMLSR", "tela": "0400", "okcode": "=NEU"},
+    {"programa": "SAPLMLSR", "tela": "0400", "okcode": "=SELE",
+     "campos": {"ESSR-TXZ01": "TXZ01", "ESSR-LBLNE": "LBLNE", "ESSR-DLORT": "DLORT", "ESSR-LZVON": "LZVON",
+                "ESSR-LZBIS": "LZBIS", "ESSR-SBNAMAN": "SBNAMAN", "ESSR-BLDAT": "BLDAT", "ESSR-XBLNR": "XBLNR",
+                "ESSR-BKTXT": "BKTXT"}},
+    {"programa": "SAPLMLSP", "tela": "0300", "okcode": "=ENTE"},
+    {"programa": "SAPLMLSR", "tela": "0400", "okcode": "=ACCP"},
+    {"programa": "SAPLMLSR", "tela": "0400", "okcode": "=SAVE"},
+    {"programa": "SAPLSPO1", "tela": "0300", "okcode": "=YES"},
+    {"programa": "SAPLSPO1", "tela": "0100", "okcode": "=YES"},
+]
+
+# Tamanho máximo de cada campo da folha (ESSR / RM11R); valores maiores seriam recusados pela tela
+TAMANHOS = {"EBELN": 10, "TXZ01": 40, "LBLNE": 16, "DLORT": 25, "SBNAMAN": 12, "XBLNR": 16, "BKTXT": 25}
+CAMPOS_DATA = ("LZVON", "LZBIS", "BLDAT")
+
+COLUNAS = ("TRANSACAO", "LINHA", "TCODE", "PROGRAM", "DYNPRO", "DYNBEGIN", "FNAM", "FVAL")
+
+
+# Carrega o roteiro da pasta da planilha (se houver) ou o padrão
+def carrega_roteiro(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_ROTEIRO)
+    if not os.path.exists(caminho):
+        return ROTEIRO_ML81N
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning(f"Roteiro BDC em '{caminho}' ilegível; usando o padrão: {e}")
+        return ROTEIRO_ML81N
+
+
+# Valor como o dynpro o recebe: texto, sem NaN do pandas
+def _texto(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isnull(valor)):
+        return ""
+    return str(valor).strip()
+
+
+# Confere a folha antes de gerar os registros (o batch input pararia na tela com o erro)
+def valida_folha(folha):
+    """
+    Returns:
+        Lista de problemas (vazia se a folha pode ser gerada).
+    """
+    problemas = []
+    ebeln = _texto(folha["EBELN"])
+    if not ebeln.isdigit():
+        problemas.append(f"pedido inválido '{ebeln}'")
+    for campo, tamanho in TAMANHOS.items():
+        if len(_texto(folha[campo])) > tamanho:
+            problemas.append(f"{campo} com mais de {tamanho} caracteres")
+    for campo in CAMPOS_DATA:
+        try:
+            dt.datetime.strptime(_texto(folha[campo]), "%d.%m.%Y")
+        except ValueError:
+            problemas.append(f"{campo} fora do formato dd.mm.aaaa ('{_texto(folha[campo])}')")
+    return problemas
+
+
+# Registros BDCDATA de uma folha: o início de cada tela e, em seguida, seus campos e o código de função
+def registros_folha(folha, roteiro=ROTEIRO_ML81N):
+    """
+    Returns:
+        Lista de tuplas (PROGRAM, DYNPRO, DYNBEGIN, FNAM, FVAL).
+    """
+    registros = []
+    for tela in roteiro:
+        registros.append((tela["programa"], tela["tela"], "X", "", ""))
+        for campo, chave in tela.get("campos", {}).items():
+            registros.append(("", "", "", campo, _texto(folha[chave])))
+        for campo, valor in tela.get("fixos", {}).items():
+            registros.append(("", "", "", campo, _texto(valor)))
+        registros.append(("", "", "", "BDC_OKCODE", tela["okcode"]))
+    return registros
+
+
+# Gera o arquivo de batch input das FRS das linhas informadas
+def gera_bdc_frs(lista, indices, caminho, roteiro=ROTEIRO_ML81N):
+    """
+    O arquivo é texto separado por tabulação, com cabeçalho (COLUNAS) e uma linha por registro
+    BDCDATA; TRANSACAO numera as folhas (cada uma vira um BDC_INSERT da ML81N) e LINHA é a linha
+    da planilha. A saída depende só das linhas e do roteiro (sem datas ou horários da geração),
+    de modo que pode ser comparada com um arquivo de referência.
+
+    Args:
+        lista: linhas retornadas por _relatorio.
+        indices: índices da lista a incluir.
+        caminho: arquivo a gerar.
+        roteiro: telas da ML81N (ver ROTEIRO_ML81N e carrega_roteiro()).
+
+    Returns:
+        (índices gerados, dict {índice: problemas} das linhas recusadas).
+    """
+    geradas, recusadas = [], {}
+    with open(caminho, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\t".join(COLUNAS) + "\n")
+        for i in indices:
+            folha = folha_servico(lista[i])
+            problemas = valida_folha(folha)
+            if problemas:
+                recusadas[i] = problemas
+                continue
+            geradas.append(i)
+            for registro in registros_folha(folha, roteiro):
+                campos = (str(len(geradas)), str(i + 2), TRANSACAO_FRS) + registro
+                f.write("\t".join(c.replace("\t", " ") for c in campos) + "\n")
+    return geradas, recusadas
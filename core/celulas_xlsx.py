@@ -0,0 +1,264 @@
+# Gravação direta de células no .xlsx: só o XML da planilha ativa é reescrito dentro do zip, sem o openpyxl
+# carregar e serializar a pasta de trabalho inteira (estilos, fórmulas e recursos que ele não suporta ficam intactos)
+import copy
+import numbers
+import os
+import posixpath
+import re
+import struct
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+_VISAO = re.compile(r'<workbookView\b[^>]*?\bactiveTab="(\d+)"')
+_ABA = re.compile(r'<sheet\b([^>]*)/?>')
+_ID_ABA = re.compile(r'\b\w+:id="([^"]+)"')
+_RELACAO = re.compile(r'<Relationship\b([^>]*)/?>')
+_ATRIBUTO = re.compile(r'\b(\w+)="([^"]*)"')
+_DADOS = re.compile(r'<sheetData\b[^>]*?(/?)>')
+_LINHA = re.compile(r'<row\b([^>]*?)(/?)>')
+_NUMERO_LINHA = re.compile(r'\br="(\d+)"')
+_CELULA = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_REF_CELULA = re.compile(r'\br="([A-Z]+)(\d+)"')
+_ESTILO = re.compile(r'\bs="(\d+)"')
+_DIMENSAO = re.compile(r'<dimension\b[^>]*?\bref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"[^>]*/>')
+# Caracteres que o XML 1.0 não aceita
+_INVALIDOS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+# A planilha usa algo que a gravação direta não trata (o chamador volta ao openpyxl)
+class EstruturaNaoSuportada(Exception):
+    pass
+
+
+# "BB" -> 54
+def indice_coluna(letras):
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - 64
+    return indice
+
+
+# 54 -> "BB"
+def letras_coluna(indice):
+    letras = ""
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+# Caminho, dentro do zip, do XML da planilha ativa (a mesma que o openpyxl devolve em wb.active)
+def parte_planilha_ativa(pacote):
+    livro = pacote.read("xl/workbook.xml").decode("utf-8")
+    visao = _VISAO.search(livro)
+    ativa = int(visao.group(1)) if visao else 0
+    abas = [_ID_ABA.search(atributos) for atributos in _ABA.findall(livro)]
+    if not abas or ativa >= len(abas) or abas[ativa] is None:
+        raise EstruturaNaoSuportada("planilha ativa não localizada em xl/workbook.xml")
+    relacoes = {}
+    for atributos in _RELACAO.findall(pacote.read("xl/_rels/workbook.xml.rels").decode("utf-8")):
+        campos = dict(_ATRIBUTO.findall(atributos))
+        relacoes[campos.get("Id")] = campos.get("Target", "")
+    alvo = relacoes.get(abas[ativa].group(1))
+    if not alvo:
+        raise EstruturaNaoSuportada("relação da planilha ativa não encontrada")
+    return alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join("xl", alvo))
+
+
+# XML de uma célula com o valor (número em <v>, texto como inlineStr), mantendo o estilo da célula anterior
+def _xml_celula(referencia, valor, atributos_anteriores=""):
+    estilo = _ESTILO.search(atributos_anteriores)
+    atributos = f' r="{referencia}"' + (f' s="{estilo.group(1)}"' if estilo else "")
+    if valor is None or (isinstance(valor, float) and pd.isnull(valor)):
+        return f"<c{atributos}/>"
+    if isinstance(valor, numbers.Number) and not isinstance(valor, bool):
+        return f"<c{atributos}><v>{repr(float(valor)) if isinstance(valor, float) else int(valor)}</v></c>"
+    if isinstance(valor, bool):
+        return f'<c{atributos} t="b"><v>{int(valor)}</v></c>'
+    texto = escape(_INVALIDOS.sub("", str(valor)))
+    espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+    return f'<c{atributos} t="inlineStr"><is><t{espaco}>{texto}</t></is></c>'
+
+
+# Reescreve o conteúdo de uma linha com as células novas, na ordem das colunas
+def _corpo_linha(corpo, numero, valores):
+    """
+    Returns:
+        (novo corpo, True se alguma célula substituída tinha fórmula).
+    """
+    celulas = []
+    for m in _CELULA.finditer(corpo):
+        ref = _REF_CELULA.search(m.group(1))
+        if ref is None or int(ref.group(2)) != numero:
+            raise EstruturaNaoSuportada(f"célula sem referência na linha {numero}")
+        celulas.append((indice_coluna(ref.group(1)), m.group(0), m.group(1), m.group(2) or ""))
+    tinha_formula = False
+    novas = {indice_coluna(coluna): valor for coluna, valor in valores.items()}
+    saida = []
+    for indice, xml, atributos, conteudo in celulas:
+        if indice in novas:
+            if 't="shared"' in conteudo and " ref=" in conteudo:
+                raise EstruturaNaoSuportada(f"fórmula compartilhada em {letras_coluna(indice)}{numero}")
+            tinha_formula = tinha_formula or "<f" in conteudo
+            saida.append((indice, _xml_celula(f"{letras_coluna(indice)}{numero}", novas.pop(indice), atributos)))
+        else:
+            saida.append((indice, xml))
+    saida.extend((indice, _xml_celula(f"{letras_coluna(indice)}{numero}", valor)) for indice, valor in novas.items())
+    saida.sort(key=lambda item: item[0])
+    return "".join(xml for _, xml in saida), tinha_formula
+
+
+# Aplica os resultados no XML da planilha
+def aplica_celulas(xml, resultados):
+    """
+    Args:
+        xml: conteúdo de xl/worksheets/sheetN.xml.
+        resultados: dict {número da linha: {coluna: valor}}.
+
+    Returns:
+        (XML novo, True se alguma célula com fórmula foi sobrescrita).
+    """
+    dados = _DADOS.search(xml)
+    if dados is None:
+        raise EstruturaNaoSuportada("sheetData não encontrado (XML com prefixo de namespace?)")
+    if dados.group(1):
+        # <sheetData/>: planilha vazia
+        xml = xml[:dados.start()] + "<sheetData></sheetData>" + xml[dados.end():]
+        inicio = fim = dados.start() + len("<sheetData>")
+    else:
+        inicio = dados.end()
+        fim = xml.find("</sheetData>", inicio)
+        if fim < 0:
+            raise EstruturaNaoSuportada("sheetData sem fechamento")
+
+    pendentes = sorted(resultados)
+    partes, posicao, tinha_formula = [], inicio, False
+    for m in _LINHA.finditer(xml, inicio, fim):
+        if not pendentes:
+            break
+        numero = _NUMERO_LINHA.search(m.group(1))
+        if numero is None:
+            raise EstruturaNaoSuportada("linha sem número (atributo r)")
+        numero = int(numero.group(1))
+        # Linhas novas que ficam antes desta
+        while pendentes and pendentes[0] < numero:
+            linha = pendentes.pop(0)
+            partes.append(xml[posicao:m.start()])
+            partes.append(f'<row r="{linha}">{_corpo_linha("", linha, resultados[linha])[0]}</row>')
+            posicao = m.start()
+        if not pendentes or pendentes[0] != numero:
+            continue
+        pendentes.pop(0)
+        if m.group(2):
+            corpo, final = "", m.end()
+        else:
+            final = xml.find("</row>", m.end(), fim)
+            if final < 0:
+                raise EstruturaNaoSuportada(f"linha {numero} sem fechamento")
+            corpo, final = xml[m.end():final], final + len("</row>")
+        novo_corpo, formula = _corpo_linha(corpo, numero, resultados[numero])
+        tinha_formula = tinha_formula or formula
+        # "spans" é só uma dica de colunas ocupadas; sai para não contradizer as células novas
+        atributos = re.sub(r'\s+spans="[^"]*"', "", m.group(1))
+        partes.append(xml[posicao:m.start()])
+        partes.append(f"<row{atributos}>{novo_corpo}</row>")
+        posicao = final
+    partes.append(xml[posicao:fim])
+    # Linhas novas depois da última linha existente
+    for linha in pendentes:
+        partes.append(f'<row r="{linha}">{_corpo_linha("", linha, resultados[linha])[0]}</row>')
+    xml = xml[:inicio] + "".join(partes) + xml[fim:]
+    return _amplia_dimensao(xml, resultados), tinha_formula
+
+
+# Estende <dimension ref="A1:BH500"/> se as células novas ficarem fora dela
+def _amplia_dimensao(xml, resultados):
+    m = _DIMENSAO.search(xml)
+    if m is None:
+        return xml
+    col_ini, lin_ini = m.group(1), int(m.group(2))
+    col_fim, lin_fim = m.group(3) or col_ini, int(m.group(4) or lin_ini)
+    colunas = [indice_coluna(c) for valores in resultados.values() for c in valores]
+    nova_col = max([indice_coluna(col_fim)] + colunas)
+    nova_lin = max([lin_fim] + list(resultados))
+    if nova_col == indice_coluna(col_fim) and nova_lin == lin_fim:
+        return xml
+    ref = f"{col_ini}{lin_ini}:{letras_coluna(nova_col)}{nova_lin}"
+    return xml[:m.start()] + f'<dimension ref="{ref}"/>' + xml[m.end():]
+
+
+# Remove a cadeia de cálculo (o Excel a refaz ao abrir), necessária quando uma fórmula vira valor
+def _sem_cadeia_de_calculo(nome, conteudo):
+    if nome == "[Content_Types].xml":
+        return re.sub(r'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', "", conteudo)
+    if nome == "xl/_rels/workbook.xml.rels":
+        return re.sub(r'<Relationship\b[^>]*Target="/?(?:xl/)?calcChain\.xml"[^>]*/>', "", conteudo)
+    return conteudo
+
+
+# Copia uma parte do zip sem descomprimir: cabeçalho local e dados comprimidos byte a byte, e a mesma
+# entrada no diretório central (só a posição muda)
+def _copia_bruta(entrada, saida, info):
+    entrada.fp.seek(info.header_offset)
+    cabecalho = entrada.fp.read(30)
+    if cabecalho[:4] != b"PK\x03\x04" or info.flag_bits & 0x01:
+        raise EstruturaNaoSuportada(f"parte '{info.filename}' com cabeçalho inesperado ou criptografada")
+    tamanho_nome, tamanho_extra = struct.unpack("<HH", cabecalho[26:30])
+    bruto = cabecalho + entrada.fp.read(tamanho_nome + tamanho_extra + info.compress_size)
+    if info.flag_bits & 0x08:
+        # Descritor de dados após os dados (CRC e tamanhos), com ou sem assinatura
+        descritor = entrada.fp.read(4)
+        bruto += descritor + entrada.fp.read(12 if descritor == b"PK\x07\x08" else 8)
+    copia = copy.copy(info)
+    saida.fp.seek(saida.start_dir)
+    copia.header_offset = saida.fp.tell()
+    saida.fp.write(bruto)
+    saida.start_dir = saida.fp.tell()
+    saida.filelist.append(copia)
+    saida.NameToInfo[copia.filename] = copia
+
+
+# Grava os resultados na planilha ativa do .xlsx, copiando as demais partes do zip sem interpretá-las
+def grava_celulas(arquivo, resultados):
+    """
+    O arquivo é gravado em um temporário na mesma pasta e substitui a planilha ao final, de modo
+    que uma falha no meio não a corrompe. Os textos são gravados como inlineStr (sem tocar em
+    sharedStrings.xml). As partes reescritas mantêm o método de compressão original e as demais
+    são copiadas comprimidas, sem passar pelo zlib.
+
+    Args:
+        arquivo: o caminho do .xlsx (ou .xlsm).
+        resultados: dict {número da linha: {coluna: valor}}, como em mm._grava_resultados.
+
+    Raises:
+        EstruturaNaoSuportada: a planilha tem algo que a gravação direta não trata (use o openpyxl).
+    """
+    if not zipfile.is_zipfile(arquivo):
+        raise EstruturaNaoSuportada("o arquivo não é um pacote .xlsx")
+    pasta = os.path.dirname(os.path.abspath(arquivo))
+    descritor, temporario = tempfile.mkstemp(suffix=".xlsx", dir=pasta)
+    os.close(descritor)
+    try:
+        with zipfile.ZipFile(arquivo) as entrada:
+            parte = parte_planilha_ativa(entrada)
+            xml, tinha_formula = aplica_celulas(entrada.read(parte).decode("utf-8"), resultados)
+            with zipfile.ZipFile(temporario, "w") as saida:
+                for info in entrada.infolist():
+                    # writestr usa o compress_type da própria ZipInfo: a parte reescrita segue como no original
+                    if info.filename == parte:
+                        saida.writestr(copy.copy(info), xml.encode("utf-8"))
+                    elif tinha_formula and info.filename == "xl/calcChain.xml":
+                        continue
+                    elif tinha_formula and info.filename in ("[Content_Types].xml", "xl/_rels/workbook.xml.rels"):
+                        conteudo = entrada.read(info).decode("utf-8")
+                        saida.writestr(copy.copy(info), _sem_cadeia_de_calculo(info.filename, conteudo).encode("utf-8"))
+                    else:
+                        # Demais partes: copiadas comprimidas, sem descomprimir nem interpretar o conteúdo
+                        _copia_bruta(entrada, saida, info)
+        os.replace(temporario, arquivo)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
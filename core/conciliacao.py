@@ -0,0 +1,254 @@
+# Conciliação pós-execução: um relatório por tipo de documento, exportado de uma vez e cruzado com a planilha
+import datetime as dt
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import column_index_from_string
+
+from .exportacao import consulta_se16n, exporta_grade, area_de_transferencia, Intervalo
+from .relatorio import COLUNAS_RELATORIO
+
+# Como cada fluxo é conferido: tabela e campo de data do SE16N, chave de junção (SAP x planilha),
+# número do documento (SAP x coluna gravada pelo fluxo), item (se houver) e valor
+ESPECIFICACOES = {
+    # Os itens da RC levam a NF no campo "Nº acompanhamento" (BEDNR)
+    "requisicao": {
+        "tabela": "EBAN", "data": "BADAT",
+        "chave_sap": ["BEDNR"], "chave_planilha": ["Nota fiscal"],
+        "filtro": ("BEDNR", "Nota fiscal"),
+        "numero": ("BANFN", "AT"), "item": ("BNFPO", "AU"), "valor": "PREIS",
+    },
+    # O item do pedido referencia o item da RC de onde foi criado
+    "pedido": {
+        "tabela": "EKPO", "data": "AEDAT",
+        "chave_sap": ["BANFN", "BNFPO"], "chave_planilha": ["AT", "AU"],
+        "filtro": ("BANFN", "AT"),
+        "numero": ("EBELN", "AY"), "item": None, "valor": "NETWR",
+    },
+    # A FRS leva a NF na referência (XBLNR) e pertence ao pedido (que já identifica o fornecedor)
+    "frs": {
+        "tabela": "ESSR", "data": "ERDAT",
+        "chave_sap": ["XBLNR", "EBELN"], "chave_planilha": ["Nota fiscal", "AY"],
+        "filtro": ("EBELN", "AY"),
+        "numero": ("LBLNI", "BB"), "item": None, "valor": "LWERT",
+    },
+}
+
+# Protocolos (GD): não há tabela padrão; a própria MLGDC é exportada com a seleção dos protocolos da planilha
+COLUNA_PROTOCOLO = "PROTC"
+COLUNA_CNPJ = "STCD1"
+GRADE_MLGDC = "wnd[0]/usr/shell"
+
+# Situações de uma linha após a conciliação ("ok" e "pendente" não entram no relatório)
+SITUACOES = ["ausente", "nao_gravado", "duplicado", "numero_divergente", "numero_repetido", "valor_divergente"]
+
+
+# Normaliza números de documento para comparação: texto, sem espaços, sem ".0" do Excel e sem zeros à esquerda
+def normaliza_numero(serie):
+    texto = serie.fillna("").astype(str).str.strip()
+    texto = texto.where(~texto.str.lower().isin(["nan", "none", "nat"]), "")
+    return texto.str.replace(r"\.0$", "", regex=True).str.lstrip("0")
+
+
+# Converte valores ("1.234,56" do SAP ou "1234,56" da planilha) em número; ilegíveis viram NaN
+def normaliza_valor(serie):
+    texto = serie.fillna("").astype(str).str.strip().str.replace(" ", "", regex=False)
+    brasileiro = texto.str.contains(",", regex=False)
+    texto = texto.where(~brasileiro, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    # Sinal negativo no final (formato do SAP): "12,00-"
+    texto = texto.str.replace(r"^(.*)-$", r"-\1", regex=True)
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def _chave(dados, colunas):
+    partes = [normaliza_numero(dados[c]) for c in colunas]
+    chave = partes[0]
+    for parte in partes[1:]:
+        chave = chave + "|" + parte
+    return chave
+
+
+# Monta a planilha da conciliação: colunas do relatório mais as colunas gravadas pelos fluxos (AT, AU, ...)
+def monta_planilha(lista, arquivo, letras):
+    """
+    Args:
+        lista: linhas retornadas por _relatorio.
+        arquivo: o caminho da planilha.
+        letras: colunas gravadas pelos fluxos a ler (ex.: ["AT", "AU"]).
+
+    Returns:
+        DataFrame com uma linha por item da lista e a coluna "linha" (número da linha na planilha).
+    """
+    planilha = pd.DataFrame(lista, columns=COLUNAS_RELATORIO)
+    letras = sorted(set(letras), key=column_index_from_string)
+    try:
+        gravadas = pd.read_excel(arquivo, usecols=",".join(letras), dtype=str)
+        gravadas.columns = letras
+    except Exception as e:
+        logging.warning(f"Conciliação: colunas {', '.join(letras)} não lidas da planilha ({e}); consideradas vazias.")
+        gravadas = pd.DataFrame(columns=letras, dtype=str)
+    gravadas = gravadas.reset_index(drop=True).reindex(range(len(planilha)))
+    planilha = pd.concat([planilha, gravadas], axis=1)
+    planilha["linha"] = np.arange(len(planilha)) + 2
+    return planilha
+
+
+# Cruza a planilha com a exportação do SAP em uma única passada vetorizada
+def concilia(planilha, sap, espec):
+    """
+    Args:
+        planilha: retorno de monta_planilha().
+        sap: DataFrame exportado do SAP (nomes técnicos das colunas).
+        espec: item de ESPECIFICACOES.
+
+    Returns:
+        (planilha com as colunas "documentos_sap", "numero_sap", "valor_sap" e "situacao",
+         documentos do SAP sem linha correspondente na planilha).
+    """
+    numero_sap, numero_planilha = espec["numero"]
+    colunas_sap = espec["chave_sap"] + [numero_sap] + ([espec["item"][0]] if espec["item"] else []) + [espec["valor"]]
+    sap = sap.reindex(columns=colunas_sap).copy()
+    sap["_chave"] = _chave(sap, espec["chave_sap"])
+    sap["_numero"] = normaliza_numero(sap[numero_sap])
+    if espec["item"]:
+        sap["_numero"] = sap["_numero"] + "/" + normaliza_numero(sap[espec["item"][0]])
+    sap["_valor"] = normaliza_valor(sap[espec["valor"]])
+    sap = sap[sap["_chave"].str.strip("|") != ""]
+
+    resultado = planilha.copy()
+    chave = _chave(resultado, espec["chave_planilha"])
+    numero = normaliza_numero(resultado[numero_planilha])
+    if espec["item"]:
+        numero = numero.where(numero == "", numero + "/" + normaliza_numero(resultado[espec["item"][1]]))
+
+    contagem = sap.groupby("_chave").size()
+    primeiro = sap.drop_duplicates("_chave").set_index("_chave")
+    resultado["documentos_sap"] = chave.map(contagem).fillna(0).astype(int)
+    resultado["numero_sap"] = chave.map(primeiro["_numero"]).fillna("")
+    resultado["valor_sap"] = chave.map(primeiro["_valor"])
+    valor = normaliza_valor(resultado["Liquido a Pagar"])
+
+    # O mesmo número gravado em linhas com chaves diferentes indica leitura errada da barra de status
+    repetido = (numero != "") & numero.duplicated(keep=False) & ~chave.duplicated(keep=False)
+    documentos = resultado["documentos_sap"]
+    resultado["situacao"] = np.select(
+        [
+            (documentos == 0) & (numero == ""),
+            (documentos == 0),
+            (documentos > 0) & (numero == ""),
+            (documentos > 1),
+            numero != resultado["numero_sap"],
+            repetido,
+            (valor - resultado["valor_sap"]).abs() > 0.01,
+        ],
+        ["pendente", "ausente", "nao_gravado", "duplicado", "numero_divergente", "numero_repetido", "valor_divergente"],
+        "ok",
+    )
+    sem_linha = sap[~sap["_chave"].isin(set(chave))].drop(columns=["_chave", "_numero", "_valor"])
+    return resultado, sem_linha
+
+
+# Cruza os protocolos da planilha (BF) com a exportação da MLGDC, conferindo o CNPJ quando a grade o traz
+def concilia_protocolos(planilha, sap):
+    resultado = planilha.copy()
+    numero = normaliza_numero(resultado["BF"])
+    protocolos = normaliza_numero(sap.get(COLUNA_PROTOCOLO, pd.Series(dtype=str)))
+    contagem = protocolos.value_counts()
+    resultado["documentos_sap"] = numero.map(contagem).fillna(0).astype(int)
+    resultado["numero_sap"] = numero.where(resultado["documentos_sap"] > 0, "")
+    resultado["valor_sap"] = np.nan
+    cnpj_divergente = pd.Series(False, index=resultado.index)
+    if COLUNA_CNPJ in sap.columns:
+        cnpj_sap = pd.Series(normaliza_numero(sap[COLUNA_CNPJ]).values, index=protocolos.values)
+        cnpj_sap = cnpj_sap[~cnpj_sap.index.duplicated()]
+        cnpj = normaliza_numero(resultado["CNPJ_Fornecedor"].str.replace(r"\D", "", regex=True))
+        esperado = numero.map(cnpj_sap)
+        cnpj_divergente = esperado.notna() & (esperado != cnpj)
+    resultado["situacao"] = np.select(
+        [
+            numero == "",
+            resultado["documentos_sap"] == 0,
+            numero.duplicated(keep=False),
+            cnpj_divergente,
+        ],
+        ["pendente", "ausente", "numero_repetido", "numero_divergente"],
+        "ok",
+    )
+    sem_linha = sap[~protocolos.isin(set(numero)).values]
+    return resultado, sem_linha
+
+
+# Exporta a MLGDC com todos os protocolos gravados na planilha (seleção múltipla), em uma única execução
+def _exporta_protocolos(session, protocolos, pasta):
+    session.findById("wnd[0]/tbar[0]/okcd").text = "/NMLGDC"
+    session.findById("wnd[0]").sendVKey(0)
+    session.findById("wnd[0]/usr/ctxtSO_BUKRS-LOW").text = "01"
+    session.findById("wnd[0]/usr/btn%_SO_PROTC_%_APP_%-VALU_PUSH").press()
+    with area_de_transferencia(protocolos):
+        session.findById("wnd[1]/tbar[0]/btn[24]").press()  # carregar da área de transferência
+    session.findById("wnd[1]/tbar[0]/btn[8]").press()
+    session.findById("wnd[0]/tbar[1]/btn[8]").press()
+    return exporta_grade(session, pasta, "conciliacao_mlgdc.txt", grade=GRADE_MLGDC)
+
+
+# Executa a conciliação de um fluxo: uma consulta no SAP, um cruzamento e um relatório ao lado da planilha
+def concilia_execucao(session, fluxo, lista, arquivo, desde=None, ate=None):
+    """
+    Args:
+        session: a sessão SAP.
+        fluxo: "requisicao", "pedido", "frs" ou "gd".
+        lista: linhas retornadas por _relatorio.
+        arquivo: o caminho da planilha.
+        desde: primeiro dia da execução (padrão: hoje); os documentos criados a partir dele são consultados.
+        ate: último dia (padrão: hoje).
+
+    Returns:
+        dict {situação: quantidade de linhas} (sem "ok" e "pendente").
+    """
+    hoje = dt.date.today()
+    desde, ate = desde or hoje, ate or hoje
+    pasta = os.path.dirname(arquivo)
+
+    if fluxo == "gd":
+        planilha = monta_planilha(lista, arquivo, ["BF"])
+        protocolos = sorted(set(normaliza_numero(planilha["BF"])) - {""})
+        if not protocolos:
+            print("Conciliação (gd): nenhum protocolo gravado na planilha.")
+            return {}
+        sap = _exporta_protocolos(session, protocolos, pasta)
+        resultado, sem_linha = concilia_protocolos(planilha, sap)
+    else:
+        espec = ESPECIFICACOES[fluxo]
+        letras = [c for c in espec["chave_planilha"] if c not in COLUNAS_RELATORIO] + [espec["numero"][1]]
+        if espec["item"]:
+            letras.append(espec["item"][1])
+        planilha = monta_planilha(lista, arquivo, letras)
+        campo_filtro, coluna_filtro = espec["filtro"]
+        filtro = sorted(set(normaliza_numero(planilha[coluna_filtro])) - {""})
+        if not filtro:
+            print(f"Conciliação ({fluxo}): nenhuma linha da planilha com '{coluna_filtro}' preenchido.")
+            return {}
+        criterios = {
+            espec["data"]: Intervalo(desde.strftime("%d.%m.%Y"), ate.strftime("%d.%m.%Y")),
+            campo_filtro: filtro,
+        }
+        sap = consulta_se16n(session, espec["tabela"], criterios, pasta, f"conciliacao_{espec['tabela'].lower()}.txt")
+        resultado, sem_linha = concilia(planilha, sap, espec)
+
+    sinalizadas = resultado[resultado["situacao"].isin(SITUACOES)]
+    resumo = sinalizadas["situacao"].value_counts().to_dict()
+    destino = os.path.splitext(arquivo)[0] + f".conciliacao_{fluxo}.xlsx"
+    with pd.ExcelWriter(destino, engine="openpyxl") as escritor:
+        sinalizadas.to_excel(escritor, sheet_name="linhas", index=False)
+        sem_linha.to_excel(escritor, sheet_name="sem_linha", index=False)
+
+    print(f"Conciliação ({fluxo}): {len(resultado) - len(sinalizadas)} linha(s) sem divergência, "
+          f"{len(sinalizadas)} sinalizada(s), {len(sem_linha)} documento(s) do SAP sem linha na planilha.")
+    for situacao in SITUACOES:
+        if resumo.get(situacao):
+            print(f"  {situacao}: {resumo[situacao]}")
+    if len(sinalizadas) or len(sem_linha):
+        print(f"Detalhes em: {destino}")
+    return resumo
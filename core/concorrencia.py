@@ -0,0 +1,117 @@
+# Controle adaptativo de concorrência (AIMD) guiado pelo tempo de resposta do SAP
+import logging
+import threading
+import time
+
+# Chamadas de scripting que fazem ida e volta ao servidor SAP e, por isso, refletem o tempo de resposta
+METODOS_IDA_E_VOLTA = {"sendvkey", "pressenter"}
+BOTAO_GRAVAR = "tbar[0]/btn[11]"
+
+
+# Limita quantas contas trabalham ao mesmo tempo, ajustando o limite pelo tempo de resposta do SAP
+class ControladorAIMD:
+    """
+    Aumento aditivo / redução multiplicativa: a cada janela de medições, se a latência média
+    das chamadas de ida e volta (gravar, sendVKey, pressEnter) ficou abaixo do alvo o limite
+    sobe em `incremento`; se ficou acima, é multiplicado por `fator_reducao`. Uma rajada de erros
+    (`limite_erros` em `intervalo_erros` segundos) reduz o limite e pausa novas linhas por `pausa`.
+
+    Args:
+        maximo: número máximo de trabalhadores ativos (normalmente, o número de contas).
+        minimo: número mínimo de trabalhadores ativos.
+        latencia_alvo: latência média desejada, em segundos.
+        incremento: quanto o limite sobe após uma janela dentro do alvo.
+        fator_reducao: multiplicador do limite após uma janela acima do alvo.
+        janela: quantidade de medições avaliadas a cada ajuste.
+        limite_erros / intervalo_erros / pausa: detecção da rajada de erros e duração da pausa.
+        metricas: registro de métricas onde o limite e os ativos são publicados (opcional).
+    """
+
+    def __init__(self, maximo, minimo=1, latencia_alvo=2.0, incremento=1, fator_reducao=0.5, janela=20,
+                 limite_erros=3, intervalo_erros=60, pausa=30, metricas=None):
+        self.maximo = max(1, maximo)
+        self.minimo = max(1, min(minimo, self.maximo))
+        self.latencia_alvo = latencia_alvo
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.janela = janela
+        self.limite_erros = limite_erros
+        self.intervalo_erros = intervalo_erros
+        self.pausa = pausa
+        self.metricas = metricas
+
+        self.limite = float(self.minimo)
+        self.ativos = 0
+        self._medicoes = []
+        self._erros = []
+        self._pausado_ate = 0.0
+        self._condicao = threading.Condition()
+
+    # ----------------------- Permissões -----------------------
+    def adquire(self, cancelado=None):
+        """
+        Bloqueia até haver vaga para mais um trabalhador (e nenhuma pausa em andamento).
+
+        Args:
+            cancelado: threading.Event opcional; se for sinalizado, a espera é abandonada.
+
+        Returns:
+            True se a vaga foi obtida, False se a execução foi cancelada durante a espera.
+        """
+        with self._condicao:
+            while self.ativos >= int(self.limite) or time.monotonic() < self._pausado_ate:
+                if cancelado is not None and cancelado.is_set():
+                    return False
+                self._condicao.wait(0.5)
+            self.ativos += 1
+            self._publica()
+            return True
+
+    def libera(self):
+        with self._condicao:
+            self.ativos = max(0, self.ativos - 1)
+            self._publica()
+            self._condicao.notify_all()
+
+    # ----------------------- Medições -----------------------
+    # Ouvinte das chamadas medidas por SessaoMedida
+    def observa_chamada(self, metodo, id_elemento, segundos):
+        metodo = (metodo or "").lower()
+        if metodo in METODOS_IDA_E_VOLTA or (metodo == "press" and (id_elemento or "").endswith(BOTAO_GRAVAR)):
+            self.registra_latencia(segundos)
+
+    def registra_latencia(self, segundos):
+        with self._condicao:
+            self._medicoes.append(segundos)
+            if len(self._medicoes) < self.janela:
+                return
+            media = sum(self._medicoes) / len(self._medicoes)
+            self._medicoes = []
+            anterior = self.limite
+            if media > self.latencia_alvo:
+                self.limite = max(self.minimo, self.limite * self.fator_reducao)
+            else:
+                self.limite = min(self.maximo, self.limite + self.incremento)
+            if int(anterior) != int(self.limite):
+                logging.info(f"Concorrência ajustada de {int(anterior)} para {int(self.limite)} "
+                             f"(latência média {media:.2f}s, alvo {self.latencia_alvo:.2f}s).")
+            self._publica()
+            self._condicao.notify_all()
+
+    def registra_erro(self):
+        agora = time.monotonic()
+        with self._condicao:
+            self._erros = [t for t in self._erros if agora - t <= self.intervalo_erros]
+            self._erros.append(agora)
+            if len(self._erros) >= self.limite_erros:
+                self._erros = []
+                self.limite = max(self.minimo, self.limite * self.fator_reducao)
+                self._pausado_ate = agora + self.pausa
+                logging.warning(f"Rajada de erros: novas linhas pausadas por {self.pausa}s, "
+                                f"concorrência reduzida para {int(self.limite)}.")
+            self._publica()
+
+    def _publica(self):
+        if self.metricas is not None:
+            self.metricas.define("concorrencia_limite", int(self.limite))
+            self.metricas.define("concorrencia_ativos", self.ativos)
@@ -0,0 +1,301 @@
+# Coordenação entre estações: várias máquinas dividem a mesma planilha reservando linhas em um SQLite compartilhado
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from .incremental import chaves
+
+# Arquivo de reservas, na pasta (compartilhada) da planilha: <planilha>.reservas.sqlite
+SUFIXO_RESERVAS = ".reservas.sqlite"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS linhas (
+    fluxo TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    ordem INTEGER NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'livre',
+    dono TEXT,
+    expira REAL,
+    execucao TEXT,
+    resultado TEXT,
+    gravada INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fluxo, chave)
+);
+CREATE TABLE IF NOT EXISTS travas (
+    nome TEXT PRIMARY KEY,
+    dono TEXT NOT NULL,
+    expira REAL NOT NULL
+);
+"""
+
+
+# Identifica esta estação (máquina, processo e usuário SAP) nas reservas
+def identificacao(usuario=""):
+    return f"{socket.gethostname()}-{os.getpid()}-{usuario}"
+
+
+# Reservas de linhas com prazo de validade: cada estação pega lotes, renova enquanto trabalha e devolve os resultados
+class Coordenador:
+    """
+    Estados de uma linha: 'livre' -> 'reservada' (com dono e prazo) -> 'concluida' ou 'falha'.
+    As linhas são identificadas pela chave de negócio (nota fiscal + CNPJ, ver incremental.chaves()),
+    de modo que inserir ou reordenar linhas na planilha entre execuções não troca uma linha pela
+    outra. Uma reserva vencida (a estação parou sem devolver a linha) volta a ser oferecida às
+    demais; uma linha com falha volta a ser oferecida na próxima execução (de qualquer estação),
+    para que erros passageiros do SAP possam ser tentados de novo. Uma thread renova as reservas
+    e a trava da planilha desta estação enquanto ela estiver viva.
+
+    Args:
+        arquivo: o caminho da planilha (o banco de reservas fica ao lado dela).
+        dono: identificação desta estação (ver identificacao()).
+        tamanho_lote: quantas linhas são reservadas por vez.
+        duracao: validade, em segundos, de cada reserva.
+    """
+
+    def __init__(self, arquivo, dono, tamanho_lote=10, duracao=300):
+        self.caminho = os.path.splitext(arquivo)[0] + SUFIXO_RESERVAS
+        self.dono = dono
+        self.tamanho_lote = tamanho_lote
+        self.duracao = duracao
+        # Identifica esta execução: as falhas registradas por ela não são oferecidas de novo nela mesma
+        self.execucao = uuid.uuid4().hex
+        # Por fluxo: {índice da lista: chave} e {chave: índice da lista} da planilha lida por esta estação
+        self._chaves = {}
+        self._local = threading.local()
+        self._conexao().executescript(_ESQUEMA)
+        self._parar = threading.Event()
+        threading.Thread(target=self._renova, name="reservas-renovacao", daemon=True).start()
+
+    # ----------------------- Banco -----------------------
+    # Uma conexão por thread (o sqlite3 não compartilha conexões entre threads)
+    def _conexao(self):
+        bd = getattr(self._local, "bd", None)
+        if bd is None:
+            bd = self._local.bd = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        return bd
+
+    @contextmanager
+    def _transacao(self):
+        bd = self._conexao()
+        bd.execute("BEGIN IMMEDIATE")
+        try:
+            yield bd
+            bd.execute("COMMIT")
+        except Exception:
+            bd.execute("ROLLBACK")
+            raise
+
+    def _renova(self):
+        while not self._parar.wait(self.duracao / 3):
+            try:
+                with self._transacao() as bd:
+                    bd.execute("UPDATE linhas SET expira = ? WHERE dono = ? AND estado = 'reservada'",
+                               (time.time() + self.duracao, self.dono))
+                    # Gravação demorada da planilha: a trava não vence enquanto esta estação grava
+                    bd.execute("UPDATE travas SET expira = ? WHERE dono = ?", (time.time() + self.duracao, self.dono))
+            except sqlite3.Error as e:
+                logging.warning(f"Não foi possível renovar as reservas de linhas: {e}")
+        self._conexao().close()
+
+    # ----------------------- Reservas -----------------------
+    # Chave da linha i da lista (lida por linhas()) no fluxo
+    def _chave(self, fluxo, i):
+        return self._chaves[fluxo][0][i]
+
+    # Reserva o próximo lote de linhas livres (ou com reserva vencida); devolve as chaves
+    def reserva(self, fluxo):
+        agora = time.time()
+        with self._transacao() as bd:
+            reservadas = [r[0] for r in bd.execute(
+                "SELECT chave FROM linhas WHERE fluxo = ? AND (estado = 'livre' OR (estado = 'reservada' AND expira < ?)) "
+                "ORDER BY ordem LIMIT ?", (fluxo, agora, self.tamanho_lote))]
+            bd.executemany("UPDATE linhas SET estado = 'reservada', dono = ?, expira = ? WHERE fluxo = ? AND chave = ?",
+                           [(self.dono, agora + self.duracao, fluxo, chave) for chave in reservadas])
+        return reservadas
+
+    # Gera os índices da lista reservados por esta estação, lote a lote, até não restar linha livre
+    def linhas(self, fluxo, lista, indices, cancelado=None):
+        """
+        Args:
+            fluxo: nome do fluxo.
+            lista: linhas retornadas por _relatorio (a chave de cada linha sai delas).
+            indices: índices da lista que esta estação pode processar.
+            cancelado: threading.Event opcional que interrompe a reserva de novos lotes.
+        """
+        por_indice = dict(enumerate(chaves(lista)))
+        por_chave = {chave: i for i, chave in por_indice.items()}
+        self._chaves[fluxo] = (por_indice, por_chave)
+        permitidos = {por_indice[i]: i for i in indices}
+        with self._transacao() as bd:
+            bd.executemany("INSERT OR IGNORE INTO linhas (fluxo, chave, ordem) VALUES (?, ?, ?)",
+                           [(fluxo, chave, i) for chave, i in permitidos.items()])
+            # Falhas de execuções anteriores voltam a ser oferecidas (ex.: erro passageiro do SAP)
+            bd.executemany("UPDATE linhas SET estado = 'livre', dono = NULL, expira = NULL "
+                           "WHERE fluxo = ? AND chave = ? AND estado = 'falha' AND execucao IS NOT ?",
+                           [(fluxo, chave, self.execucao) for chave in permitidos])
+        while cancelado is None or not cancelado.is_set():
+            lote = self.reserva(fluxo)
+            if not lote:
+                # Outras estações ainda trabalham: espera, pois uma reserva pode vencer e voltar a ficar livre
+                if not self._reservadas_por_outros(fluxo):
+                    return
+                time.sleep(min(30, self.duracao / 3))
+                continue
+            estranhas = [chave for chave in lote if chave not in permitidos]
+            if estranhas:
+                self._devolve_chaves(fluxo, estranhas)  # linhas que não existem na planilha lida por esta estação
+            for chave in lote:
+                if chave in permitidos:
+                    yield permitidos[chave]
+
+    def _reservadas_por_outros(self, fluxo):
+        bd = self._conexao()
+        return bd.execute("SELECT COUNT(*) FROM linhas WHERE fluxo = ? AND estado = 'reservada' AND dono <> ?",
+                          (fluxo, self.dono)).fetchone()[0] > 0
+
+    # Registra as linhas concluídas com os valores a gravar na planilha ({linha da planilha: {coluna: valor}})
+    def conclui(self, fluxo, resultados):
+        with self._transacao() as bd:
+            bd.executemany("UPDATE linhas SET estado = 'concluida', resultado = ?, dono = ? WHERE fluxo = ? AND chave = ?",
+                           [(json.dumps(valores, default=str), self.dono, fluxo, self._chave(fluxo, linha - 2))
+                            for linha, valores in resultados.items()])
+
+    # Registra a falha da linha i nesta execução (ela volta a ser oferecida na próxima)
+    def falha(self, fluxo, i):
+        with self._transacao() as bd:
+            bd.execute("UPDATE linhas SET estado = 'falha', execucao = ? WHERE fluxo = ? AND chave = ? AND dono = ?",
+                       (self.execucao, fluxo, self._chave(fluxo, i), self.dono))
+
+    # Devolve linhas reservadas e não concluídas (fim da execução ou cancelamento)
+    def devolve(self, fluxo, linhas=None):
+        """
+        Args:
+            linhas: índices da lista a devolver (None = todas as reservadas por esta estação no fluxo).
+        """
+        if linhas is None:
+            with self._transacao() as bd:
+                bd.execute("UPDATE linhas SET estado = 'livre', dono = NULL, expira = NULL "
+                           "WHERE fluxo = ? AND dono = ? AND estado = 'reservada'", (fluxo, self.dono))
+            return
+        self._devolve_chaves(fluxo, [self._chave(fluxo, i) for i in linhas])
+
+    def _devolve_chaves(self, fluxo, chaves_linhas):
+        with self._transacao() as bd:
+            bd.executemany("UPDATE linhas SET estado = 'livre', dono = NULL, expira = NULL "
+                           "WHERE fluxo = ? AND chave = ? AND dono = ?", [(fluxo, c, self.dono) for c in chaves_linhas])
+
+    def resumo(self, fluxo):
+        bd = self._conexao()
+        return dict(bd.execute("SELECT estado, COUNT(*) FROM linhas WHERE fluxo = ? GROUP BY estado", (fluxo,)))
+
+    # ----------------------- Gravação na planilha -----------------------
+    # Trava exclusiva (com prazo) para que só uma estação grave a planilha por vez
+    @contextmanager
+    def trava_planilha(self, espera=600):
+        limite = time.time() + espera
+        while True:
+            agora = time.time()
+            with self._transacao() as bd:
+                livre = bd.execute("SELECT 1 FROM travas WHERE nome = 'planilha' AND expira >= ? AND dono <> ?",
+                                   (agora, self.dono)).fetchone() is None
+                if livre:
+                    bd.execute("INSERT OR REPLACE INTO travas (nome, dono, expira) VALUES ('planilha', ?, ?)",
+                               (self.dono, agora + self.duracao))
+            if livre:
+                break
+            if agora > limite:
+                raise TimeoutError("a planilha continua sendo gravada por outra estação")
+            time.sleep(2)
+        try:
+            yield
+        finally:
+            with self._transacao() as bd:
+                bd.execute("DELETE FROM travas WHERE nome = 'planilha' AND dono = ?", (self.dono,))
+
+    # Grava na planilha os resultados concluídos (desta ou de outras estações) que ainda não foram gravados
+    def grava_planilha(self, fluxo, automacao, arquivo):
+        """
+        Args:
+            fluxo: nome do fluxo.
+            automacao: instância de mm usada para gravar (via _grava_resultados).
+            arquivo: o caminho da planilha.
+
+        Returns:
+            Quantidade de linhas gravadas.
+        """
+        with self.trava_planilha():
+            bd = self._conexao()
+            por_chave = self._chaves.get(fluxo, ({}, {}))[1]
+            # Cada resultado vai para a linha em que a chave está na planilha lida por esta estação; os de
+            # chaves ausentes dela ficam para a estação que tiver a linha
+            resultados, gravadas = {}, []
+            for chave, resultado in bd.execute(
+                    "SELECT chave, resultado FROM linhas WHERE fluxo = ? AND estado = 'concluida' AND gravada = 0",
+                    (fluxo,)):
+                if chave in por_chave:
+                    resultados[por_chave[chave] + 2] = json.loads(resultado)
+                    gravadas.append(chave)
+            if not resultados:
+                return 0
+            # Relê a planilha: outra estação pode tê-la gravado depois da última leitura
+            automacao._planilha = None
+            automacao._grava_resultados(arquivo, resultados)
+            with self._transacao() as bd:
+                bd.executemany("UPDATE linhas SET gravada = 1 WHERE fluxo = ? AND chave = ?",
+                               [(fluxo, chave) for chave in gravadas])
+            return len(resultados)
+
+    def fecha(self):
+        self._parar.set()
+        bd = getattr(self._local, "bd", None)
+        if bd is not None:
+            bd.close()
+            self._local.bd = None
+
+
+# Executa um fluxo em modo coordenado: reserva linhas, processa e grava os resultados de todas as estações
+class ExecucaoCoordenada:
+    """
+    Args:
+        tamanho_lote: quantas linhas cada estação reserva por vez.
+        duracao: validade, em segundos, de cada reserva (renovada enquanto a estação trabalha).
+    """
+
+    def __init__(self, tamanho_lote=10, duracao=300):
+        self.tamanho_lote = tamanho_lote
+        self.duracao = duracao
+
+    def executa(self, automacao, fluxo, lista, arquivo):
+        """
+        Args:
+            automacao: instância de mm já conectada ao SAP.
+            fluxo: "requisicao", "pedido", "frs" ou "gd".
+            lista: linhas retornadas por _relatorio.
+            arquivo: o caminho da planilha.
+
+        Returns:
+            dict {estado: quantidade de linhas} do fluxo ao final.
+        """
+        coordenador = Coordenador(arquivo, identificacao(automacao.user), self.tamanho_lote, self.duracao)
+        automacao.coordenador = coordenador
+        resumo = {}
+        try:
+            getattr(automacao, "_" + fluxo)(lista, arquivo)
+        finally:
+            automacao.coordenador = None
+            try:
+                coordenador.devolve(fluxo)
+                gravadas = coordenador.grava_planilha(fluxo, automacao, arquivo)
+                print(f"{gravadas} linha(s) gravadas na planilha por esta estação.")
+                resumo = coordenador.resumo(fluxo)
+                print("Situação das linhas ({}): {}".format(
+                    fluxo, ", ".join(f"{estado}: {n}" for estado, n in sorted(resumo.items()))))
+            finally:
+                coordenador.fecha()
+        return resumo
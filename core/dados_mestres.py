@@ -0,0 +1,228 @@
+# Cache local dos dados mestres que o SAP só valida no popup: centros de custo, operações de diagramas
+# de rede, elementos PEP e domicílios fiscais, conferidos na memória antes de qualquer chamada ao SAP
+import datetime as dt
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from .exportacao import consulta_se16n, Intervalo
+from .documentos import categoria_contabil
+
+# Arquivo do cache, na pasta da planilha
+ARQUIVO_CACHE = "dados_mestres.json"
+# Validade de cada domínio: depois disso, a próxima execução baixa a tabela de novo
+VALIDADE_HORAS = 24
+
+# Domínios conferidos em cada fluxo (j[11] = Centro de Custo; j[15] = Domicílio)
+DOMINIOS_FLUXO = {
+    "requisicao": ("centros", "operacoes", "pep"),
+    "frs": ("domicilios",),
+    "gd": ("domicilios",),
+}
+
+DESCRICOES = {
+    "centros": "centro de custo",
+    "operacoes": "diagrama de rede/operação",
+    "pep": "elemento PEP",
+    "domicilios": "domicílio fiscal",
+}
+
+
+# Remove zeros à esquerda, como o SE16N exibe códigos numéricos (centro de custo, ordem, operação)
+def _numero(valor):
+    return str(valor).strip().lstrip("0")
+
+
+# Valor da planilha na forma guardada no cache
+def normaliza(dominio, valor):
+    if valor is None or (not isinstance(valor, str) and pd.isnull(valor)):
+        return ""
+    if dominio == "centros":
+        return _numero(valor)
+    if dominio == "operacoes":
+        rede, _, operacao = str(valor).partition("/")
+        return f"{_numero(rede)}/{_numero(operacao)}"
+    return str(valor).strip().upper()
+
+
+# Domínio e valor da linha a conferir no fluxo: o campo da classificação contábil ou o domicílio
+def campos_linha(fluxo, j):
+    """
+    Returns:
+        Lista de (domínio, valor normalizado); vazia se o fluxo não confere nada nessa linha.
+    """
+    dominios = DOMINIOS_FLUXO.get(fluxo, ())
+    campos = []
+    if "domicilios" in dominios:
+        campos.append(("domicilios", normaliza("domicilios", j[15])))
+    if "centros" in dominios:
+        conta = str(j[11])
+        categoria = categoria_contabil(conta)
+        if categoria == "K":
+            campos.append(("centros", normaliza("centros", conta)))
+        elif categoria == "N":
+            campos.append(("operacoes", normaliza("operacoes", f"{conta[0:10]}/{conta[-4:]}")))
+        else:
+            campos.append(("pep", normaliza("pep", conta)))
+    return [(dominio, valor) for dominio, valor in campos if valor]
+
+
+# ----------------------- Consultas (uma exportação do SE16N por domínio) -----------------------
+def _coluna(tabela, coluna):
+    return tabela[coluna] if coluna in tabela.columns else []
+
+
+# Centros de custo válidos hoje (CSKS); com `valores`, só esses
+def _consulta_centros(session, pasta, valores=None):
+    hoje = dt.date.today().strftime("%d.%m.%Y")
+    criterios = {"DATBI": Intervalo(hoje, "31.12.9999")}
+    if valores:
+        criterios["KOSTL"] = sorted(valores)
+    return {normaliza("centros", v) for v in _coluna(consulta_se16n(session, "CSKS", criterios, pasta), "KOSTL")}
+
+
+# Operações dos diagramas de rede (AFKO dá o plano de cada rede; AFVC, as operações do plano)
+def _consulta_operacoes(session, pasta, valores):
+    redes = sorted({v.split("/")[0] for v in valores})
+    afko = consulta_se16n(session, "AFKO", {"AUFNR": redes}, pasta)
+    planos = {str(r["AUFPL"]).strip(): _numero(r["AUFNR"]) for _, r in afko.iterrows()}
+    if not planos:
+        return set()
+    afvc = consulta_se16n(session, "AFVC", {"AUFPL": sorted(planos)}, pasta)
+    return {f"{planos[str(r['AUFPL']).strip()]}/{_numero(r['VORNR'])}" for _, r in afvc.iterrows()
+            if str(r["AUFPL"]).strip() in planos}
+
+
+# Elementos PEP que aceitam classificação contábil (PRPS-BELKZ)
+def _consulta_pep(session, pasta, valores=None):
+    criterios = {"BELKZ": "X"}
+    if valores:
+        criterios["POSID"] = sorted(valores)
+    return {normaliza("pep", v) for v in _coluna(consulta_se16n(session, "PRPS", criterios, pasta), "POSID")}
+
+
+# Domicílios fiscais (TTXJ)
+def _consulta_domicilios(session, pasta, valores=None):
+    criterios = {"TXJCD": sorted(valores)} if valores else {}
+    return {normaliza("domicilios", v) for v in _coluna(consulta_se16n(session, "TTXJ", criterios, pasta), "TXJCD")}
+
+
+CONSULTAS = {
+    "centros": _consulta_centros,
+    "operacoes": _consulta_operacoes,
+    "pep": _consulta_pep,
+    "domicilios": _consulta_domicilios,
+}
+# Domínios baixados por inteiro; as operações (AFVC é grande demais) são baixadas só para as redes da planilha
+DOMINIOS_COMPLETOS = ("centros", "pep", "domicilios")
+
+
+# Conjuntos de valores válidos por domínio, gravados ao lado da planilha com a data da última exportação
+class CacheDadosMestres:
+    """
+    Cada domínio vencido (mais de `validade_horas` desde a exportação) é baixado de novo, inteiro,
+    em uma consulta ao SE16N. Valores da planilha que não estão no cache são confirmados com uma
+    única consulta por domínio (podem ter sido criados depois da exportação) e, se continuarem
+    ausentes, a linha é recusada antes de chegar ao SAP. Se a consulta de um domínio falhar, ele
+    não é conferido nesta execução (o SAP continua validando no popup).
+
+    Args:
+        pasta: pasta da planilha, onde ARQUIVO_CACHE é mantido.
+        validade_horas: validade de cada domínio.
+    """
+
+    def __init__(self, pasta, validade_horas=VALIDADE_HORAS):
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, ARQUIVO_CACHE)
+        self.validade = validade_horas * 3600
+        self._trava = threading.Lock()
+        self.dominios = {}
+        # Valores já confirmados no SAP nesta execução (não são consultados de novo) e domínios sem consulta
+        self._confirmados = {}
+        self._indisponiveis = set()
+        if os.path.exists(self.caminho):
+            try:
+                with open(self.caminho, "r", encoding="utf-8") as f:
+                    dados = json.load(f).get("dominios", {})
+                self.dominios = {nome: {"atualizado": d["atualizado"], "valores": set(d["valores"])}
+                                 for nome, d in dados.items()}
+            except Exception as e:
+                logging.warning(f"Cache de dados mestres '{self.caminho}' ilegível; será baixado de novo: {e}")
+
+    def vencido(self, dominio):
+        registro = self.dominios.get(dominio)
+        return registro is None or time.time() - registro["atualizado"] > self.validade
+
+    # Pertinência em O(1); domínio indisponível ou ainda não baixado não recusa a linha
+    def valido(self, dominio, valor):
+        if dominio in self._indisponiveis or dominio not in self.dominios:
+            return True
+        return valor in self.dominios[dominio]["valores"]
+
+    # Problemas de dados mestres da linha no fluxo (vazia se a linha pode seguir para o SAP)
+    def problemas(self, fluxo, j):
+        return [f"{DESCRICOES[dominio]} '{valor}' inexistente ou bloqueado no SAP"
+                for dominio, valor in campos_linha(fluxo, j) if not self.valido(dominio, valor)]
+
+    # Baixa os domínios vencidos e confirma os valores da planilha que não estão no cache
+    def atualiza(self, session, fluxo, linhas):
+        """
+        Args:
+            session: a sessão SAP.
+            fluxo: nome do fluxo (define os domínios conferidos, ver DOMINIOS_FLUXO).
+            linhas: linhas de _relatorio (j) que o fluxo vai processar.
+
+        Returns:
+            True se alguma consulta foi feita no SAP (a sessão saiu da transação do fluxo).
+        """
+        necessarios = {}
+        for j in linhas:
+            for dominio, valor in campos_linha(fluxo, j):
+                necessarios.setdefault(dominio, set()).add(valor)
+        consultou = alterado = False
+        with self._trava:
+            for dominio, valores in necessarios.items():
+                if dominio in self._indisponiveis:
+                    continue
+                consulta = CONSULTAS[dominio]
+                try:
+                    if self.vencido(dominio):
+                        completo = dominio in DOMINIOS_COMPLETOS
+                        consultou = alterado = True
+                        encontrados = consulta(session, self.pasta, None if completo else valores)
+                        self.dominios[dominio] = {"atualizado": time.time(), "valores": encontrados}
+                        self._confirmados.setdefault(dominio, set()).update(valores)
+                        logging.info(f"Dados mestres ({DESCRICOES[dominio]}): {len(encontrados)} valor(es) baixado(s).")
+                        continue
+                    confirmados = self._confirmados.setdefault(dominio, set())
+                    faltantes = {v for v in valores if v not in self.dominios[dominio]["valores"]} - confirmados
+                    if faltantes:
+                        consultou = True
+                        encontrados = consulta(session, self.pasta, faltantes)
+                        confirmados.update(faltantes)
+                        if encontrados:
+                            alterado = True
+                            self.dominios[dominio]["valores"].update(encontrados)
+                except Exception as e:
+                    self._indisponiveis.add(dominio)
+                    logging.warning(f"Não foi possível consultar {DESCRICOES[dominio]} no SAP; "
+                                    f"esse campo não será conferido antes do SAP: {e}")
+            if alterado:
+                self.grava()
+        return consultou
+
+    # Grava o cache (arquivo temporário e troca, para não deixar um JSON pela metade)
+    def grava(self):
+        dados = {"dominios": {nome: {"atualizado": d["atualizado"], "valores": sorted(d["valores"])}
+                              for nome, d in self.dominios.items()}}
+        temporario = f"{self.caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+        except OSError as e:
+            logging.warning(f"Não foi possível gravar o cache de dados mestres '{self.caminho}': {e}")
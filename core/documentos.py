@@ -0,0 +1,112 @@
+# Mapeamento da planilha para os documentos SAP: qual coluna da linha vai para qual campo de cada documento.
+# Os backends de execução (core/backends.py) só recebem os documentos montados aqui
+import datetime as dt
+
+import pandas as pd
+
+# Valores fixos que os fluxos preenchem nas telas
+GRUPO_COMPRADORES = "F85"
+GRUPO_MERCADORIAS = "094300"
+UNIDADE_SERVICO = "UN"
+INCOTERMS = "ZSE"
+CODIGO_IVA = "D0"
+CODIGO_TLC = "8.8"
+RESPONSAVEL_FRS = "SOLANO"
+TEXTO_CONTABIL_FRS = "PGTO HOSPEDAGEM"
+TOMADOR_PROTOCOLO = "000111"
+# Conta das linhas de reserva de recursos usadas nos pedidos de hospedagem (a mesma do F4 do _pedido)
+CONTA_RESERVA = "45510003"
+# Data de remessa do item do pedido: hoje + este prazo (dias)
+PRAZO_REMESSA_DIAS = 30
+
+
+# Categoria de classificação contábil do item, pela mesma regra do _requisicao (j[11] = Centro de Custo)
+def categoria_contabil(centro):
+    """
+    Returns:
+        "K" (centro de custo, 7 caracteres), "N" (diagrama de rede, começa com '1') ou "P" (elemento PEP).
+    """
+    centro = str(centro)
+    if len(centro) == 7:
+        return "K"
+    if centro[:1] == "1":
+        return "N"
+    return "P"
+
+
+# Agrupa as linhas e divide cada grupo em lotes de até `tamanho` itens, mantendo a ordem da planilha
+def divide_requisicoes(lista, indices, tamanho, agrupar_por="categoria"):
+    """
+    Args:
+        lista: linhas retornadas por _relatorio.
+        indices: índices da lista a incluir.
+        tamanho: quantidade máxima de itens por requisição.
+        agrupar_por: "categoria" (K/N/P) ou "centro" (o próprio centro de custo, diagrama ou PEP).
+
+    Returns:
+        Lista de lotes (listas de índices); cada lote vira uma requisição.
+    """
+    grupos = {}
+    for i in indices:
+        centro = lista[i][11]
+        chave = categoria_contabil(centro) if agrupar_por == "categoria" else str(centro)
+        grupos.setdefault(chave, []).append(i)
+    lotes = []
+    for linhas in grupos.values():
+        lotes.extend(linhas[k:k + tamanho] for k in range(0, len(linhas), tamanho))
+    return lotes
+
+
+# Item da requisição (ME51N); `item` é o número do item na RC, a partir de 1
+def item_requisicao(j, item):
+    """
+    Returns:
+        dict com os campos do item (grade e serviço) e os da classificação contábil da categoria
+        ("KOSTL" para K; "NPLNR" e "VORNR" para N; "PS_POSID" para P).
+    """
+    conta = str(j[11])
+    categoria = categoria_contabil(conta)
+    texto = "HOSPEDAGEM NF {}".format(j[10])
+    documento = {
+        "BNFPO": item, "KNTTP": categoria, "EKGRP": GRUPO_COMPRADORES, "TXZ01": texto, "BEDNR": j[10],
+        "WGBEZ": GRUPO_MERCADORIAS, "EPSTP": "D", "KTEXT1": texto, "MENGE": "1", "MEINS": UNIDADE_SERVICO,
+        "TBTWR": j[12], "ZZTPCOD_TLC": CODIGO_TLC,
+    }
+    if categoria == "K":
+        documento["KOSTL"] = conta
+    elif categoria == "N":
+        documento["NPLNR"] = conta[0:10]
+        documento["VORNR"] = conta[-4:]
+    else:
+        documento["PS_POSID"] = conta
+    return documento
+
+
+# Pedido (ME21N) de uma linha; fornecedor e linha da reserva vêm do índice do pedido, quando houver
+def pedido(j, fornecedor=None, linha_reserva=None):
+    """
+    Returns:
+        dict com "STCD1" (CNPJ, para a ajuda de pesquisa), "LIFNR" (fornecedor ou None), "BEDAT",
+        "BANFN"/"BNFPO" (item da RC), "KBLNR" (reserva de recursos ou None), "KBLPOS" (linha da
+        reserva ou None), "EEIND" (data de remessa), "texto" (texto de cabeçalho) e "NF".
+    """
+    remessa = (dt.date.today() + dt.timedelta(days=PRAZO_REMESSA_DIAS)).strftime("%d.%m.%Y")
+    return {"STCD1": j[0], "LIFNR": fornecedor or None, "BEDAT": j[1], "BANFN": j[2], "BNFPO": j[3],
+            "EKGRP": GRUPO_COMPRADORES, "INCO1": INCOTERMS, "MWSKZ": CODIGO_IVA,
+            "KBLNR": None if pd.isnull(j[9]) else j[9], "KBLPOS": linha_reserva or None, "EEIND": remessa,
+            "texto": f'{j[4]} - {j[5]} - {j[8]} - {j[6]} a {j[7]}', "NF": j[10]}
+
+
+# Folha de registro de serviço (ML81N): campos do cabeçalho e da aceitação
+def folha_servico(j):
+    return {
+        "EBELN": j[13], "TXZ01": "PGTO {}".format(j[14][:30]), "LBLNE": j[10], "DLORT": j[15],
+        "LZVON": j[6], "LZBIS": j[7], "SBNAMAN": RESPONSAVEL_FRS, "BLDAT": j[1], "XBLNR": j[10],
+        "BKTXT": TEXTO_CONTABIL_FRS,
+    }
+
+
+# Protocolo de pagamento (MLGD) de uma nota fiscal de serviço
+def protocolo(j):
+    return {"SF_TOMA": TOMADOR_PROTOCOLO, "NFS": j[10], "BLDAT": j[1], "STCD1": j[0], "TXJCD": j[15],
+            "FRS": j[16], "arquivo_nf": "NF {}.pdf".format(j[10])}
@@ -0,0 +1,202 @@
+# Consultas em massa no SAP: uma execução do SE16N com seleção múltipla e exportação da grade para arquivo local
+import logging
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+
+import pandas as pd
+import win32clipboard
+
+# IDs da tela de seleção do SE16N
+TABELA_SELECAO = "wnd[0]/usr/tblSAPLSE16NSELFIELDS_TC"
+# Colunas da tabela de critérios: nome técnico do campo, valores "de" e "até" e botão de seleção múltipla
+COLUNA_NOME_TECNICO = 7
+COLUNA_VALOR = 2
+COLUNA_ATE = 3
+COLUNA_MULTIPLA = 4
+GRADE_RESULTADO = "wnd[0]/usr/cntlRESULT_LIST/shellcont/shell"
+
+# Codificação do arquivo exportado (4110 = UTF-8 no SAP GUI)
+CODIFICACAO_EXPORTACAO = "4110"
+
+# Critério de intervalo ("de" / "até"), ex.: Intervalo("01.10.2025", "31.10.2025")
+Intervalo = namedtuple("Intervalo", "de ate")
+
+
+# Copia os valores para a área de transferência, um por linha (usado pelo "Carregar da área de transferência")
+def copia_para_area_de_transferencia(valores):
+    win32clipboard.OpenClipboard()
+    try:
+        win32clipboard.EmptyClipboard()
+        win32clipboard.SetClipboardText("\r\n".join(str(v) for v in valores), win32clipboard.CF_UNICODETEXT)
+    finally:
+        win32clipboard.CloseClipboard()
+
+
+# Lê todos os formatos presentes na área de transferência (para devolvê-los depois da colagem no SAP)
+def _le_area_de_transferencia():
+    win32clipboard.OpenClipboard()
+    try:
+        conteudo = []
+        formato = win32clipboard.EnumClipboardFormats(0)
+        while formato:
+            try:
+                conteudo.append((formato, win32clipboard.GetClipboardData(formato)))
+            except Exception:
+                pass  # formato que não é um bloco de memória (ex.: bitmap): não há como guardá-lo
+            formato = win32clipboard.EnumClipboardFormats(formato)
+        return conteudo
+    finally:
+        win32clipboard.CloseClipboard()
+
+
+# Devolve à área de transferência o conteúdo lido por _le_area_de_transferencia
+def _restaura_area_de_transferencia(conteudo):
+    win32clipboard.OpenClipboard()
+    try:
+        win32clipboard.EmptyClipboard()
+        for formato, dados in conteudo:
+            try:
+                win32clipboard.SetClipboardData(formato, dados)
+            except Exception as e:
+                logging.debug(f"Formato {formato} da área de transferência não restaurado: {e}")
+    finally:
+        win32clipboard.CloseClipboard()
+
+
+# Coloca os valores na área de transferência só durante o bloco (a colagem no SAP) e depois devolve
+# o que o usuário tinha copiado
+@contextmanager
+def area_de_transferencia(valores):
+    """
+    Args:
+        valores: valores colados pelo "Carregar da área de transferência", um por linha.
+    """
+    try:
+        anterior = _le_area_de_transferencia()
+    except Exception as e:
+        logging.warning(f"Não foi possível ler a área de transferência; o conteúdo atual será perdido: {e}")
+        anterior = None
+    copia_para_area_de_transferencia(valores)
+    try:
+        yield
+    finally:
+        if anterior is not None:
+            try:
+                _restaura_area_de_transferencia(anterior)
+            except Exception as e:
+                logging.warning(f"Não foi possível restaurar a área de transferência: {e}")
+
+
+# Lê o arquivo exportado da grade ALV ("Texto com tabulações") e nomeia as colunas pelos nomes técnicos
+def le_exportacao(caminho, colunas):
+    """
+    Args:
+        caminho: arquivo gravado pela exportação da grade.
+        colunas: nomes técnicos das colunas, na ordem exibida na grade.
+
+    Returns:
+        DataFrame (texto) com uma coluna por nome técnico; vazio se o arquivo não tiver linhas de dados.
+    """
+    with open(caminho, "r", encoding="utf-8-sig", errors="replace") as f:
+        linhas = [linha.rstrip("\r\n") for linha in f]
+
+    registros = []
+    cabecalho_visto = False
+    for linha in linhas:
+        campos = linha.split("\t")
+        # A exportação costuma começar cada linha com uma tabulação
+        if len(campos) == len(colunas) + 1 and campos[0] == "":
+            campos = campos[1:]
+        if len(campos) != len(colunas):
+            continue  # título, data da exportação, linhas em branco
+        if not cabecalho_visto:
+            cabecalho_visto = True  # a primeira linha com todas as colunas é o cabeçalho (textos da grade)
+            continue
+        registros.append([c.strip() for c in campos])
+    return pd.DataFrame(registros, columns=list(colunas), dtype=str)
+
+
+# Encontra a linha da tabela de critérios do SE16N que corresponde ao campo, rolando a tabela se preciso
+def _localiza_campo(session, campo):
+    tabela = session.findById(TABELA_SELECAO)
+    total = tabela.RowCount
+    visiveis = tabela.VisibleRowCount
+    for inicio in range(0, total, visiveis):
+        tabela.verticalScrollbar.position = inicio
+        tabela = session.findById(TABELA_SELECAO)  # a referência muda após rolar a tabela
+        for linha in range(min(visiveis, total - inicio)):
+            if tabela.GetCell(linha, COLUNA_NOME_TECNICO).text.strip().upper() == campo.upper():
+                return linha
+    raise ValueError(f"Campo '{campo}' não encontrado na tela de seleção do SE16N.")
+
+
+# Preenche um critério: valor único no campo "de", intervalo ("de" e "até") ou vários valores pela seleção múltipla
+def _preenche_criterio(session, campo, valor):
+    linha = _localiza_campo(session, campo)
+    if isinstance(valor, Intervalo):
+        session.findById(f"{TABELA_SELECAO}/ctxtGS_SELFIELDS-LOW[{COLUNA_VALOR},{linha}]").text = str(valor.de)
+        session.findById(f"{TABELA_SELECAO}/ctxtGS_SELFIELDS-HIGH[{COLUNA_ATE},{linha}]").text = str(valor.ate)
+    elif isinstance(valor, (list, tuple, set)):
+        session.findById(f"{TABELA_SELECAO}/btnPUSH[{COLUNA_MULTIPLA},{linha}]").press()
+        with area_de_transferencia(sorted(set(valor))):
+            session.findById("wnd[1]/tbar[0]/btn[24]").press()  # carregar da área de transferência
+        session.findById("wnd[1]/tbar[0]/btn[8]").press()
+    else:
+        session.findById(f"{TABELA_SELECAO}/ctxtGS_SELFIELDS-LOW[{COLUNA_VALOR},{linha}]").text = str(valor)
+
+
+# Exporta a grade de resultado para um arquivo local, em uma única operação
+def exporta_grade(session, pasta, nome_arquivo, grade=GRADE_RESULTADO):
+    """
+    Args:
+        session: a sessão SAP, já na tela da grade ALV.
+        pasta: pasta onde o arquivo é gravado.
+        nome_arquivo: nome do arquivo (substituído se já existir).
+        grade: ID da grade ALV.
+
+    Returns:
+        DataFrame com as colunas da grade (nomes técnicos).
+    """
+    shell = session.findById(grade)
+    ordem = shell.ColumnOrder
+    colunas = [str(ordem(k)) for k in range(ordem.Count)]
+    shell.pressToolbarContextButton("&MB_EXPORT")
+    shell.selectContextMenuItem("&PC")
+    session.findById("wnd[1]/usr/subSUBSCREEN_STEPLOOP:SAPLSPO5:0150/sub:SAPLSPO5:0150/radSPOPLI-SELFLAG[1,0]").select()
+    session.findById("wnd[1]/tbar[0]/btn[0]").press()
+    session.findById("wnd[1]/usr/ctxtDY_PATH").text = pasta
+    session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = nome_arquivo
+    session.findById("wnd[1]/usr/ctxtDY_FILE_ENCODING").text = CODIFICACAO_EXPORTACAO
+    session.findById("wnd[1]/tbar[0]/btn[11]").press()  # substituir
+    return le_exportacao(os.path.join(pasta, nome_arquivo), colunas)
+
+
+# Executa o SE16N para uma tabela com os critérios informados e devolve o resultado exportado
+def consulta_se16n(session, tabela, criterios, pasta, nome_arquivo=None):
+    """
+    Args:
+        session: a sessão SAP.
+        tabela: tabela do dicionário (ex.: "EBAN").
+        criterios: dict {campo técnico: valor, Intervalo ou lista de valores}.
+        pasta: pasta onde o arquivo exportado é gravado.
+        nome_arquivo: nome do arquivo exportado (padrão: "se16n_<tabela>.txt").
+
+    Returns:
+        DataFrame com o resultado (vazio se nada for encontrado).
+    """
+    nome_arquivo = nome_arquivo or f"se16n_{tabela.lower()}.txt"
+    session.starttransaction("SE16N")
+    session.findById("wnd[0]/usr/ctxtGD-TAB").text = tabela
+    session.findById("wnd[0]").sendVKey(0)
+    session.findById("wnd[0]/usr/txtGD-MAX_LINES").text = ""
+    for campo, valor in criterios.items():
+        _preenche_criterio(session, campo, valor)
+    session.findById("wnd[0]/tbar[1]/btn[8]").press()
+    try:
+        session.findById(GRADE_RESULTADO)
+    except Exception:
+        # Sem grade: o SE16N ficou na seleção com a mensagem "nenhum valor encontrado"
+        logging.info(f"SE16N {tabela}: {session.findById('wnd[0]/sbar').text}")
+        return pd.DataFrame(dtype=str)
+    return exporta_grade(session, pasta, nome_arquivo)
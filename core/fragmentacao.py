@@ -0,0 +1,211 @@
+# Execução de um fluxo dividida entre várias contas SAP, cada uma com sua conexão e sua thread COM
+import logging
+import os
+import threading
+import zlib
+
+from .servicos import mm
+from .concorrencia import ControladorAIMD
+from .registro import novo_id_execucao
+from .incremental import IndiceIncremental, impressoes
+from .historico_desempenho import CronometroPassos, registra_execucao
+
+# Arquivo, na pasta da planilha, com um usuário SAP por linha (as senhas ficam no keyring)
+ARQUIVO_CONTAS = "sap_users.txt"
+
+# Coluna da lista usada como chave estável para dividir as linhas (j[10] = Nota fiscal)
+COLUNA_CHAVE = 10
+
+
+# Lê os usuários SAP disponíveis para a execução com várias contas
+def carrega_contas(pasta):
+    """
+    Args:
+        pasta: pasta da planilha.
+
+    Returns:
+        Lista de usuários (sem repetições e sem linhas vazias ou comentadas com '#').
+    """
+    caminho = os.path.join(pasta, ARQUIVO_CONTAS)
+    if not os.path.exists(caminho):
+        return []
+    contas = []
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            usuario = linha.strip()
+            if usuario and not usuario.startswith("#") and usuario not in contas:
+                contas.append(usuario)
+    return contas
+
+
+# Divide os índices da lista entre n contas pela chave (a mesma NF sempre cai na mesma conta)
+def divide_linhas(lista, n, coluna=COLUNA_CHAVE):
+    """
+    Args:
+        lista: linhas retornadas por _relatorio.
+        n: quantidade de contas.
+        coluna: posição da chave em cada linha.
+
+    Returns:
+        Lista com n listas de índices.
+    """
+    partes = [[] for _ in range(n)]
+    for i, j in enumerate(lista):
+        chave = str(j[coluna]).strip().encode("utf-8")
+        partes[zlib.crc32(chave) % n].append(i)
+    return partes
+
+
+# Coordena as contas: uma conexão e uma thread por conta; os resultados de cada conta vão para a planilha
+# assim que ela termina, por um único escritor
+class ExecucaoFragmentada:
+    """
+    Args:
+        contas: lista de usuários SAP (senhas no keyring, sob sap_keyring_system).
+        sap_environment: o nome exato da conexão no SAP Logon.
+        sap_logon_path: o caminho para o executável saplogon.
+        metricas: registro de métricas compartilhado pelas contas (opcional).
+        sap_keyring_system: o "Sistema" sob o qual as senhas foram cadastradas no keyring.
+        latencia_alvo: latência (s) que o controlador AIMD persegue; None desliga o controle
+                       adaptativo e todas as contas trabalham o tempo todo.
+    """
+
+    def __init__(self, contas, sap_environment, sap_logon_path, metricas=None, sap_keyring_system="saplogon",
+                 latencia_alvo=2.0):
+        self.contas = list(contas)
+        self.environment = sap_environment
+        self.sap_path = sap_logon_path
+        self.metricas = metricas
+        self.keyring_system = sap_keyring_system
+        self.modo_rapido = False
+        self.incremental = False
+        self.validar_dados_mestres = False
+        self.usar_indice_pedido = False
+        self.anexos_em_paralelo = False
+        self.gravacao_direta = False
+        self.ouvinte_linhas = None
+        # Vigia de travamentos (core/vigia.py) usado como modelo: cada conta recebe uma cópia
+        self.vigia = None
+        self.latencia_alvo = latencia_alvo
+        self.automacoes = []
+        # Escritor da planilha compartilhado pelas contas (uma gravação por vez)
+        self._escritor = None
+        self._trava_planilha = threading.Lock()
+        self._gravadas = 0
+
+    def _nova_automacao(self, conta):
+        automacao = mm(sap_user=conta, sap_environment=self.environment, sap_logon_path=self.sap_path,
+                       metricas=self.metricas, sap_keyring_system=self.keyring_system)
+        automacao.modo_rapido = self.modo_rapido
+        automacao.incremental = self.incremental
+        automacao.validar_dados_mestres = self.validar_dados_mestres
+        automacao.usar_indice_pedido = self.usar_indice_pedido
+        automacao.anexos_em_paralelo = self.anexos_em_paralelo
+        automacao.gravacao_direta = self.gravacao_direta
+        automacao.ouvinte_linhas = self.ouvinte_linhas
+        automacao.vigia = self.vigia.copia() if self.vigia is not None else None
+        return automacao
+
+    # Executa o fluxo de uma conta na sua própria thread (_conecta inicializa o COM da thread)
+    def _trabalho(self, automacao, fluxo, lista, arquivo, erros):
+        try:
+            if not automacao._conecta(exigir_usuario=True):
+                raise RuntimeError("não foi possível conectar ao SAP")
+            getattr(automacao, "_" + fluxo)(lista, arquivo)
+        except Exception as e:
+            logging.error(f"Conta '{automacao.user}' ({fluxo}): {e}")
+            erros[automacao.user] = e
+        finally:
+            automacao._encerra_com()
+            self._grava_conta(automacao, arquivo)
+
+    # Grava na planilha os resultados de uma conta que terminou (inclusive por falha ou cancelamento),
+    # sem esperar as demais: se outra conta travar ou o programa for fechado, estas linhas já estão salvas
+    def _grava_conta(self, automacao, arquivo):
+        with self._trava_planilha:
+            resultados, automacao.resultados_acumulados = automacao.resultados_acumulados, {}
+            if not resultados:
+                return
+            try:
+                self._escritor._grava_resultados(arquivo, resultados)
+            except Exception as e:
+                # Os números continuam no log da conta; a gravação é tentada de novo ao final da execução
+                logging.error(f"Conta '{automacao.user}': não foi possível gravar {len(resultados)} linha(s) "
+                              f"na planilha: {e}")
+                automacao.resultados_acumulados = resultados
+                return
+            self._gravadas += len(resultados)
+            print(f"Conta '{automacao.user}': {len(resultados)} linha(s) gravadas na planilha.")
+
+    def cancelar(self):
+        for automacao in self.automacoes:
+            automacao.cancelar()
+
+    # Divide as linhas, executa o fluxo em paralelo e grava os resultados de cada conta ao fim dela
+    def executa(self, fluxo, lista, arquivo):
+        """
+        Args:
+            fluxo: "requisicao", "pedido", "frs" ou "gd".
+            lista: linhas retornadas por _relatorio.
+            arquivo: o caminho da planilha.
+
+        Returns:
+            dict {conta: exceção} das contas que falharam (vazio se todas concluíram).
+        """
+        if not self.contas:
+            raise ValueError(f"Nenhuma conta SAP configurada em '{ARQUIVO_CONTAS}'.")
+
+        partes = divide_linhas(lista, len(self.contas))
+        # Execução incremental: um índice e um cálculo das impressões digitais para todas as contas
+        indice_incremental, impressoes_lista = None, None
+        if self.incremental:
+            indice_incremental, impressoes_lista = IndiceIncremental(arquivo), (lista, impressoes(lista))
+        controlador = None
+        if self.latencia_alvo is not None:
+            controlador = ControladorAIMD(maximo=len(self.contas), latencia_alvo=self.latencia_alvo,
+                                          metricas=self.metricas)
+        # Todas as contas registram o mesmo identificador de execução no log e os tempos no mesmo cronômetro
+        id_execucao = novo_id_execucao()
+        cronometro = CronometroPassos()
+        erros = {}
+        threads = []
+        self.automacoes = []
+        self._gravadas = 0
+        self._escritor = self._nova_automacao(self.contas[0])
+        self._escritor._fluxo_atual = fluxo
+        self._escritor.indice_incremental = indice_incremental
+        self._escritor._impressoes = impressoes_lista
+        for conta, indices in zip(self.contas, partes):
+            if not indices:
+                continue
+            automacao = self._nova_automacao(conta)
+            automacao.linhas_selecionadas = indices
+            automacao.resultados_acumulados = {}
+            automacao.controlador = controlador
+            automacao.id_execucao = id_execucao
+            automacao.cronometro = cronometro
+            automacao.indice_incremental = indice_incremental
+            automacao._impressoes = impressoes_lista
+            self.automacoes.append(automacao)
+            print(f"Conta '{conta}': {len(indices)} linha(s) de {fluxo}.")
+            thread = threading.Thread(target=self._trabalho, args=(automacao, fluxo, lista, arquivo, erros),
+                                      name=f"sap-{conta}", daemon=True)
+            threads.append(thread)
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        # Nova tentativa, de uma só vez, para os resultados cuja gravação falhou ao fim da conta
+        resultados = {}
+        for automacao in self.automacoes:
+            resultados.update(automacao.resultados_acumulados)
+        if resultados:
+            self._escritor._grava_resultados(arquivo, resultados)
+            self._gravadas += len(resultados)
+        print(f"{self._gravadas} linha(s) gravadas na planilha por {len(self.automacoes)} conta(s).")
+        try:
+            print(registra_execucao(os.path.dirname(arquivo), fluxo, "contas", cronometro, id_execucao))
+        except Exception as e:
+            logging.warning(f"Não foi possível comparar o desempenho de {fluxo} com o histórico: {e}")
+        return erros
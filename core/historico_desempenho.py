@@ -0,0 +1,161 @@
+# Histórico de desempenho por fluxo e por passo: cada execução é comparada com a referência das anteriores
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+
+# Arquivo, na pasta da planilha, com as estatísticas das últimas execuções de cada fluxo e modo
+ARQUIVO_HISTORICO = "historico_desempenho.json"
+
+# Execuções guardadas por fluxo/modo e quantas das mais recentes formam a referência
+EXECUCOES_GUARDADAS = 30
+JANELA_REFERENCIA = 10
+# Execuções anteriores necessárias para haver referência
+MINIMO_EXECUCOES = 3
+# Um passo está mais lento se a média subir mais que esta fração e mais que estes segundos
+TOLERANCIA = 0.25
+MINIMO_SEGUNDOS = 0.1
+
+# Leitura e gravação do histórico (as contas e os lotes de uma mesma execução terminam em threads diferentes)
+_trava_arquivo = threading.Lock()
+
+
+# Tempos de cada passo de uma execução (thread-safe: as contas e os lotes compartilham o mesmo cronômetro)
+class CronometroPassos:
+    """
+    Um passo é uma operação do fluxo (ex.: "lanca_frs", "planilha" ou a "linha" inteira); para cada
+    ocorrência guarda a duração total e quanto dela foi gasto esperando o SAP. O restante é
+    tempo do próprio programa: montagem dos documentos, planilha, esperas e anexos.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._amostras = {}
+        self.inicio = time.perf_counter()
+
+    def registra(self, passo, segundos, segundos_sap=0.0):
+        with self._trava:
+            self._amostras.setdefault(passo, []).append((segundos, segundos_sap))
+
+    def resumo(self):
+        """
+        Returns:
+            dict {passo: {"contagem", "media", "p90", "media_sap"}} (segundos).
+        """
+        with self._trava:
+            amostras = {passo: list(valores) for passo, valores in self._amostras.items()}
+        resumo = {}
+        for passo, valores in amostras.items():
+            duracoes = sorted(s for s, _ in valores)
+            resumo[passo] = {
+                "contagem": len(valores),
+                "media": round(sum(duracoes) / len(duracoes), 4),
+                "p90": round(duracoes[min(len(duracoes) - 1, int(0.9 * len(duracoes)))], 4),
+                "media_sap": round(sum(sap for _, sap in valores) / len(valores), 4),
+            }
+        return resumo
+
+
+# Referência de cada passo: mediana das médias nas execuções anteriores (uma execução atípica não a desloca)
+def referencia(execucoes):
+    """
+    Args:
+        execucoes: execuções anteriores do mesmo fluxo e modo, da mais antiga para a mais recente.
+
+    Returns:
+        dict {passo: {"media", "media_sap", "execucoes"}} com os passos presentes em pelo menos
+        MINIMO_EXECUCOES das últimas JANELA_REFERENCIA execuções.
+    """
+    por_passo = {}
+    for execucao in execucoes[-JANELA_REFERENCIA:]:
+        for passo, estatisticas in execucao.get("passos", {}).items():
+            por_passo.setdefault(passo, []).append(estatisticas)
+    return {
+        passo: {"media": statistics.median(e["media"] for e in lista),
+                "media_sap": statistics.median(e.get("media_sap", 0.0) for e in lista),
+                "execucoes": len(lista)}
+        for passo, lista in por_passo.items() if len(lista) >= MINIMO_EXECUCOES
+    }
+
+
+# Passos mais lentos que a referência, do maior para o menor aumento absoluto
+def regressoes(passos, base):
+    """
+    Returns:
+        Lista de dicts {"passo", "media", "referencia", "variacao", "delta_sap", "delta_local"}.
+    """
+    lentos = []
+    for passo, atual in passos.items():
+        ref = base.get(passo)
+        if ref is None or ref["media"] <= 0:
+            continue
+        delta = atual["media"] - ref["media"]
+        if delta > MINIMO_SEGUNDOS and delta > ref["media"] * TOLERANCIA:
+            delta_sap = atual["media_sap"] - ref["media_sap"]
+            lentos.append({"passo": passo, "media": atual["media"], "referencia": ref["media"],
+                           "variacao": delta / ref["media"], "delta_sap": delta_sap, "delta_local": delta - delta_sap})
+    return sorted(lentos, key=lambda r: r["media"] - r["referencia"], reverse=True)
+
+
+# Texto do resumo, apontando se o aumento veio do SAP (servidor, rede, tela alterada) ou do programa
+def descreve(fluxo, modo, lentos, anteriores):
+    if len(anteriores) < MINIMO_EXECUCOES:
+        return (f"Desempenho ({fluxo}, {modo}): referência em formação "
+                f"({len(anteriores)} de {MINIMO_EXECUCOES} execuções anteriores).")
+    if not lentos:
+        return (f"Desempenho ({fluxo}, {modo}): nenhum passo mais lento que a referência "
+                f"das últimas {min(len(anteriores), JANELA_REFERENCIA)} execuções.")
+    linhas = [f"Desempenho ({fluxo}, {modo}): {len(lentos)} passo(s) mais lento(s) que a referência "
+              f"das últimas {min(len(anteriores), JANELA_REFERENCIA)} execuções:"]
+    for r in lentos:
+        origem = "no SAP" if r["delta_sap"] >= r["delta_local"] else "no programa"
+        linhas.append(f"  {r['passo']}: {r['referencia']:.2f}s -> {r['media']:.2f}s ({r['variacao']:+.0%}; "
+                      f"SAP {r['delta_sap']:+.2f}s, programa {r['delta_local']:+.2f}s; aumento maior {origem})")
+    return "\n".join(linhas)
+
+
+# Grava as estatísticas da execução no histórico e a compara com a referência do mesmo fluxo e modo
+def registra_execucao(pasta, fluxo, modo, cronometro, id_execucao=None):
+    """
+    Args:
+        pasta: pasta da planilha, onde ARQUIVO_HISTORICO é mantido.
+        fluxo: nome do fluxo ("requisicao", "pedido", "frs", "gd").
+        modo: "normal", "rapido", "rfc", "contas" ou "simulacao" (cada modo tem sua própria referência).
+        cronometro: o CronometroPassos da execução (as linhas processadas são as ocorrências do passo "linha").
+        id_execucao: identificador da execução no log (opcional).
+
+    Returns:
+        Texto do resumo (ver descreve()).
+    """
+    passos = cronometro.resumo()
+    linhas = passos.get("linha", {}).get("contagem", 0)
+    caminho = os.path.join(pasta, ARQUIVO_HISTORICO)
+    with _trava_arquivo:
+        historico = {}
+        if os.path.exists(caminho):
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    historico = json.load(f)
+            except Exception as e:
+                logging.warning(f"Não foi possível ler '{caminho}': {e}")
+        anteriores = historico.get(fluxo, {}).get(modo, [])
+        base = referencia(anteriores)
+        lentos = regressoes(passos, base)
+
+        # Execuções sem nenhuma linha processada não entram na referência
+        if linhas:
+            execucao = {"momento": time.strftime("%Y-%m-%dT%H:%M:%S"), "id_execucao": id_execucao, "linhas": linhas,
+                        "segundos": round(time.perf_counter() - cronometro.inicio, 2), "passos": passos}
+            historico.setdefault(fluxo, {})[modo] = (anteriores + [execucao])[-EXECUCOES_GUARDADAS:]
+            try:
+                with open(caminho, "w", encoding="utf-8") as f:
+                    json.dump(historico, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                logging.warning(f"Não foi possível gravar '{caminho}': {e}")
+
+    resumo = descreve(fluxo, modo, lentos, anteriores)
+    if lentos:
+        logging.warning(resumo)
+    return resumo
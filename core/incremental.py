@@ -0,0 +1,123 @@
+# Execução incremental: impressões digitais das linhas da planilha para processar só o que é novo ou mudou
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from .relatorio import COLUNAS_RELATORIO
+
+# Colunas preenchidas pelos próprios fluxos (RC/PC/FRS de uma etapa alimentam a seguinte) e, por isso,
+# fora da impressão digital: só as colunas de entrada definem se a linha mudou
+COLUNAS_RESULTADO = ('RC', 'N° LINHA DA RC', 'PC', 'FRS')
+COLUNAS_ENTRADA = [c for c in COLUNAS_RELATORIO if c not in COLUNAS_RESULTADO]
+_POSICOES_ENTRADA = [COLUNAS_RELATORIO.index(c) for c in COLUNAS_ENTRADA]
+
+# Chave de negócio que identifica a linha no índice, qualquer que seja a posição dela na planilha
+COLUNAS_CHAVE = ('Nota fiscal', 'CNPJ_Fornecedor')
+_POSICOES_CHAVE = [COLUNAS_RELATORIO.index(c) for c in COLUNAS_CHAVE]
+
+# Sufixo do arquivo do índice, gravado ao lado da planilha (ex.: hospedagem.xlsx -> hospedagem.linhas.json)
+SUFIXO_INDICE = ".linhas.json"
+
+
+# Chave de cada linha: nota fiscal (sem zeros à esquerda) e CNPJ (só dígitos); a mesma chave repetida
+# na planilha recebe "#2", "#3"... na ordem em que aparece
+def chaves(lista):
+    """
+    Args:
+        lista: linhas retornadas por _relatorio.
+
+    Returns:
+        Lista de strings, uma por linha da lista.
+    """
+    ocorrencias = {}
+    resultado = []
+    for j in lista:
+        nota, cnpj = (str(j[p]).strip() for p in _POSICOES_CHAVE)
+        chave = f"{nota.lstrip('0') or nota}|{re.sub(r'[^0-9]', '', cnpj)}"
+        ocorrencias[chave] = ocorrencias.get(chave, 0) + 1
+        resultado.append(chave if ocorrencias[chave] == 1 else f"{chave}#{ocorrencias[chave]}")
+    return resultado
+
+
+# Impressão digital (BLAKE2b de 64 bits, em hexadecimal) das colunas de entrada de uma linha
+def _resumo(j):
+    texto = "\x1f".join(str(j[p]) for p in _POSICOES_ENTRADA)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=8).hexdigest()
+
+
+# Calcula a chave e a impressão digital de cada linha
+def impressoes(lista):
+    """
+    Args:
+        lista: linhas retornadas por _relatorio.
+
+    Returns:
+        Lista de (chave, impressão digital), uma por linha da lista.
+    """
+    return list(zip(chaves(lista), (_resumo(j) for j in lista)))
+
+
+# Guarda, por fluxo, a impressão digital de cada linha já processada com sucesso
+class IndiceIncremental:
+    """
+    As linhas são identificadas pela chave de negócio (nota fiscal + CNPJ, ver chaves()), de modo que
+    inserir, apagar ou reordenar linhas na planilha não troca uma linha pela outra. Uma linha é
+    pendente para um fluxo se ainda não foi concluída nele; se foi concluída e a impressão digital
+    mudou, ela foi alterada depois de o documento SAP ter sido criado e é apenas relatada
+    (reprocessá-la criaria um documento duplicado).
+
+    Args:
+        arquivo: o caminho da planilha.
+    """
+
+    def __init__(self, arquivo):
+        self.caminho = os.path.splitext(arquivo)[0] + SUFIXO_INDICE
+        self._trava = threading.Lock()
+        self.fluxos = {}
+        if os.path.exists(self.caminho):
+            try:
+                with open(self.caminho, "r", encoding="utf-8") as f:
+                    dados = json.load(f)
+                self.fluxos = dados.get("fluxos", {})
+            except Exception as e:
+                logging.warning(f"Índice incremental '{self.caminho}' ilegível; todas as linhas serão consideradas: {e}")
+
+    # Separa as linhas pendentes e as alteradas depois de concluídas
+    def pendentes(self, fluxo, impressoes_linhas, indices):
+        """
+        Args:
+            fluxo: nome do fluxo.
+            impressoes_linhas: retorno de impressoes() para a lista inteira.
+            indices: índices da lista candidatos a processamento.
+
+        Returns:
+            (índices pendentes, índices alterados depois de concluídos).
+        """
+        concluidas = self.fluxos.get(fluxo, {})
+        pendentes, alteradas = [], []
+        for i in indices:
+            chave, impressao = impressoes_linhas[i]
+            anterior = concluidas.get(chave)
+            if anterior is None:
+                pendentes.append(i)
+            elif anterior != impressao:
+                alteradas.append(i)
+        return pendentes, alteradas
+
+    # Registra a linha concluída no fluxo (impressao = item de impressoes(): (chave, impressão digital))
+    def conclui(self, fluxo, impressao):
+        chave, resumo = impressao
+        with self._trava:
+            self.fluxos.setdefault(fluxo, {})[chave] = resumo
+
+    # Grava o índice (arquivo temporário + substituição, para não corromper o índice em caso de queda)
+    def grava(self):
+        with self._trava:
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"chave": list(COLUNAS_CHAVE), "colunas": COLUNAS_ENTRADA,
+                           "fluxos": self.fluxos}, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
@@ -0,0 +1,77 @@
+# Índice em memória dos objetos que o _pedido localiza (fornecedor, itens de RC e linhas de reserva), montado em lote
+import logging
+import re
+
+import pandas as pd
+
+from .documentos import CONTA_RESERVA
+from .exportacao import consulta_se16n
+
+
+# Mantém só os dígitos (CNPJ com ou sem pontuação)
+def _digitos(valor):
+    return re.sub(r"\D", "", str(valor))
+
+
+# Remove zeros à esquerda, como o SAP exibe números de documento e item
+def _numero(valor):
+    return str(valor).strip().lstrip("0")
+
+
+# Fornecedor por CNPJ, itens de RC em aberto e linha da reserva de cada documento de reserva de recursos
+class IndicePedido:
+    """
+    Substitui as ajudas de pesquisa (F4) do _pedido: em vez de abrir o F4 do fornecedor e o F4
+    da linha da reserva a cada pedido, três consultas ao SE16N (LFA1, EBAN e KBLP) trazem os
+    dados de todas as linhas do lote de uma vez.
+    """
+
+    def __init__(self):
+        self.fornecedores = {}
+        self.itens_rc = {}
+        self.linhas_reserva = {}
+
+    # Monta o índice para as linhas que serão processadas
+    @classmethod
+    def carrega(cls, session, linhas, pasta):
+        """
+        Args:
+            session: a sessão SAP.
+            linhas: linhas de _relatorio (j) que o _pedido vai processar.
+            pasta: pasta onde os arquivos exportados são gravados.
+
+        Returns:
+            IndicePedido preenchido.
+        """
+        indice = cls()
+        cnpjs = {_digitos(j[0]) for j in linhas if _digitos(j[0])}
+        rcs = {str(j[2]).strip() for j in linhas if not pd.isnull(j[2]) and str(j[2]).strip()}
+        reservas = {str(j[9]).strip() for j in linhas if not pd.isnull(j[9]) and str(j[9]).strip()}
+
+        if cnpjs:
+            lfa1 = consulta_se16n(session, "LFA1", {"STCD1": sorted(cnpjs)}, pasta)
+            for _, r in lfa1.iterrows():
+                indice.fornecedores.setdefault(_digitos(r["STCD1"]), r["LIFNR"].strip())
+        if rcs:
+            eban = consulta_se16n(session, "EBAN", {"BANFN": sorted(rcs)}, pasta)
+            for _, r in eban.iterrows():
+                aberto = not r.get("LOEKZ", "").strip() and not r.get("EBELN", "").strip()
+                indice.itens_rc[(_numero(r["BANFN"]), _numero(r["BNFPO"]))] = aberto
+        if reservas:
+            kblp = consulta_se16n(session, "KBLP", {"BELNR": sorted(reservas), "SAKNR": CONTA_RESERVA}, pasta)
+            for _, r in kblp.iterrows():
+                indice.linhas_reserva.setdefault(_numero(r["BELNR"]), r["BLPOS"].strip())
+
+        logging.info(f"Índice do pedido: {len(indice.fornecedores)} fornecedor(es), "
+                     f"{len(indice.itens_rc)} item(ns) de RC, {len(indice.linhas_reserva)} reserva(s).")
+        return indice
+
+    def fornecedor(self, cnpj):
+        return self.fornecedores.get(_digitos(cnpj))
+
+    # True se o item existe e não foi eliminado nem convertido em pedido; None se não está no índice
+    def item_rc_aberto(self, rc, item):
+        return self.itens_rc.get((_numero(rc), _numero(item)))
+
+    def linha_reserva(self, reserva):
+        return self.linhas_reserva.get(_numero(reserva))
@@ -0,0 +1,118 @@
+# Requisições em lotes: uma lista grande vira várias RCs menores, criadas em paralelo em sessões da mesma conexão
+import logging
+import queue
+import threading
+
+import pythoncom
+
+from .documentos import divide_requisicoes
+from .sessoes import abre_sessoes, localiza_sessao, fecha_sessao
+
+
+# Cria uma requisição por lote, distribuindo os lotes entre a sessão do fluxo e sessões extras
+class RequisicoesEmLotes:
+    """
+    Cada sessão é conduzida por uma thread própria (com o COM inicializado), que pega o próximo
+    lote da fila e executa o _requisicao apenas com as linhas dele. Os números de RC e de item
+    (AT/AU) de todas as requisições são gravados de uma só vez na planilha ao final.
+
+    Args:
+        principal: a instância de mm já conectada (sua sessão também trabalha).
+        tamanho: quantidade máxima de itens por requisição.
+        sessoes: quantidade total de sessões trabalhando em paralelo (incluindo a do fluxo).
+        agrupar_por: ver divide_requisicoes().
+    """
+
+    def __init__(self, principal, tamanho=50, sessoes=3, agrupar_por="categoria"):
+        self.principal = principal
+        self.tamanho = tamanho
+        self.sessoes = max(1, sessoes)
+        self.agrupar_por = agrupar_por
+
+    def _nova_automacao(self):
+        p = self.principal
+        automacao = type(p)(sap_user=p.user, sap_environment=p.environment, sap_logon_path=p.sap_path,
+                            metricas=p.metricas, sap_keyring_system=p.keyring_system)
+        automacao.modo_rapido = p.modo_rapido
+        automacao.id_execucao = p.id_execucao
+        automacao.controlador = p.controlador
+        automacao.ouvinte_linhas = p.ouvinte_linhas
+        automacao.vigia = p.vigia.copia() if p.vigia is not None else None
+        automacao.backend = p.backend.copia(automacao)
+        automacao.cronometro = p.cronometro
+        automacao.validar_dados_mestres = p.validar_dados_mestres
+        automacao.dados_mestres = p.dados_mestres
+        # Mesmo índice incremental da execução: os lotes já vêm filtrados e a conclusão das linhas é
+        # registrada quando a principal grava os resultados de todos os lotes
+        automacao.incremental = p.incremental
+        automacao.indice_incremental = p.indice_incremental
+        automacao._impressoes = p._impressoes
+        return automacao
+
+    # Executa os lotes de uma sessão até a fila esvaziar
+    def _trabalho(self, numero, fila, lista, arquivo, resultados, trava):
+        pythoncom.CoInitialize()
+        automacao = self._nova_automacao()
+        try:
+            automacao.session = localiza_sessao(self._usuario, self._sistema, numero)
+            automacao.cancelado = self.principal.cancelado
+            while not self.principal.cancelado.is_set():
+                try:
+                    lote = fila.get_nowait()
+                except queue.Empty:
+                    break
+                automacao.linhas_selecionadas = lote
+                automacao.resultados_acumulados = {}
+                try:
+                    automacao._requisicao(lista, arquivo)
+                except Exception as e:
+                    logging.error(f"Requisição do lote com as linhas {lote[0]+2} a {lote[-1]+2} falhou: {e}")
+                with trava:
+                    resultados.update(automacao.resultados_acumulados)
+        except Exception as e:
+            logging.error(f"Sessão {numero}: não foi possível processar lotes de requisição: {e}")
+        finally:
+            automacao._encerra_com()
+            pythoncom.CoUninitialize()
+
+    def executa(self, lista, arquivo, indices):
+        """
+        Args:
+            lista: linhas retornadas por _relatorio.
+            arquivo: o caminho da planilha.
+            indices: índices da lista a incluir nas requisições.
+
+        Returns:
+            Índices das linhas que ficaram sem requisição.
+        """
+        lotes = divide_requisicoes(lista, indices, self.tamanho, self.agrupar_por)
+        print(f"{len(indices)} linha(s) divididas em {len(lotes)} requisição(ões) de até {self.tamanho} itens.")
+        sessao = self.principal.session
+        info = sessao.Info
+        self._usuario, self._sistema = info.User, info.SystemName
+        numeros = [info.SessionNumber] + abre_sessoes(sessao, min(self.sessoes, len(lotes)) - 1)
+
+        fila = queue.Queue()
+        for lote in lotes:
+            fila.put(lote)
+        resultados, trava = {}, threading.Lock()
+        threads = [threading.Thread(target=self._trabalho, args=(numero, fila, lista, arquivo, resultados, trava),
+                                    name=f"rc-sessao-{numero}", daemon=True) for numero in numeros]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Fecha as sessões extras abertas para os lotes
+        for k in range(sessao.Parent.Children.Count - 1, -1, -1):
+            extra = sessao.Parent.Children(k)
+            if extra.Info.SessionNumber in numeros[1:]:
+                fecha_sessao(extra)
+
+        if resultados:
+            self.principal._grava_resultados(arquivo, resultados)
+        sem_rc = [i for i in indices if i + 2 not in resultados]
+        print(f"Requisições em lotes: {len(resultados)} linha(s) com RC, {len(sem_rc)} sem RC.")
+        for i in sem_rc:
+            print(f"AVISO: Linha {i+2} ficou sem requisição.")
+        return sem_rc
@@ -0,0 +1,333 @@
+# Contadores e histogramas das automações, expostos em HTTP (formato Prometheus) e em arquivo JSON
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites (em segundos) dos histogramas de latência e limites dos histogramas de contagem
+LIMITES_SEGUNDOS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+LIMITES_CHAMADAS = (10, 25, 50, 100, 150, 200, 300, 500, 1000)
+
+PREFIXO = "hospedagem_"
+
+
+# Histograma cumulativo simples, no mesmo modelo do Prometheus
+class Histograma:
+    def __init__(self, limites):
+        self.limites = tuple(limites)
+        self.baldes = [0] * len(self.limites)
+        self.contagem = 0
+        self.soma = 0.0
+
+    def observa(self, valor):
+        self.contagem += 1
+        self.soma += valor
+        for indice, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.baldes[indice] += 1
+
+    def como_dict(self):
+        return {
+            "limites": list(self.limites),
+            "baldes": list(self.baldes),
+            "contagem": self.contagem,
+            "soma": round(self.soma, 6),
+        }
+
+
+# Registro de métricas de uma execução (thread-safe)
+class Metricas:
+    """
+    Guarda contadores, medidores e histogramas rotulados por fluxo.
+
+    Métricas publicadas:
+        linhas_total{fluxo, resultado}: linhas concluídas ("ok") ou com erro ("falha").
+        linha_segundos{fluxo}: latência de cada linha.
+        chamadas_com_por_linha{fluxo}: chamadas de scripting feitas por linha.
+        tempo_segundos_total{fluxo, origem}: tempo esperando o SAP ("sap") e gravando a planilha ("excel").
+        passo_segundos{fluxo, passo}: duração de cada passo do fluxo (ex.: "lanca_frs", "planilha").
+        fila_linhas{fluxo}: linhas que ainda faltam processar.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._contadores = {}
+        self._medidores = {}
+        self._histogramas = {}
+        self._linha_atual = threading.local()
+        self._servidor = None
+        self._parar_json = None
+
+    # ----------------------- Registro -----------------------
+    @staticmethod
+    def _chave(nome, rotulos):
+        return nome, tuple(sorted(rotulos.items()))
+
+    def incrementa(self, nome, valor=1, **rotulos):
+        chave = self._chave(nome, rotulos)
+        with self._trava:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def define(self, nome, valor, **rotulos):
+        with self._trava:
+            self._medidores[self._chave(nome, rotulos)] = valor
+
+    def observa(self, nome, valor, limites=LIMITES_SEGUNDOS, **rotulos):
+        chave = self._chave(nome, rotulos)
+        with self._trava:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma(limites)
+            histograma.observa(valor)
+
+    # ----------------------- Acumuladores da linha em andamento -----------------------
+    # Cada thread acumula as chamadas ao SAP da sua linha atual
+    def inicia_linha(self):
+        self._linha_atual.chamadas = 0
+        self._linha_atual.segundos_sap = 0.0
+
+    def registra_chamada(self, segundos):
+        self._linha_atual.chamadas = getattr(self._linha_atual, "chamadas", 0) + 1
+        self._linha_atual.segundos_sap = getattr(self._linha_atual, "segundos_sap", 0.0) + segundos
+
+    # Tempo esperando o SAP acumulado pela thread desde o início da linha atual
+    def segundos_sap_linha(self):
+        return getattr(self._linha_atual, "segundos_sap", 0.0)
+
+    def finaliza_linha(self, fluxo, segundos, sucesso):
+        chamadas = getattr(self._linha_atual, "chamadas", 0)
+        segundos_sap = getattr(self._linha_atual, "segundos_sap", 0.0)
+        self.incrementa("linhas_total", fluxo=fluxo, resultado="ok" if sucesso else "falha")
+        self.observa("linha_segundos", segundos, fluxo=fluxo)
+        self.observa("chamadas_com_por_linha", chamadas, limites=LIMITES_CHAMADAS, fluxo=fluxo)
+        self.incrementa("tempo_segundos_total", segundos_sap, fluxo=fluxo, origem="sap")
+        self.inicia_linha()
+
+    # ----------------------- Leitura -----------------------
+    # Valores de uma métrica somados por um rótulo (leitura leve, sem formatar as demais métricas)
+    def agregado(self, nome, por=None):
+        """
+        Args:
+            nome: nome da métrica (sem o prefixo).
+            por: rótulo que separa os totais (ex.: "origem"); None soma todos os rótulos.
+
+        Returns:
+            Contadores e medidores: dict {valor do rótulo: soma}.
+            Histogramas: dict {valor do rótulo: {"baldes", "contagem", "soma"}} (baldes cumulativos).
+            A chave é None quando `por` é None ou a métrica não tem o rótulo.
+        """
+        totais = {}
+        with self._trava:
+            for dados in (self._contadores, self._medidores):
+                for (n, rotulos), valor in dados.items():
+                    if n == nome:
+                        chave = dict(rotulos).get(por) if por else None
+                        totais[chave] = totais.get(chave, 0) + valor
+            for (n, rotulos), h in self._histogramas.items():
+                if n != nome:
+                    continue
+                chave = dict(rotulos).get(por) if por else None
+                total = totais.setdefault(chave, {"baldes": [0] * len(h.baldes), "contagem": 0, "soma": 0.0})
+                total["baldes"] = [a + b for a, b in zip(total["baldes"], h.baldes)]
+                total["contagem"] += h.contagem
+                total["soma"] += h.soma
+        return totais
+
+    # ----------------------- Exportação -----------------------
+    def instantaneo(self):
+        """
+        Returns:
+            dict serializável em JSON com o estado atual de todas as métricas.
+        """
+        def _formata(chave):
+            nome, rotulos = chave
+            return {"nome": PREFIXO + nome, "rotulos": dict(rotulos)}
+
+        with self._trava:
+            return {
+                "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "contadores": [dict(_formata(c), valor=v) for c, v in self._contadores.items()],
+                "medidores": [dict(_formata(c), valor=v) for c, v in self._medidores.items()],
+                "histogramas": [dict(_formata(c), **h.como_dict()) for c, h in self._histogramas.items()],
+            }
+
+    def texto_prometheus(self):
+        """
+        Returns:
+            As métricas no formato de exposição em texto do Prometheus (versão 0.0.4).
+        """
+        def _rotulos(rotulos, extra=()):
+            pares = list(rotulos) + list(extra)
+            if not pares:
+                return ""
+            return "{" + ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"')) for k, v in pares) + "}"
+
+        linhas = []
+        with self._trava:
+            for tipo, dados in (("counter", self._contadores), ("gauge", self._medidores)):
+                for nome in sorted({c[0] for c in dados}):
+                    linhas.append("# TYPE {}{} {}".format(PREFIXO, nome, tipo))
+                    for (n, rotulos), valor in dados.items():
+                        if n == nome:
+                            linhas.append("{}{}{} {}".format(PREFIXO, nome, _rotulos(rotulos), valor))
+            for nome in sorted({c[0] for c in self._histogramas}):
+                linhas.append("# TYPE {}{} histogram".format(PREFIXO, nome))
+                for (n, rotulos), h in self._histogramas.items():
+                    if n != nome:
+                        continue
+                    for limite, quantidade in zip(h.limites, h.baldes):
+                        linhas.append("{}{}_bucket{} {}".format(PREFIXO, nome, _rotulos(rotulos, [("le", limite)]), quantidade))
+                    linhas.append("{}{}_bucket{} {}".format(PREFIXO, nome, _rotulos(rotulos, [("le", "+Inf")]), h.contagem))
+                    linhas.append("{}{}_sum{} {}".format(PREFIXO, nome, _rotulos(rotulos), h.soma))
+                    linhas.append("{}{}_count{} {}".format(PREFIXO, nome, _rotulos(rotulos), h.contagem))
+        return "\n".join(linhas) + "\n"
+
+    def grava_json(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.instantaneo(), f, ensure_ascii=False, indent=2)
+
+    # Publica as métricas em http://127.0.0.1:<porta>/metrics (texto) e /metrics.json
+    def inicia_servidor(self, porta=9108, endereco="127.0.0.1"):
+        if self._servidor is not None:
+            return self._servidor
+        metricas = self
+
+        class _Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    corpo = json.dumps(metricas.instantaneo(), ensure_ascii=False).encode("utf-8")
+                    tipo = "application/json; charset=utf-8"
+                elif self.path.startswith("/metrics"):
+                    corpo = metricas.texto_prometheus().encode("utf-8")
+                    tipo = "text/plain; version=0.0.4; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                pass  # não polui o log da aplicação a cada coleta
+
+        self._servidor = ThreadingHTTPServer((endereco, porta), _Tratador)
+        threading.Thread(target=self._servidor.serve_forever, name="metricas-http", daemon=True).start()
+        logging.info(f"Métricas disponíveis em http://{endereco}:{porta}/metrics")
+        return self._servidor
+
+    # Grava periodicamente o instantâneo das métricas em um arquivo JSON
+    def inicia_exportacao_json(self, caminho, intervalo=15):
+        self.para_exportacao_json()
+        parar = self._parar_json = threading.Event()
+
+        def _laco():
+            while not parar.wait(intervalo):
+                try:
+                    self.grava_json(caminho)
+                except Exception as e:
+                    logging.warning(f"Falha ao gravar métricas em '{caminho}': {e}")
+            try:
+                self.grava_json(caminho)  # última gravação ao encerrar
+            except Exception:
+                pass
+
+        threading.Thread(target=_laco, name="metricas-json", daemon=True).start()
+
+    def para_exportacao_json(self):
+        if self._parar_json is not None:
+            self._parar_json.set()
+            self._parar_json = None
+
+    def para(self):
+        self.para_exportacao_json()
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+# Proxy de objetos do SAP GUI Scripting que mede cada chamada COM (métodos, leitura e escrita de propriedades)
+class SessaoMedida:
+    """
+    Envolve a sessão (ou qualquer objeto retornado por ela, como findById) e registra
+    em Metricas o tempo gasto em cada chamada ao SAP.
+
+    Args:
+        alvo: o objeto COM original.
+        metricas: o registro de métricas que recebe as medições.
+        id_elemento: o ID usado no findById que retornou o objeto (se houver).
+        ouvinte: função opcional chamada como ouvinte(metodo, id_elemento, segundos) após cada chamada.
+        vigia: Vigia opcional (core/vigia.py) que acompanha o prazo de cada chamada e responde a popups
+               conhecidos quando uma chamada falha (a chamada é então repetida uma vez).
+        registro: RegistroProxies opcional (core/recursos_com.py) que recebe cada proxy criado e o
+                  libera ao fim do passo em que foi obtido.
+    """
+
+    def __init__(self, alvo, metricas, id_elemento=None, ouvinte=None, vigia=None, registro=None):
+        object.__setattr__(self, "_alvo", alvo)
+        object.__setattr__(self, "_metricas", metricas)
+        object.__setattr__(self, "_id", id_elemento)
+        object.__setattr__(self, "_ouvinte", ouvinte)
+        object.__setattr__(self, "_vigia", vigia)
+        object.__setattr__(self, "_registro", registro)
+
+    def _embrulha(self, valor, id_elemento=None):
+        # Objetos COM (sessão, janelas, campos, coleções) continuam sendo medidos
+        if hasattr(valor, "_oleobj_"):
+            proxy = SessaoMedida(valor, self._metricas, id_elemento, self._ouvinte, self._vigia, self._registro)
+            if self._registro is not None:
+                self._registro.registra(proxy)
+            return proxy
+        return valor
+
+    # Solta a referência ao objeto COM (o SAP GUI libera o objeto quando não resta nenhuma)
+    def _libera(self):
+        object.__setattr__(self, "_alvo", None)
+
+    def _objeto(self):
+        alvo = self._alvo
+        if alvo is None:
+            raise RuntimeError(f"Objeto COM '{self._id or '?'}' já liberado: obtenha-o de novo no passo atual.")
+        return alvo
+
+    def _mede(self, metodo, funcao, *args):
+        vigia = self._vigia
+        if vigia is not None:
+            vigia.inicia_passo(metodo, self._id)
+        inicio = time.perf_counter()
+        try:
+            try:
+                return funcao(*args)
+            except Exception:
+                if vigia is None or not vigia.trata_falha():
+                    raise
+                return funcao(*args)
+        finally:
+            if vigia is not None:
+                vigia.conclui_passo()
+            segundos = time.perf_counter() - inicio
+            self._metricas.registra_chamada(segundos)
+            if self._ouvinte is not None:
+                self._ouvinte(metodo, self._id, segundos)
+
+    def __getattr__(self, nome):
+        inicio = time.perf_counter()
+        valor = getattr(self._objeto(), nome)
+        if callable(valor) and not hasattr(valor, "_oleobj_"):
+            # Método: a chamada ao SAP acontece quando ele for invocado
+            def _chama(*args):
+                id_elemento = args[0] if args and nome.lower() == "findbyid" else None
+                return self._embrulha(self._mede(nome, valor, *args), id_elemento)
+            return _chama
+        self._metricas.registra_chamada(time.perf_counter() - inicio)
+        return self._embrulha(valor)
+
+    def __setattr__(self, nome, valor):
+        self._mede(nome, setattr, self._objeto(), nome, valor)
+
+    def __call__(self, *args):
+        # Coleções COM são indexadas por chamada, ex.: application.Children(0)
+        return self._embrulha(self._mede("__call__", self._objeto(), *args))
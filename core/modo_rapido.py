@@ -0,0 +1,80 @@
+# Modo rápido: executa os fluxos com a interface da sessão SAP travada e a janela minimizada
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+# Arquivo, na pasta da planilha, com a última vazão medida por fluxo e por modo
+ARQUIVO_VAZAO = "desempenho_modos.json"
+
+
+# Trava a UI da sessão e minimiza a janela principal; ao sair (fim, erro ou cancelamento) sempre restaura
+@contextmanager
+def tela_suprimida(session):
+    """
+    Args:
+        session: a sessão SAP (GuiSession) usada pelo fluxo.
+    """
+    travada = False
+    try:
+        session.LockSessionUI()
+        travada = True
+    except Exception as e:
+        logging.warning(f"Não foi possível travar a UI da sessão SAP: {e}")
+    try:
+        session.findById("wnd[0]").iconify()
+    except Exception as e:
+        logging.warning(f"Não foi possível minimizar a janela do SAP: {e}")
+    try:
+        yield
+    finally:
+        if travada:
+            try:
+                session.UnlockSessionUI()
+            except Exception as e:
+                logging.error(f"Falha ao destravar a UI da sessão SAP: {e}")
+        try:
+            session.findById("wnd[0]").maximize()
+        except Exception:
+            pass
+
+
+# Registra a vazão do fluxo e a compara com a última execução no outro modo
+def registra_vazao(pasta, fluxo, rapido, linhas, segundos):
+    """
+    Args:
+        pasta: pasta da planilha, onde ARQUIVO_VAZAO é mantido.
+        fluxo: nome do fluxo ("requisicao", "pedido", "frs", "gd").
+        rapido: True se a execução foi em modo rápido.
+        linhas: linhas processadas na execução.
+        segundos: duração da execução.
+
+    Returns:
+        Texto do resumo, ex.: "Vazão (frs, modo rápido): 12.4 linhas/min | modo normal: 8.1 linhas/min (+53%)".
+    """
+    vazao = linhas * 60 / segundos if segundos > 0 else 0.0
+    modo, outro = ("rapido", "normal") if rapido else ("normal", "rapido")
+    caminho = os.path.join(pasta, ARQUIVO_VAZAO)
+
+    historico = {}
+    if os.path.exists(caminho):
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                historico = json.load(f)
+        except Exception as e:
+            logging.warning(f"Não foi possível ler '{caminho}': {e}")
+
+    resumo = "Vazão ({}, modo {}): {:.1f} linhas/min".format(fluxo, "rápido" if rapido else "normal", vazao)
+    anterior = historico.get(fluxo, {}).get(outro)
+    if anterior:
+        variacao = (vazao - anterior) / anterior if anterior else 0.0
+        resumo += " | modo {}: {:.1f} linhas/min ({:+.0%})".format("rápido" if not rapido else "normal", anterior, variacao)
+
+    if linhas:
+        historico.setdefault(fluxo, {})[modo] = round(vazao, 2)
+        try:
+            with open(caminho, "w", encoding="utf-8") as f:
+                json.dump(historico, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logging.warning(f"Não foi possível gravar '{caminho}': {e}")
+    return resumo
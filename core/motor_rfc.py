@@ -0,0 +1,536 @@
+# Motor RFC: os mesmos documentos dos fluxos criados por BAPIs, com conexões reaproveitadas e commit em lotes
+import datetime as dt
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import textwrap
+import threading
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+
+from .documentos import (GRUPO_COMPRADORES, GRUPO_MERCADORIAS, UNIDADE_SERVICO, RESPONSAVEL_FRS,
+                         INCOTERMS, CODIGO_IVA, CONTA_RESERVA, categoria_contabil, divide_requisicoes)
+
+try:
+    import pyrfc  # opcional: SAP NW RFC SDK + pyrfc
+except Exception:
+    pyrfc = None
+
+# Parâmetros da conexão RFC, na pasta da planilha (ex.: {"ashost": "...", "sysnr": "00", "client": "100"})
+ARQUIVO_RFC = "sap_rfc.json"
+
+# Quantos documentos são criados antes de cada BAPI_TRANSACTION_COMMIT
+TAMANHO_COMMIT = 20
+
+
+# Lê os parâmetros da conexão RFC da pasta da planilha (None se o arquivo não existir)
+def carrega_parametros(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_RFC)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Data da planilha (dd.mm.aaaa) no formato das BAPIs (AAAAMMDD)
+def _data(texto):
+    return dt.datetime.strptime(str(texto).strip(), "%d.%m.%Y").strftime("%Y%m%d")
+
+
+# Valor da planilha ("1234,56") como Decimal
+def _valor(texto):
+    try:
+        return Decimal(str(texto).strip().replace(".", "").replace(",", ".") if "," in str(texto) else str(texto).strip())
+    except InvalidOperation:
+        raise ValueError(f"valor inválido: '{texto}'")
+
+
+def _digitos(valor):
+    return re.sub(r"\D", "", str(valor))
+
+
+def _vazio(valor):
+    return valor is None or pd.isnull(valor) or not str(valor).strip()
+
+
+# Mensagens de erro (tipos E e A) da tabela RETURN de uma BAPI
+def erros(retorno):
+    if isinstance(retorno, dict):
+        retorno = [retorno]
+    return [m.get("MESSAGE", "") for m in retorno or [] if m.get("TYPE") in ("E", "A")]
+
+
+# Conjunto de conexões RFC abertas uma vez e reaproveitadas entre fluxos e execuções
+class PoolRfc:
+    """
+    Args:
+        parametros: parâmetros de pyrfc.Connection (ashost, sysnr, client, user, passwd, ...).
+        tamanho: quantidade máxima de conexões abertas.
+        fabrica: função que abre uma conexão (padrão: pyrfc.Connection); permite usar ConexaoSimulada.
+    """
+
+    def __init__(self, parametros, tamanho=2, fabrica=None):
+        if fabrica is None:
+            if pyrfc is None:
+                raise RuntimeError("pyrfc não está instalado; instale o SAP NW RFC SDK e o pacote pyrfc")
+            fabrica = pyrfc.Connection
+        self.parametros = dict(parametros)
+        self.tamanho = tamanho
+        self._fabrica = fabrica
+        self._livres = queue.LifoQueue()
+        self._abertas = 0
+        self._trava = threading.Lock()
+
+    # Empresta uma conexão (abre uma nova se nenhuma estiver livre e o limite permitir)
+    @contextmanager
+    def empresta(self):
+        conexao = None
+        try:
+            conexao = self._livres.get_nowait()
+        except queue.Empty:
+            with self._trava:
+                if self._abertas < self.tamanho:
+                    self._abertas += 1
+                    try:
+                        conexao = self._fabrica(**self.parametros)
+                    except Exception:
+                        self._abertas -= 1
+                        raise
+            if conexao is None:
+                conexao = self._livres.get()
+        try:
+            yield conexao
+        except Exception as e:
+            # Conexão interrompida no meio de uma chamada: descartada em vez de voltar ao pool
+            if pyrfc is not None and isinstance(e, pyrfc.CommunicationError):
+                with self._trava:
+                    self._abertas -= 1
+                try:
+                    conexao.close()
+                except Exception:
+                    pass
+                conexao = None
+            raise
+        finally:
+            if conexao is not None:
+                self._livres.put(conexao)
+
+    def fecha(self):
+        while True:
+            try:
+                conexao = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conexao.close()
+            except Exception:
+                pass
+        with self._trava:
+            self._abertas = 0
+
+
+# Conexão RFC local, sem SAP: aceita as chamadas do motor e devolve números de documento sequenciais
+class ConexaoSimulada:
+    """
+    Usada para validar o mapeamento dos campos e medir o motor sem um servidor SAP. Todas as
+    chamadas ficam em `chamadas` ((função, parâmetros)); os documentos só "existem" após o commit.
+
+    Args:
+        fornecedores: dict {CNPJ (só dígitos): número do fornecedor} respondido na leitura da LFA1.
+        falhas: conjunto de notas fiscais cujas BAPIs devolvem erro.
+    """
+
+    def __init__(self, fornecedores=None, falhas=(), **parametros):
+        self.parametros = parametros
+        self.fornecedores = dict(fornecedores or {})
+        self.falhas = set(falhas)
+        self.chamadas = []
+        self.confirmados = []
+        self._pendentes = []
+        self._numeros = {"BAPI_REQUISITION_CREATE": itertools.count(10000000),
+                         "BAPI_PO_CREATE1": itertools.count(4500000000),
+                         "BAPI_ENTRYSHEET_CREATE": itertools.count(1000000000)}
+
+    def call(self, funcao, **parametros):
+        self.chamadas.append((funcao, parametros))
+        if funcao == "BAPI_TRANSACTION_COMMIT":
+            self.confirmados.extend(self._pendentes)
+            self._pendentes = []
+            return {"RETURN": {}}
+        if funcao == "BAPI_TRANSACTION_ROLLBACK":
+            self._pendentes = []
+            return {"RETURN": {}}
+        if funcao == "RFC_READ_TABLE":
+            return self._le_tabela(parametros)
+        nota = json.dumps(parametros, default=str)
+        if any(f'"{n}"' in nota for n in self.falhas):
+            return {"RETURN": [{"TYPE": "E", "MESSAGE": "erro simulado"}]}
+        numero = str(next(self._numeros[funcao]))
+        self._pendentes.append((funcao, numero))
+        campo = {"BAPI_REQUISITION_CREATE": "NUMBER", "BAPI_PO_CREATE1": "EXPPURCHASEORDER",
+                 "BAPI_ENTRYSHEET_CREATE": "ENTRYSHEET"}[funcao]
+        return {campo: numero, "RETURN": [{"TYPE": "S", "MESSAGE": f"documento {numero} criado"}]}
+
+    def _le_tabela(self, parametros):
+        if parametros.get("QUERY_TABLE") != "LFA1":
+            return {"DATA": [], "FIELDS": []}
+        dados = [{"WA": f"{fornecedor}|{cnpj}"} for cnpj, fornecedor in self.fornecedores.items()]
+        return {"DATA": dados, "FIELDS": [{"FIELDNAME": "LIFNR"}, {"FIELDNAME": "STCD1"}]}
+
+    def close(self):
+        pass
+
+
+# Lê uma tabela por RFC_READ_TABLE com os valores de um campo em lotes (a cláusula WHERE tem limite de tamanho)
+def le_tabela(conexao, tabela, campos, campo_filtro, valores, condicao_extra="", lote=50):
+    """
+    Returns:
+        Lista de dicts {campo: valor (texto, sem espaços)}.
+    """
+    registros = []
+    valores = sorted(set(valores))
+    for k in range(0, len(valores), lote):
+        lista = ", ".join(f"'{v}'" for v in valores[k:k + lote])
+        clausula = f"{campo_filtro} IN ( {lista} )" + (f" AND {condicao_extra}" if condicao_extra else "")
+        # Cada linha de OPTIONS aceita até 72 caracteres
+        opcoes = [{"TEXT": trecho} for trecho in textwrap.wrap(clausula, 72)]
+        resultado = conexao.call("RFC_READ_TABLE", QUERY_TABLE=tabela, DELIMITER="|",
+                                 FIELDS=[{"FIELDNAME": c} for c in campos], OPTIONS=opcoes)
+        nomes = [f["FIELDNAME"] for f in resultado.get("FIELDS", [])] or list(campos)
+        for linha in resultado.get("DATA", []):
+            registros.append(dict(zip(nomes, (v.strip() for v in linha["WA"].split("|")))))
+    return registros
+
+
+# ----------------------- Mapeamento das linhas (j) para os parâmetros das BAPIs -----------------------
+# Requisição: um item de serviço por linha, com a classificação contábil pela mesma regra do _requisicao
+def monta_requisicao(linhas, centro, tipo="NB"):
+    """
+    Args:
+        linhas: lista de (i, j) na ordem dos itens.
+        centro: centro (WERKS) dos itens.
+        tipo: tipo de documento da requisição.
+
+    Returns:
+        (parâmetros de BAPI_REQUISITION_CREATE, lista de (i, número do item)).
+    """
+    itens, contas, servicos, atribuicoes, numeros = [], [], [], [], []
+    hoje = dt.date.today().strftime("%Y%m%d")
+    for n, (i, j) in enumerate(linhas, start=1):
+        item = f"{n * 10:05d}"
+        pacote, subpacote = 2 * n - 1, 2 * n
+        categoria = categoria_contabil(j[11])
+        itens.append({"PREQ_ITEM": item, "DOC_TYPE": tipo, "PUR_GROUP": GRUPO_COMPRADORES,
+                      "SHORT_TEXT": f"HOSPEDAGEM NF {j[10]}", "TRACKINGNO": str(j[10]),
+                      "MAT_GRP": GRUPO_MERCADORIAS, "PLANT": centro, "ACCTASSCAT": categoria,
+                      "ITEM_CAT": "9", "QUANTITY": Decimal(1), "UNIT": "AU", "DELIV_DATE": hoje,
+                      "PCKG_NO": f"{pacote:010d}"})
+        conta = {"PREQ_ITEM": item, "SERIAL_NO": "01"}
+        if categoria == "K":
+            conta["COST_CTR"] = j[11]
+        elif categoria == "N":
+            conta.update(NETWORK=j[11][0:10], ACTIVITY=j[11][-4:])
+        else:
+            conta["WBS_ELEM"] = j[11]
+        contas.append(conta)
+        servicos.append({"PCKG_NO": f"{pacote:010d}", "LINE_NO": "0000000001", "OUTL_IND": "X",
+                         "SUBPCKG_NO": f"{subpacote:010d}"})
+        servicos.append({"PCKG_NO": f"{subpacote:010d}", "LINE_NO": "0000000002",
+                         "SHORT_TEXT": f"HOSPEDAGEM NF {j[10]}", "QUANTITY": Decimal(1),
+                         "BASE_UOM": UNIDADE_SERVICO, "GR_PRICE": _valor(j[12])})
+        atribuicoes.append({"PCKG_NO": f"{subpacote:010d}", "LINE_NO": "0000000002", "SERNO_LINE": "01",
+                            "PERCENTAGE": Decimal(100), "SERIAL_NO": "01"})
+        numeros.append((i, n * 10))
+    parametros = {"REQUISITION_ITEMS": itens, "REQUISITION_ACCOUNT_ASSIGNMENT": contas,
+                  "REQUISITION_SERVICES": servicos, "REQUISITION_SRV_ACCASS_VALUES": atribuicoes}
+    return parametros, numeros
+
+
+# Pedido a partir do item da RC, com o fornecedor (pelo CNPJ), o texto de cabeçalho e a reserva de recursos
+def monta_pedido(j, fornecedor, linha_reserva=None, empresa="01", tipo="NB"):
+    cabecalho = {"COMP_CODE": empresa, "DOC_TYPE": tipo, "VENDOR": fornecedor,
+                 "PUR_GROUP": GRUPO_COMPRADORES, "INCOTERMS1": INCOTERMS}
+    item = {"PO_ITEM": "00010", "PREQ_NO": str(j[2]), "PREQ_ITEM": f"{int(float(j[3])):05d}", "TAX_CODE": CODIGO_IVA}
+    parametros = {
+        "POHEADER": cabecalho, "POHEADERX": {c: "X" for c in cabecalho},
+        "POITEM": [item], "POITEMX": [dict({c: "X" for c in item}, PO_ITEM="00010", PO_ITEMX="X")],
+        "POTEXTHEADER": [{"TEXT_ID": "F01", "TEXT_FORM": "*",
+                          "TEXT_LINE": f"{j[4]} - {j[5]} - {j[8]} - {j[6]} a {j[7]}"}],
+    }
+    if not _vazio(j[9]):
+        conta = {"PO_ITEM": "00010", "SERIAL_NO": "01", "EARMARKED_FUNDS": str(j[9])}
+        if linha_reserva:
+            conta["EF_ITEM"] = f"{int(linha_reserva):03d}"
+        parametros["POACCOUNT"] = [conta]
+        parametros["POACCOUNTX"] = [dict({c: "X" for c in conta}, PO_ITEM="00010", SERIAL_NO="01")]
+    return parametros
+
+
+# Folha de registro de serviço com os campos do _frs (cabeçalho, aceite e o serviço pelo valor da nota)
+def monta_frs(j):
+    return {
+        "ENTRYSHEETHEADER": {
+            "PO_NUMBER": str(j[13]), "PO_ITEM": "00010", "SHORT_TEXT": f"PGTO {str(j[14])[:30]}",
+            "EXT_NUMBER": str(j[10]), "LOCATION": str(j[15]), "BEGDATE": _data(j[6]), "ENDDATE": _data(j[7]),
+            "PERSON_INT": RESPONSAVEL_FRS, "DOC_DATE": _data(j[1]), "REF_DOC_NO": str(j[10]),
+            "HEADER_TXT": "PGTO HOSPEDAGEM", "ACCEPTANCE": "X", "PCKG_NO": "0000000001",
+        },
+        "ENTRYSHEETSERVICES": [
+            {"PCKG_NO": "0000000001", "LINE_NO": "0000000001", "OUTL_IND": "X", "SUBPCKG_NO": "0000000002"},
+            {"PCKG_NO": "0000000002", "LINE_NO": "0000000002", "SHORT_TEXT": f"HOSPEDAGEM NF {j[10]}",
+             "QUANTITY": Decimal(1), "BASE_UOM": UNIDADE_SERVICO, "GR_PRICE": _valor(j[12])},
+        ],
+    }
+
+
+# Executa os fluxos por RFC sobre a mesma iteração das linhas (_percorre) e a mesma gravação da planilha
+class MotorRfc:
+    """
+    Cada documento é criado pela BAPI correspondente e confirmado com BAPI_TRANSACTION_COMMIT a
+    cada `tamanho_commit` linhas; os números só são gravados na planilha depois do commit. Um
+    documento recusado desfaz a LUW (BAPI_TRANSACTION_ROLLBACK) e os demais são recriados.
+    Protocolos (GD) não têm BAPI padrão: o fluxo de GD continua pelo SAP GUI.
+
+    Args:
+        pool: PoolRfc.
+        centro: centro dos itens de requisição.
+        empresa: empresa dos pedidos.
+        tipo_requisicao / tipo_pedido: tipos de documento.
+        tamanho_commit: documentos por commit.
+    """
+
+    FLUXOS = ("requisicao", "pedido", "frs")
+
+    def __init__(self, pool, centro="", empresa="01", tipo_requisicao="NB", tipo_pedido="NB",
+                 tamanho_commit=TAMANHO_COMMIT):
+        self.pool = pool
+        self.centro = centro
+        self.empresa = empresa
+        self.tipo_requisicao = tipo_requisicao
+        self.tipo_pedido = tipo_pedido
+        self.tamanho_commit = tamanho_commit
+
+    # Cria o motor a partir do arquivo de parâmetros na pasta da planilha (None se não houver)
+    @classmethod
+    def da_pasta(cls, pasta, usuario, senha, fabrica=None):
+        parametros = carrega_parametros(pasta)
+        if parametros is None:
+            return None
+        opcoes = {k: parametros.pop(k) for k in ("centro", "empresa", "tipo_requisicao", "tipo_pedido",
+                                                   "tamanho_commit", "conexoes") if k in parametros}
+        parametros.setdefault("user", usuario)
+        parametros.setdefault("passwd", senha)
+        pool = PoolRfc(parametros, opcoes.pop("conexoes", 2), fabrica)
+        return cls(pool, **opcoes)
+
+    def suporta(self, fluxo):
+        return fluxo in self.FLUXOS
+
+    # dados_mestres: o cache carregado pelo mm (None = sem validação); a GD não passa pelo motor e o
+    # pedido não tem dados mestres a conferir
+    def executa(self, automacao, fluxo, lista, arquivo, dados_mestres=None):
+        if fluxo == "pedido":
+            return self.pedido(automacao, lista, arquivo)
+        getattr(self, fluxo)(automacao, lista, arquivo, dados_mestres)
+
+    # Chama a BAPI de criação de um documento; devolve (número ou None, mensagens de erro)
+    def _chama(self, conexao, automacao, documento):
+        with automacao._passo(documento["funcao"], remoto=True):
+            retorno = conexao.call(documento["funcao"], **documento["parametros"])
+        mensagens = erros(retorno.get("RETURN"))
+        if mensagens or not retorno.get(documento["campo"]):
+            return None, mensagens
+        return int(retorno[documento["campo"]]), []
+
+    def _desfaz(self, conexao, automacao):
+        with automacao._passo("BAPI_TRANSACTION_ROLLBACK", remoto=True):
+            conexao.call("BAPI_TRANSACTION_ROLLBACK")
+
+    # Cria um documento na LUW em andamento e confirma a LUW ao chegar a tamanho_commit linhas
+    def _cria(self, conexao, automacao, arquivo, luw, funcao, campo, parametros, resultados, confirmados=None):
+        """
+        Se a BAPI recusar o documento, a LUW é desfeita (BAPI_TRANSACTION_ROLLBACK), para que nada do
+        documento recusado chegue ao commit, e os documentos da LUW que tinham dado certo são criados
+        de novo, cada um com o seu próprio commit.
+
+        Args:
+            luw: documentos criados e ainda não confirmados (lista mantida pelo fluxo).
+            funcao / campo: a BAPI de criação e o campo do retorno com o número do documento.
+            parametros: parâmetros da BAPI.
+            resultados: função número -> {linha da planilha: {coluna: valor}}.
+            confirmados: chamada com os resultados de cada commit (ex.: anexos dos pedidos).
+
+        Returns:
+            (número do documento ou None, mensagens de erro da BAPI).
+        """
+        documento = {"funcao": funcao, "campo": campo, "parametros": parametros, "resultados": resultados}
+        numero, mensagens = self._chama(conexao, automacao, documento)
+        if numero is None:
+            self._desfaz(conexao, automacao)
+            self._recria(conexao, automacao, arquivo, luw, confirmados)
+            return None, mensagens
+        documento["numero"], documento["valores"] = numero, resultados(numero)
+        luw.append(documento)
+        if sum(len(d["valores"]) for d in luw) >= self.tamanho_commit:
+            self._confirma(conexao, automacao, arquivo, luw, confirmados)
+        return numero, []
+
+    # Depois de um rollback: recria os documentos desfeitos, um commit por documento (os números mudam)
+    def _recria(self, conexao, automacao, arquivo, luw, confirmados=None):
+        desfeitos = list(luw)
+        luw.clear()
+        for documento in desfeitos:
+            linhas = sorted(documento["valores"])
+            numero, mensagens = self._chama(conexao, automacao, documento)
+            if numero is None:
+                self._desfaz(conexao, automacao)
+                logging.error(f"{documento['funcao']} das linhas {linhas} recusada ao recriar após o rollback: "
+                              f"{'; '.join(mensagens)}")
+                print(f"Erro: o documento {documento['numero']} (linhas {', '.join(map(str, linhas))}) foi desfeito "
+                      f"pelo rollback e não pôde ser recriado: {'; '.join(mensagens)}")
+                for linha in linhas:
+                    automacao._notifica_linha(linha - 2, "falha")
+                continue
+            print(f"Documento {documento['numero']} desfeito pelo rollback e recriado como {numero}.")
+            documento["numero"], documento["valores"] = numero, documento["resultados"](numero)
+            luw.append(documento)
+            self._confirma(conexao, automacao, arquivo, luw, confirmados)
+
+    # Confirma os documentos da LUW e grava seus números na planilha
+    def _confirma(self, conexao, automacao, arquivo, luw, confirmados=None):
+        if not luw:
+            return
+        with automacao._passo("BAPI_TRANSACTION_COMMIT", remoto=True):
+            retorno = conexao.call("BAPI_TRANSACTION_COMMIT", WAIT="X")
+        mensagens = erros(retorno.get("RETURN"))
+        if mensagens:
+            raise RuntimeError(f"commit recusado: {'; '.join(mensagens)}")
+        resultados = {}
+        for documento in luw:
+            resultados.update(documento["valores"])
+        automacao._grava_resultados(arquivo, resultados)
+        if confirmados is not None:
+            confirmados(resultados)
+        luw.clear()
+
+    # ----------------------- Fluxos -----------------------
+    def requisicao(self, automacao, lista, arquivo, dados_mestres=None):
+        """
+        As RCs são montadas a partir das linhas pendentes, antes de percorrê-las: cada RC é criada ao
+        chegar à primeira linha do seu lote, e as linhas do lote são concluídas (ou registradas como
+        falha, se a BAPI recusar a RC) uma a uma pelo _percorre, que também atende ao cancelamento.
+        Com várias estações, as linhas chegam conforme as reservas: uma RC por linha. Linhas com dado
+        mestre inválido ficam fora das RCs e são registradas como falha antes das demais.
+        """
+        hoje = dt.date.today().strftime("%d/%m/%Y")
+        indices = list(automacao._indices_do_fluxo(lista, "requisicao", arquivo))
+        if not indices:
+            print("Nenhuma linha a incluir na requisição.")
+            return
+        invalidas = [] if dados_mestres is None else [
+            i for i in indices if dados_mestres.problemas("requisicao", lista[i])]
+        recusadas = set(invalidas)
+        indices = [i for i in indices if i not in recusadas]
+        # Mesma divisão do modo em lotes: uma RC por grupo de classificação contábil, com até N itens
+        if automacao.coordenador is not None:
+            lotes = [[i] for i in indices]
+        else:
+            lotes = divide_requisicoes(lista, indices, automacao.tamanho_lote_requisicao or len(indices),
+                                       automacao.agrupar_requisicao_por)
+        lote_da_linha = {i: k for k, lote in enumerate(lotes) for i in lote}
+        criadas = {}
+        with self.pool.empresta() as conexao:
+            luw = []
+            ordem = invalidas + [i for lote in lotes for i in lote]
+            for i, j in automacao._percorre(lista, "requisicao", arquivo, ordem):
+                if automacao._dados_mestres_invalidos(dados_mestres, "requisicao", i, j):
+                    continue
+                k = lote_da_linha[i]
+                if k not in criadas:
+                    parametros, itens = monta_requisicao([(linha, lista[linha]) for linha in lotes[k]], self.centro,
+                                                         self.tipo_requisicao)
+                    criadas[k] = self._cria(
+                        conexao, automacao, arquivo, luw, "BAPI_REQUISITION_CREATE", "NUMBER", parametros,
+                        lambda numero, itens=itens: {linha + 2: {'AT': numero, 'AU': item, 'AS': hoje, 'AV': hoje}
+                                                     for linha, item in itens})
+                    if criadas[k][0] is not None:
+                        print('RC nº {}'.format(criadas[k][0]))
+                numero, mensagens = criadas[k]
+                if numero is None:
+                    automacao._marca_falha()
+                    print(f"Erro ao processar requisição da linha {i+2}: {'; '.join(mensagens)}")
+            self._confirma(conexao, automacao, arquivo, luw)
+
+    def pedido(self, automacao, lista, arquivo):
+        hoje = dt.date.today().strftime("%d/%m/%Y")
+        # Os anexos (NF) continuam pelo SAP GUI, na sessão de anexos, e só depois do commit do pedido
+        session = automacao._sessao_medida()
+        pasta = os.path.dirname(arquivo)
+        anexos = automacao._inicia_anexos(session, pasta) if session else None
+        notas = {}
+
+        def _anexa(confirmados):
+            if session is None:
+                return
+            for linha, valores in confirmados.items():
+                automacao._anexa_nf(session, anexos, valores['AY'], pasta, "NF {}.pdf".format(notas[linha]))
+
+        try:
+            self._cria_pedidos(automacao, lista, arquivo, hoje, notas, _anexa)
+        finally:
+            if anexos is not None:
+                anexos.finaliza()
+
+    def _cria_pedidos(self, automacao, lista, arquivo, hoje, notas, anexa):
+        with self.pool.empresta() as conexao:
+            # Fornecedores e linhas de reserva de todas as linhas em duas leituras
+            fornecedores = {_digitos(r["STCD1"]): r["LIFNR"] for r in le_tabela(
+                conexao, "LFA1", ["LIFNR", "STCD1"], "STCD1", {_digitos(j[0]) for j in lista if _digitos(j[0])})}
+            reservas = {str(j[9]).strip() for j in lista if not _vazio(j[9])}
+            linhas_reserva = {}
+            if reservas:
+                for r in le_tabela(conexao, "KBLP", ["BELNR", "BLPOS"], "BELNR", reservas,
+                                   f"SAKNR = '{CONTA_RESERVA}'"):
+                    linhas_reserva.setdefault(r["BELNR"].lstrip("0"), r["BLPOS"])
+
+            luw = []
+            for i, j in automacao._percorre(lista, "pedido", arquivo):
+                fornecedor = fornecedores.get(_digitos(j[0]))
+                if fornecedor is None:
+                    automacao._marca_falha()
+                    print(f"Erro ao processar pedido da linha {i+2}: fornecedor do CNPJ {j[0]} não encontrado")
+                    continue
+                reserva = None if _vazio(j[9]) else linhas_reserva.get(str(j[9]).strip().lstrip("0"))
+                notas[i + 2] = j[10]
+                pc, mensagens = self._cria(
+                    conexao, automacao, arquivo, luw, "BAPI_PO_CREATE1", "EXPPURCHASEORDER",
+                    monta_pedido(j, fornecedor, reserva, self.empresa, self.tipo_pedido),
+                    lambda pc, linha=i + 2: {linha: {'AY': pc, 'AX': hoje, 'AZ': hoje}}, anexa)
+                if pc is None:
+                    automacao._marca_falha()
+                    print(f"Erro ao processar pedido da linha {i+2}: {'; '.join(mensagens)}")
+                    continue
+                print(pc)
+            self._confirma(conexao, automacao, arquivo, luw, anexa)
+
+    def frs(self, automacao, lista, arquivo, dados_mestres=None):
+        hoje = dt.date.today().strftime("%d/%m/%Y")
+        with self.pool.empresta() as conexao:
+            luw = []
+            for i, j in automacao._percorre(lista, "frs", arquivo):
+                if automacao._dados_mestres_invalidos(dados_mestres, "frs", i, j):
+                    continue
+                frs, mensagens = self._cria(
+                    conexao, automacao, arquivo, luw, "BAPI_ENTRYSHEET_CREATE", "ENTRYSHEET", monta_frs(j),
+                    lambda frs, linha=i + 2: {linha: {'BB': frs, 'BC': hoje, 'BD': hoje}})
+                if frs is None:
+                    automacao._marca_falha()
+                    print(f"Erro ao processar FRS da linha {i+2}: {'; '.join(mensagens)}")
+                    continue
+                print(frs)
+            self._confirma(conexao, automacao, arquivo, luw)
@@ -0,0 +1,65 @@
+# Máquina de estados de tela: evita reiniciar a transação quando o SAP já está na tela de partida da próxima linha
+import logging
+
+
+# Acompanha a transação e o dynpro atuais da sessão e decide a navegação mínima até a tela de partida
+class Navegador:
+    """
+    Na primeira vez que um fluxo entra em uma transação, o Navegador grava a tela de partida
+    (transação, programa, dynpro e janela ativa). Nas linhas seguintes, se a sessão já estiver
+    exatamente nessa tela (por exemplo, o ME21N volta para um pedido novo após gravar), a
+    navegação é pulada e o fluxo só preenche os campos da linha.
+
+    A tela só é reaproveitada se a linha anterior terminou sem erro; depois de uma falha o
+    fluxo sempre reinicia a transação (ver invalida()).
+    """
+
+    def __init__(self, metricas=None):
+        self.metricas = metricas
+        self.telas_de_partida = {}
+        self._confiavel = False
+
+    # Lê (transação, programa, dynpro, janela ativa) direto do objeto Info da sessão
+    @staticmethod
+    def tela_atual(session):
+        try:
+            info = session.Info
+            return (info.Transaction, info.Program, info.ScreenNumber, session.ActiveWindow.Name)
+        except Exception as e:
+            logging.warning(f"Não foi possível ler a tela atual da sessão: {e}")
+            return None
+
+    # Chamado quando uma linha falha: o estado da tela deixa de ser confiável
+    def invalida(self):
+        self._confiavel = False
+
+    # Garante que a sessão está na tela de partida da transação, navegando só quando necessário
+    def vai_para(self, session, transacao, entrar, fluxo=None):
+        """
+        Args:
+            session: a sessão SAP.
+            transacao: código da transação de destino (ex.: "ML81N").
+            entrar: função que executa a navegação completa, como o fluxo sempre fez
+                    (ex.: starttransaction + sendVKey(0)).
+            fluxo: rótulo das métricas.
+
+        Returns:
+            True se a navegação foi executada, False se a tela atual foi reaproveitada.
+        """
+        transacao = transacao.upper()
+        partida = self.telas_de_partida.get(transacao)
+        if self._confiavel and partida is not None and self.tela_atual(session) == partida:
+            self._registra(fluxo, "reaproveitada")
+            return False
+
+        entrar()
+        tela = self.tela_atual(session)
+        if tela is not None and tela[0].upper() == transacao:
+            self.telas_de_partida[transacao] = tela
+        self._confiavel = True
+        self._registra(fluxo, "completa")
+        return True
+
+    def _registra(self, fluxo, tipo):
+        if self.metricas is not None:
+            self.metricas.incrementa("navegacoes_total", fluxo=fluxo, tipo=tipo)
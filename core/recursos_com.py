@@ -0,0 +1,185 @@
+# Ciclo de vida dos proxies COM do SAP GUI Scripting e acompanhamento de memória e handles em execuções longas
+import logging
+import os
+import threading
+import weakref
+
+try:
+    import psutil  # opcional: memória residente (RSS) e handles dos processos
+except Exception:
+    psutil = None
+
+# A cada quantas linhas os recursos são amostrados
+INTERVALO_LINHAS = 100
+# Crescimento, desde a primeira amostra da execução, que gera um aviso no log
+LIMITE_PROXIES = 500
+LIMITE_RSS_MB = 200
+LIMITE_HANDLES = 2000
+
+# Processo do SAP GUI, que também acumula um objeto para cada proxy não liberado
+PROCESSOS_SAP = ("saplogon.exe", "sapgui.exe")
+
+
+# Registro dos proxies criados pela SessaoMedida: liberados ao fim do passo em que foram obtidos
+class RegistroProxies:
+    """
+    Cada findById devolve um proxy COM novo, que prende um objeto no processo do SAP GUI até ser
+    liberado. Os proxies obtidos dentro de um escopo (um passo do fluxo, uma linha) são liberados
+    quando o escopo termina ou quando a sessão troca de transação (libera_escopo()). Um proxy
+    usado em vários passos (ex.: a grade da RC) precisa ser retido com retem(); os retidos e os
+    criados fora de escopo são liberados em libera_tudo(), ao fim do fluxo.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._vivos = weakref.WeakSet()
+        self._retidos = weakref.WeakSet()
+        self._escopos = threading.local()
+        self.criados = 0
+        self.liberados = 0
+
+    def _pilha(self):
+        pilha = getattr(self._escopos, "pilha", None)
+        if pilha is None:
+            pilha = self._escopos.pilha = []
+        return pilha
+
+    # Chamado pela SessaoMedida a cada proxy novo
+    def registra(self, proxy):
+        with self._trava:
+            self._vivos.add(proxy)
+            self.criados += 1
+        pilha = self._pilha()
+        if pilha:
+            pilha[-1].append(proxy)
+
+    # Mantém o proxy vivo entre passos (até libera_tudo())
+    def retem(self, proxy):
+        with self._trava:
+            self._retidos.add(proxy)
+        return proxy
+
+    def _libera(self, proxies):
+        with self._trava:
+            for proxy in proxies:
+                if proxy in self._retidos or proxy not in self._vivos:
+                    continue
+                self._vivos.discard(proxy)
+                self.liberados += 1
+                proxy._libera()
+
+    def abre_escopo(self):
+        escopo = []
+        self._pilha().append(escopo)
+        return escopo
+
+    def fecha_escopo(self, escopo):
+        pilha = self._pilha()
+        if escopo in pilha:
+            pilha.remove(escopo)
+        self._libera(escopo)
+
+    # Troca de tela: os proxies obtidos até aqui no escopo atual apontam para a tela anterior
+    def libera_escopo(self):
+        pilha = self._pilha()
+        if pilha:
+            escopo = pilha[-1]
+            self._libera(list(escopo))
+            escopo.clear()
+
+    # Fim do fluxo: libera todos os proxies ainda vivos, inclusive os retidos
+    def libera_tudo(self):
+        with self._trava:
+            vivos = list(self._vivos)
+            self._retidos.clear()
+        self._libera(vivos)
+
+    def vivos(self):
+        with self._trava:
+            return len(self._vivos)
+
+
+# Memória residente (MB) e handles (Windows) ou descritores abertos de um processo; (None, None) sem psutil
+def _uso(processo):
+    if processo is None:
+        return None, None
+    try:
+        rss = processo.memory_info().rss / 2 ** 20
+        handles = processo.num_handles() if hasattr(processo, "num_handles") else processo.num_fds()
+        return rss, handles
+    except Exception:
+        return None, None
+
+
+# Amostra, a cada INTERVALO_LINHAS, proxies vivos, RSS e handles deste processo e do SAP GUI
+class MonitorRecursos:
+    """
+    A primeira amostra da execução é a referência; quando o crescimento passa de LIMITE_PROXIES,
+    LIMITE_RSS_MB ou LIMITE_HANDLES, um aviso é registrado no log (uma vez por indicador). Sem o
+    psutil, só os proxies vivos são acompanhados.
+
+    Args:
+        registro: o RegistroProxies do mm.
+        metricas: registro de métricas (medidores proxies_com_vivos, memoria_rss_mb e handles).
+        intervalo_linhas: linhas entre duas amostras.
+    """
+
+    def __init__(self, registro, metricas, intervalo_linhas=INTERVALO_LINHAS):
+        self.registro = registro
+        self.metricas = metricas
+        self.intervalo_linhas = intervalo_linhas
+        self._processos = None
+        self._referencia = None
+        self._avisados = set()
+
+    def _localiza_processos(self):
+        processos = {}
+        if psutil is not None:
+            processos["python"] = psutil.Process(os.getpid())
+            try:
+                for p in psutil.process_iter(["name"]):
+                    if (p.info.get("name") or "").lower() in PROCESSOS_SAP:
+                        processos["sapgui"] = p
+                        break
+            except Exception as e:
+                logging.debug(f"Processo do SAP GUI não localizado: {e}")
+        return processos
+
+    # Nova execução: a próxima amostra vira a referência
+    def inicia(self):
+        self._processos = self._localiza_processos()
+        self._referencia = None
+        self._avisados = set()
+
+    def amostra(self, fluxo, linhas):
+        """
+        Args:
+            fluxo: rótulo das métricas.
+            linhas: linhas concluídas até aqui na execução.
+
+        Returns:
+            dict {indicador: valor} da amostra (ex.: "proxies", "python_rss_mb", "sapgui_handles").
+        """
+        if self._processos is None:
+            self.inicia()
+        valores = {"proxies": self.registro.vivos()}
+        for nome, processo in self._processos.items():
+            rss, handles = _uso(processo)
+            if rss is not None:
+                valores[f"{nome}_rss_mb"] = round(rss, 1)
+                valores[f"{nome}_handles"] = handles
+                self.metricas.define("memoria_rss_mb", round(rss, 1), processo=nome)
+                self.metricas.define("handles", handles, processo=nome)
+        self.metricas.define("proxies_com_vivos", valores["proxies"], fluxo=fluxo)
+        if self._referencia is None:
+            self._referencia = valores
+            return valores
+        for indicador, valor in valores.items():
+            limite = (LIMITE_PROXIES if indicador == "proxies" else
+                      LIMITE_RSS_MB if indicador.endswith("_rss_mb") else LIMITE_HANDLES)
+            crescimento = valor - self._referencia.get(indicador, valor)
+            if crescimento > limite and indicador not in self._avisados:
+                self._avisados.add(indicador)
+                logging.warning(f"Recursos ({fluxo}): {indicador} cresceu {crescimento:.0f} em {linhas} linha(s) "
+                                f"({self._referencia[indicador]} -> {valor}); possível vazamento de objetos COM.")
+        return valores
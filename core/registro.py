@@ -0,0 +1,139 @@
+# Registro (logging) assíncrono: os fluxos só enfileiram; formatação JSON e gravação em disco ficam em outra thread
+import datetime as dt
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import uuid
+
+# Arquivo JSON lines (um registro por linha) e rotação por tamanho
+ARQUIVO_LOG = "automacao.jsonl"
+TAMANHO_MAXIMO = 5 * 1024 * 1024
+COPIAS = 5
+
+# Campos de correlação anexados a cada registro, a partir do contexto da thread que o emitiu
+CAMPOS_CONTEXTO = ("execucao", "conta", "fluxo", "arquivo", "linha")
+
+_contexto = threading.local()
+_manipulador = None
+_ouvinte = None
+
+
+# Gera um identificador curto para uma execução (compartilhado pelas contas de uma execução fragmentada)
+def novo_id_execucao():
+    return uuid.uuid4().hex[:12]
+
+
+# Define campos de correlação da thread atual (None remove o campo)
+def define_contexto(**campos):
+    for campo, valor in campos.items():
+        if valor is None:
+            _contexto.__dict__.pop(campo, None)
+        else:
+            setattr(_contexto, campo, valor)
+
+
+def limpa_contexto():
+    _contexto.__dict__.clear()
+
+
+# Copia o contexto da thread emissora para o registro (executa na thread do fluxo, por isso é só atribuição)
+class _FiltroContexto(logging.Filter):
+    def filter(self, record):
+        for campo in CAMPOS_CONTEXTO:
+            if not hasattr(record, campo):
+                setattr(record, campo, getattr(_contexto, campo, None))
+        return True
+
+
+# QueueHandler sem formatação: a mensagem só é montada pelo ouvinte, fora da thread que conduz o SAP
+class _ManipuladorFila(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # A fila é do mesmo processo, então o registro não precisa ser serializado aqui
+        return record
+
+
+# Um objeto JSON por linha, com os campos de correlação presentes
+class FormatadorJson(logging.Formatter):
+    def format(self, record):
+        dados = {
+            "momento": dt.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "origem": record.name,
+            "thread": record.threadName,
+            "mensagem": record.getMessage(),
+        }
+        for campo in CAMPOS_CONTEXTO:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                dados[campo] = valor
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+# Repassa avisos e erros para o stdout atual (na interface, o log da janela)
+class _ManipuladorTela(logging.Handler):
+    def emit(self, record):
+        try:
+            sys.stdout.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+
+# Configura o logger raiz com a fila e inicia a thread que formata e grava os registros
+def inicia_registro(pasta, nivel=logging.INFO, nivel_tela=logging.WARNING, tamanho_maximo=TAMANHO_MAXIMO,
+                    copias=COPIAS):
+    """
+    Args:
+        pasta: pasta onde o arquivo ARQUIVO_LOG (e suas cópias rotacionadas) é mantido.
+        nivel: nível mínimo gravado no arquivo.
+        nivel_tela: nível mínimo repassado ao stdout (None para não repassar).
+        tamanho_maximo: tamanho, em bytes, a partir do qual o arquivo é rotacionado.
+        copias: quantidade de arquivos rotacionados mantidos.
+
+    Returns:
+        O caminho do arquivo de log.
+    """
+    global _manipulador, _ouvinte
+    para_registro()
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, ARQUIVO_LOG)
+
+    arquivo = logging.handlers.RotatingFileHandler(caminho, maxBytes=tamanho_maximo, backupCount=copias,
+                                                   encoding="utf-8", delay=True)
+    arquivo.setFormatter(FormatadorJson())
+    arquivo.setLevel(nivel)
+    destinos = [arquivo]
+    if nivel_tela is not None:
+        tela = _ManipuladorTela()
+        tela.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+        tela.setLevel(nivel_tela)
+        destinos.append(tela)
+
+    fila = queue.Queue(-1)
+    _manipulador = _ManipuladorFila(fila)
+    _manipulador.addFilter(_FiltroContexto())
+    raiz = logging.getLogger()
+    raiz.addHandler(_manipulador)
+    raiz.setLevel(min(nivel, nivel_tela) if nivel_tela is not None else nivel)
+
+    _ouvinte = logging.handlers.QueueListener(fila, *destinos, respect_handler_level=True)
+    _ouvinte.start()
+    return caminho
+
+
+# Esvazia a fila, encerra a thread do ouvinte e fecha o arquivo
+def para_registro():
+    global _manipulador, _ouvinte
+    if _manipulador is not None:
+        logging.getLogger().removeHandler(_manipulador)
+        _manipulador = None
+    if _ouvinte is not None:
+        _ouvinte.stop()
+        for destino in _ouvinte.handlers:
+            destino.close()
+        _ouvinte = None
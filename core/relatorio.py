@@ -0,0 +1,54 @@
+# Leitura e normalização da planilha de hospedagem usada por mm._relatorio
+import pandas as pd
+
+# Colunas essenciais para efetuar a automação, na ordem em que os fluxos as acessam (j[0] ... j[17])
+COLUNAS_RELATORIO = ['CNPJ_Fornecedor', 'Data Emissao', 'RC', 'N° LINHA DA RC',
+                     'Matricula', 'Passageiro', 'Data In', 'Data Out', 'Requisicao de Viagem',
+                     'Reserva de Recurso', 'Nota fiscal', 'Centro de Custo', 'Liquido a Pagar',
+                     'PC', 'Fornecedor', 'DOMICILIO', 'FRS', 'SST']
+
+
+# Lê a planilha com o pandas (uma única leitura do arquivo)
+def le_planilha(arquivo):
+    """
+    Lê a planilha validada como texto.
+
+    Args:
+        arquivo: o caminho da pasta com o nome da planilha validada.
+
+    Returns:
+        DataFrame com todas as colunas da planilha, em formato string.
+    """
+    # Lê dados da planilha (a pasta de trabalho carregada antes pelo openpyxl não era usada: só dobrava a leitura)
+    data = pd.read_excel(arquivo, dtype=str)
+    return data
+
+
+# Ajusta os dados no formato esperado pelo SAP, principalmente datas e campos de texto
+def normaliza(data):
+    """
+    Normaliza as colunas e seleciona as essenciais para a automação.
+
+    Args:
+        data: DataFrame retornado por le_planilha.
+
+    Returns:
+        DataFrame apenas com as colunas de COLUNAS_RELATORIO.
+    """
+    # Normaliza colunas: datas no formato dd.MM.yyyy, remove pontuação, troca ponto por vírgula,
+    # converte o formato para string
+    data['CNPJ_Fornecedor']  = data['CNPJ_Fornecedor'].astype(str)
+    data['Data Emissao'] = pd.to_datetime(data['Data Emissao'].astype(str))
+    data['Data Emissao'] = data['Data Emissao'].dt.strftime('%d.%m.%Y')
+    data['Data In'] = pd.to_datetime(data['Data In'].astype(str))
+    data['Data In'] = data['Data In'].dt.strftime('%d.%m.%Y')
+    data['Data Out'] = pd.to_datetime(data['Data Out'].astype(str))
+    data['Data Out'] = data['Data Out'].dt.strftime('%d.%m.%Y')
+    data['Matricula']=data['Matricula'].str.replace('.','').replace('-','')
+    data['Matricula']=data['Matricula'].str.replace('-','')
+    data['Liquido a Pagar']  = data['Liquido a Pagar'].astype(str)
+    data['Liquido a Pagar'] = data['Liquido a Pagar'].str.replace('.', ',')
+    data['SST']  = data['SST'].astype(str)
+    # Seleciona colunas essenciais para efetuar a automação
+    selecao = data[COLUNAS_RELATORIO]
+    return selecao
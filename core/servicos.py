@@ -8,27 +8,139 @@ import keyring
 import pandas as pd
 from openpyxl import load_workbook
 import logging
+import os
+import threading
+import functools
+import gc
+from contextlib import nullcontext, contextmanager
+from .relatorio import le_planilha, normaliza
+from .metricas import Metricas, SessaoMedida
+from .modo_rapido import tela_suprimida, registra_vazao
+from .navegacao import Navegador
+from .registro import define_contexto, limpa_contexto, novo_id_execucao
+from .indice_pedido import IndicePedido
+from .anexos import TrabalhadorAnexos
+from .incremental import IndiceIncremental, impressoes
+from .lotes_requisicao import RequisicoesEmLotes
+from .conciliacao import concilia_execucao
+from .vigia import LinhaAbortada
+from .backends import BackendGui
+from .arvore_tela import fotografa
+from .documentos import item_requisicao, pedido, folha_servico, protocolo
+from .bdc import gera_bdc_frs, carrega_roteiro
+from .historico_desempenho import CronometroPassos, registra_execucao
+from .dados_mestres import CacheDadosMestres
+from .recursos_com import RegistroProxies, MonitorRecursos
+from .celulas_xlsx import grava_celulas, EstruturaNaoSuportada
+
+# Mede o fluxo inteiro (linhas e passos) e, ao final, compara a execução com o histórico de desempenho
+def _medido(fluxo):
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def executa(self, lista, arquivo):
+            # Lotes de requisição e contas são partes de uma execução: usam o cronômetro de quem as criou
+            if self.resultados_acumulados is not None:
+                if self.cronometro is None:
+                    self.cronometro = CronometroPassos()
+                return metodo(self, lista, arquivo)
+            self.cronometro = CronometroPassos()
+            try:
+                return metodo(self, lista, arquivo)
+            finally:
+                self._conclui_desempenho(fluxo, arquivo)
+        return executa
+    return decorador
+
 
 # Responsável por orquestrar a automação SAP
 class mm:
     # Inicia a sessão com as configurações do SAP(usuário, ambiente e caminho do saplogon)
-    def __init__(self, sap_user: str, sap_environment: str, sap_logon_path: str):
+    def __init__(self, sap_user: str, sap_environment: str, sap_logon_path: str, metricas: Metricas = None,
+                 sap_keyring_system: str = "saplogon"):
         """
         Args:
             sap_user (str): O nome de usuário SAP.
             sap_environment (str): O nome exato da conexão no SAP Logon.
             sap_logon_path (str): O caminho para o executável saplogon.
+            metricas (Metricas): Registro onde as métricas da execução são acumuladas (opcional).
+            sap_keyring_system (str): O "Sistema" sob o qual a senha foi cadastrada no keyring.
         """
         self.user = sap_user
         self.environment = sap_environment
         self.sap_path = sap_logon_path
+        self.keyring_system = sap_keyring_system
         self.session = None
+        self.metricas = metricas or Metricas()
+        self._fluxo_atual = None
+        self._falhou = False
+        self._planilha = None
+        # Grava só as células alteradas direto no XML da planilha (ver core/celulas_xlsx.py); se a planilha
+        # tiver algo que a gravação direta não trata, a execução passa a usar o openpyxl. Opcional, marcado na janela
+        self.gravacao_direta = False
+        # Linhas concluídas aguardando gravação: a planilha é gravada a cada gravar_a_cada linhas e ao fim do fluxo
+        self.gravar_a_cada = 10
+        self._gravacoes_pendentes = {}
+        # Lê a tela com uma única chamada (GetObjectTree, SAP GUI 7.70+); se o SAP GUI não oferecer, a execução
+        # passa a consultar controle por controle (ver core/arvore_tela.py)
+        self.arvore_tela = True
+        # Linhas da lista a processar (None = todas) e, se for um dict, acumulador dos resultados
+        # em vez de gravar na planilha (usado na execução com várias contas)
+        self.linhas_selecionadas = None
+        self.resultados_acumulados = None
+        # Controlador de concorrência compartilhado entre contas (ControladorAIMD), se houver
+        self.controlador = None
+        # Modo rápido: UI da sessão travada, janela minimizada e sem maximize() a cada linha
+        self.modo_rapido = False
+        self.cancelado = threading.Event()
+        # Acompanha a tela atual para não reiniciar transações sem necessidade entre as linhas
+        self.navegador = Navegador(self.metricas)
+        # Identificador da execução nos registros de log (None = um novo a cada fluxo)
+        self.id_execucao = None
+        # Monta, antes do _pedido, o índice de fornecedores, itens de RC e reservas (evita as ajudas de pesquisa);
+        # opcional, marcado na janela: as consultas ao SE16N dependem das autorizações do usuário
+        self.usar_indice_pedido = False
+        # Envia os anexos dos pedidos por outra sessão SAP, sem bloquear a criação do próximo pedido
+        # (opcional, marcado na janela: ocupa uma das sessões da conexão durante o fluxo)
+        self.anexos_em_paralelo = False
+        # Execução incremental: só as linhas novas (ou ainda não concluídas) no fluxo são processadas
+        self.incremental = False
+        self.indice_incremental = None
+        self._impressoes = None
+        # Coordenação entre estações (Coordenador): as linhas vêm de reservas em um banco compartilhado
+        self.coordenador = None
+        # Requisições em lotes: acima deste número de itens, a lista vira várias RCs criadas em paralelo
+        # (None = uma única requisição com todas as linhas, como sempre foi)
+        self.tamanho_lote_requisicao = None
+        self.sessoes_requisicao = 3
+        self.agrupar_requisicao_por = "categoria"
+        # Chamado a cada mudança de estado de uma linha (i, estado), ex.: a tabela de linhas da janela
+        self.ouvinte_linhas = None
+        # Vigia de travamentos e popups inesperados (core/vigia.py); None = desligado
+        self.vigia = None
+        # Motor RFC (core/motor_rfc.py): requisição, pedido e FRS criados por BAPIs em vez das telas
+        self.motor_rfc = None
+        # Backend de execução (core/backends.py): como os documentos chegam ao SAP. O padrão são as telas
+        # do SAP GUI; o BackendGravacao só registra as operações (simulação e medições de vazão)
+        self.backend = BackendGui(self)
+        # Tempos dos passos da execução em andamento (core/historico_desempenho.py)
+        self.cronometro = None
+        # Confere centros de custo, redes/operações, PEP e domicílios no cache local antes de chamar o SAP
+        # (opcional: marcado na janela, pois as consultas ao SE16N dependem das autorizações do usuário)
+        self.validar_dados_mestres = False
+        self.dados_mestres = None
+        # Proxies COM liberados ao fim de cada passo e linha; memória e handles amostrados a cada N linhas
+        self.proxies = RegistroProxies()
+        self.monitor_recursos = MonitorRecursos(self.proxies, self.metricas)
+        self._com_inicializado = False
 
     # Tenta reutilizar uma conexão do SAP já aberta
-    def _encontra_sessao_existente(self):
+    def _encontra_sessao_existente(self, exigir_usuario=False):
             """
             Verifica se já existe uma sessão SAP aberta para o ambiente especificado.
 
+            Args:
+                exigir_usuario: se True, só reutiliza sessões logadas com self.user.
+
             Returns:
                 session: O objeto de sessão se encontrado, senão None.
             """
@@ -48,6 +160,8 @@ class mm:
                     # Verifica se o nome do ambiente corresponde
                     if self.environment in connection.Description:
                         session = connection.Children(0) # Pega a primeira sessão da conexão
+                        if exigir_usuario and session.Info.User.upper() != self.user.upper():
+                            continue
                         logging.info(f"Sessão SAP encontrada para o ambiente '{self.environment}'. Reutilizando.")
                         return session
                 return None
@@ -68,20 +182,55 @@ class mm:
             raise   
 
     # Cria conexão com SAP, preenchendo usuário e senha
+    def _novo_login(self):
+        """
+        Abre uma nova conexão no SAP Logon e efetua o login com a senha cadastrada no keyring.
+
+        Returns:
+            session: A sessão da nova conexão, ou None se o login falhar.
+        """
+        senha = keyring.get_password(self.keyring_system, self.user)
+        if not senha:
+            logging.error(f"Nenhuma senha cadastrada no keyring para o usuário '{self.user}' e sistema '{self.keyring_system}'.")
+            return None
+        try:
+            try:
+                SapGuiAuto = win32com.client.GetObject("SAPGUI")
+            except Exception:
+                self._inicia_sap_gui()
+                SapGuiAuto = win32com.client.GetObject("SAPGUI")
+            application = SapGuiAuto.GetScriptingEngine
+            connection = application.OpenConnection(self.environment, True)
+            session = connection.Children(0)
+            session.findById("wnd[0]/usr/txtRSYST-BNAME").text = self.user
+            session.findById("wnd[0]/usr/pwdRSYST-BCODE").text = senha
+            session.findById("wnd[0]").sendVKey(0)
+            logging.info(f"Login SAP efetuado com o usuário '{self.user}'.")
+            return session
+        except Exception as e:
+            logging.error(f"Falha no login SAP do usuário '{self.user}' em '{self.environment}': {e}")
+            return None
 
     # Tenta encontra sessão existente; caso contrário, efetua novo acesso
-    def _conecta(self):
+    def _conecta(self, exigir_usuario=False):
         """
         Ponto de entrada principal para obter uma sessão SAP.
 
         Verifica se uma sessão já existe. Se não, cria uma nova.
+
+        Args:
+            exigir_usuario: se True, só reutiliza uma sessão já logada com self.user
+                            (necessário quando várias contas trabalham ao mesmo tempo).
         """
         
         # Inicializa o ambiente COM (Component Object Model) que interage com o Excel e SAP GUI Scripting, por exemplo.
-        pythoncom.CoInitialize()
+        # Uma vez por instância: _encerra_com() faz o CoUninitialize correspondente
+        if not self._com_inicializado:
+            pythoncom.CoInitialize()
+            self._com_inicializado = True
 
         # Verifica se já existe uma sessão aberta e a retorna
-        self.session = self._encontra_sessao_existente()
+        self.session = self._encontra_sessao_existente(exigir_usuario)
         if self.session:
             return self.session
 
@@ -99,43 +248,315 @@ class mm:
             arquivo: o caminho da pasta com o nome da planilha validada.
             
         """
-        # Padroniza e calcula datas auxiliares
-        hoje = dt.date.today().strftime("%d/%m/%Y")
-        dia = dt.date.today()
-        tdelta = dt.timedelta(days=30)
-        mes = dia + tdelta
-        mes = mes.strftime("%d.%m.%Y")
-        # Abre a planilha
-        wb = load_workbook(arquivo)
-        ws = wb.active
-        # Lê dados da planilha
-        data = pd.read_excel(arquivo, dtype=str)
-        # Normaliza colunas: datas no formato dd.MM.yyyy, remove pontuação, troca ponto por vírgula,
-        # converte o formato para string
-        data['CNPJ_Fornecedor']  = data['CNPJ_Fornecedor'].astype(str)
-        data['Data Emissao'] = pd.to_datetime(data['Data Emissao'].astype(str))
-        data['Data Emissao'] = data['Data Emissao'].dt.strftime('%d.%m.%Y')
-        data['Data In'] = pd.to_datetime(data['Data In'].astype(str))
-        data['Data In'] = data['Data In'].dt.strftime('%d.%m.%Y')
-        data['Data Out'] = pd.to_datetime(data['Data Out'].astype(str))
-        data['Data Out'] = data['Data Out'].dt.strftime('%d.%m.%Y')
-        data['Matricula']=data['Matricula'].str.replace('.','').replace('-','')
-        data['Matricula']=data['Matricula'].str.replace('-','')
-        data['Liquido a Pagar']  = data['Liquido a Pagar'].astype(str)
-        data['Liquido a Pagar'] = data['Liquido a Pagar'].str.replace('.', ',')
-        data['SST']  = data['SST'].astype(str)
-        # Seleciona colunas essenciais para efetuar a automação 
-        selecao = data[['CNPJ_Fornecedor', 'Data Emissao', 'RC', 'N° LINHA DA RC', 
-                        'Matricula', 'Passageiro', 'Data In', 'Data Out', 'Requisicao de Viagem',
-                        'Reserva de Recurso', 'Nota fiscal', 'Centro de Custo', 'Liquido a Pagar',
-                        'PC', 'Fornecedor','DOMICILIO', 'FRS', 'SST']] 
+        # Lê a planilha e normaliza as colunas essenciais (ver core/relatorio.py)
+        data = le_planilha(arquivo)
+        selecao = normaliza(data)
         # Imprime as cinco últimas linhas da planilha para uma inspeção rápida
         print(selecao.tail())
         # Retorna uma lista
         lista = selecao.values.tolist()
         return lista
     
+    # Devolve a sessão envolvida pelo proxy que mede as chamadas ao SAP
+    def _sessao_medida(self):
+        if not self.session:
+            return None
+        ouvinte = self.controlador.observa_chamada if self.controlador is not None else None
+        return SessaoMedida(self.session, self.metricas, ouvinte=ouvinte, vigia=self.vigia, registro=self.proxies)
+
+    # Fim do fluxo: libera os proxies COM e a sessão e encerra o COM da thread (par do CoInitialize do _conecta)
+    def _encerra_com(self):
+        self.proxies.libera_tudo()
+        self.session = None
+        gc.collect()
+        if self._com_inicializado:
+            self._com_inicializado = False
+            pythoncom.CoUninitialize()
+
+    # Percorre as linhas de um fluxo, registrando as métricas da execução e de cada linha
+    def _percorre(self, lista, fluxo, arquivo, indices=None):
+        """
+        Gera (i, j) para cada linha da lista, como enumerate, medindo latência, chamadas COM e fila.
+        Se linhas_selecionadas estiver definido, só essas linhas (índices da lista) são percorridas.
+
+        Uma linha é contada como falha se o fluxo chamar _marca_falha() ou se uma exceção
+        interromper o laço no meio dela. Em modo rápido, a UI da sessão fica travada durante
+        todo o laço e é restaurada ao final, mesmo em caso de erro ou cancelamento.
+
+        Args:
+            lista: linhas retornadas por _relatorio.
+            fluxo: nome do fluxo usado como rótulo das métricas ("requisicao", "pedido", "frs", "gd").
+            arquivo: o caminho da planilha em processamento.
+            indices: as linhas a percorrer, nessa ordem, já obtidas de _indices_do_fluxo()
+                     (None = as de _indices_do_fluxo()).
+        """
+        if indices is None:
+            indices = self._indices_do_fluxo(lista, fluxo, arquivo)
+        total = len(indices)
+        # O cancelamento não é limpo aqui: vale para a execução inteira (conexão, lotes e contas),
+        # inclusive quando pedido antes da primeira linha
+        self._fluxo_atual = fluxo
+        self.metricas.define("fila_linhas", total, fluxo=fluxo)
+        # Campos de correlação dos registros de log emitidos por esta thread durante o fluxo
+        define_contexto(execucao=self.id_execucao or novo_id_execucao(), conta=self.user, fluxo=fluxo,
+                        arquivo=os.path.basename(arquivo))
+        em_andamento = False
+        processadas = 0
+        inicio_execucao = time.perf_counter()
+        # Com várias estações, as linhas são reservadas em lotes à medida que o fluxo avança
+        linhas = indices if self.coordenador is None else self.coordenador.linhas(fluxo, lista, indices, self.cancelado)
+        if self.vigia is not None and self.session is not None:
+            self.vigia.inicia(self.session)
+        self.monitor_recursos.inicia()
+        escopo = None
+        try:
+            with tela_suprimida(self.session) if self.modo_rapido and self.session is not None else nullcontext():
+                for posicao, i in enumerate(linhas):
+                    j = lista[i]
+                    if self.cancelado.is_set():
+                        print(f"Execução cancelada na linha {i + 2}.")
+                        break
+                    # Aguarda vaga no controlador de concorrência (execução com várias contas)
+                    if self.controlador is not None and not self.controlador.adquire(self.cancelado):
+                        print(f"Execução cancelada na linha {i + 2}.")
+                        break
+                    self._falhou = False
+                    # Linha da planilha (o cabeçalho é a linha 1), a mesma das mensagens exibidas ao operador
+                    define_contexto(linha=i + 2)
+                    if self.vigia is not None:
+                        self.vigia.inicia_linha(i + 2)
+                    self.metricas.inicia_linha()
+                    inicio = time.perf_counter()
+                    em_andamento = True
+                    self._notifica_linha(i, "em andamento")
+                    # Os proxies COM obtidos na linha são liberados ao final dela
+                    escopo = self.proxies.abre_escopo()
+                    yield i, j
+                    self.proxies.fecha_escopo(escopo)
+                    escopo = None
+                    em_andamento = False
+                    processadas += 1
+                    if processadas % self.monitor_recursos.intervalo_linhas == 0:
+                        self.monitor_recursos.amostra(fluxo, processadas)
+                    self._notifica_linha(i, "falha" if self._falhou else "concluída")
+                    if self._falhou:
+                        self.navegador.invalida()
+                        self._registra_falha_coordenada(fluxo, i)
+                    self._libera_vaga()
+                    self._registra_passo("linha", time.perf_counter() - inicio, self.metricas.segundos_sap_linha())
+                    self.metricas.finaliza_linha(fluxo, time.perf_counter() - inicio, not self._falhou)
+                    self.metricas.define("fila_linhas", total - posicao - 1, fluxo=fluxo)
+        finally:
+            if escopo is not None:
+                self.proxies.fecha_escopo(escopo)
+            # Exceção no corpo do laço: a linha atual é registrada como falha
+            if em_andamento:
+                self._notifica_linha(i, "falha")
+                self.navegador.invalida()
+                self._registra_falha_coordenada(fluxo, i)
+                self._falhou = True
+                self._libera_vaga()
+                self.metricas.finaliza_linha(fluxo, time.perf_counter() - inicio, False)
+            if self.vigia is not None:
+                self.vigia.para()
+            self.metricas.define("fila_linhas", 0, fluxo=fluxo)
+            duracao = time.perf_counter() - inicio_execucao
+            if self.backend.simulado:
+                # Simulação: a vazão não entra no histórico das execuções reais
+                print(f"Vazão simulada ({fluxo}): {processadas * 60 / duracao if duracao > 0 else 0.0:.1f} linhas/min")
+            else:
+                print(registra_vazao(os.path.dirname(arquivo), fluxo, self.modo_rapido, processadas, duracao))
+            limpa_contexto()
+            # Linhas concluídas que ainda não foram para a planilha (inclusive em caso de erro ou cancelamento)
+            self._descarrega_gravacoes(arquivo)
+
+    # Registra a duração de um passo no cronômetro da execução e nas métricas
+    def _registra_passo(self, passo, segundos, segundos_sap=0.0):
+        if self.cronometro is not None:
+            self.cronometro.registra(passo, segundos, segundos_sap)
+        self.metricas.observa("passo_segundos", segundos, fluxo=self._fluxo_atual, passo=passo)
+
+    # Mede um passo do fluxo (os proxies COM obtidos nele são liberados ao final); remoto=True conta toda
+    # a duração como espera pelo SAP (ex.: chamadas RFC)
+    @contextmanager
+    def _passo(self, passo, remoto=False):
+        inicio = time.perf_counter()
+        sap_inicial = self.metricas.segundos_sap_linha()
+        escopo = self.proxies.abre_escopo()
+        try:
+            yield
+        finally:
+            self.proxies.fecha_escopo(escopo)
+            segundos = time.perf_counter() - inicio
+            sap = segundos if remoto else max(0.0, self.metricas.segundos_sap_linha() - sap_inicial)
+            self._registra_passo(passo, segundos, sap)
+
+    # Grava os tempos da execução no histórico e informa os passos mais lentos que a referência
+    def _conclui_desempenho(self, fluxo, arquivo):
+        cronometro, self.cronometro = self.cronometro, None
+        if cronometro is None:
+            return
+        if self.backend.simulado:
+            modo = "simulacao"
+        elif self._usa_motor_rfc(fluxo):
+            modo = "rfc"
+        else:
+            modo = "rapido" if self.modo_rapido else "normal"
+        try:
+            print(registra_execucao(os.path.dirname(arquivo), fluxo, modo, cronometro, self.id_execucao))
+        except Exception as e:
+            logging.warning(f"Não foi possível comparar o desempenho de {fluxo} com o histórico: {e}")
+
+    # Linhas que o fluxo deve percorrer: as selecionadas (ou todas) e, na execução incremental, só as pendentes
+    def _indices_do_fluxo(self, lista, fluxo, arquivo):
+        indices = range(len(lista)) if self.linhas_selecionadas is None else list(self.linhas_selecionadas)
+        if self.incremental:
+            indices = self._filtra_incremental(lista, fluxo, arquivo, indices)
+        return indices
+
+    # Mantém só as linhas ainda não concluídas no fluxo e relata as alteradas depois de concluídas
+    def _filtra_incremental(self, lista, fluxo, arquivo, indices):
+        if self.indice_incremental is None:
+            self.indice_incremental = IndiceIncremental(arquivo)
+        if self._impressoes is None or self._impressoes[0] is not lista:
+            self._impressoes = (lista, impressoes(lista))
+        pendentes, alteradas = self.indice_incremental.pendentes(fluxo, self._impressoes[1], indices)
+        print(f"Execução incremental ({fluxo}): {len(pendentes)} linha(s) nova(s) ou pendente(s) "
+              f"de {len(indices)}; {len(indices) - len(pendentes) - len(alteradas)} já concluída(s).")
+        for i in alteradas:
+            print(f"AVISO: Linha {i+2} foi alterada depois de processada em {fluxo}; verifique o documento no SAP.")
+        return pendentes
+
+    # Registra no índice incremental as linhas gravadas na planilha (o documento SAP já existe)
+    def _conclui_incremental(self, resultados):
+        if self.indice_incremental is None or self._impressoes is None:
+            return
+        for linha in resultados:
+            self.indice_incremental.conclui(self._fluxo_atual, self._impressoes[1][linha - 2])
+        try:
+            self.indice_incremental.grava()
+        except OSError as e:
+            logging.warning(f"Não foi possível gravar o índice incremental: {e}")
+
+    # Informa ao coordenador entre estações que a linha falhou (ela só é oferecida de novo na próxima execução)
+    def _registra_falha_coordenada(self, fluxo, i):
+        if self.coordenador is None:
+            return
+        try:
+            self.coordenador.falha(fluxo, i)
+        except Exception as e:
+            logging.warning(f"Não foi possível registrar a falha da linha {i + 2} nas reservas: {e}")
+
+    # O fluxo é executado pelo motor RFC, se houver um configurado que o suporte
+    def _usa_motor_rfc(self, fluxo):
+        return self.motor_rfc is not None and self.motor_rfc.suporta(fluxo)
+
+    # Uma linha abortada pelo vigia de travamentos é registrada como falha e o fluxo segue para a próxima
+    @contextmanager
+    def _linha_protegida(self, i):
+        try:
+            yield
+        except LinhaAbortada as e:
+            self._marca_falha()
+            print(f"Erro ao processar linha {i+2}: {e}")
+
+    # Informa o novo estado da linha ao ouvinte (a falha de um ouvinte não interrompe o fluxo)
+    def _notifica_linha(self, i, estado):
+        if self.ouvinte_linhas is None:
+            return
+        try:
+            self.ouvinte_linhas(i, estado)
+        except Exception as e:
+            logging.debug(f"Ouvinte de linhas falhou na linha {i + 2}: {e}")
+
+    # Devolve a vaga ao controlador de concorrência, informando se a linha falhou
+    def _libera_vaga(self):
+        if self.controlador is None:
+            return
+        if self._falhou:
+            self.controlador.registra_erro()
+        self.controlador.libera()
+
+    # Solicita a interrupção do fluxo em execução ao final da linha atual
+    def cancelar(self):
+        self.cancelado.set()
+
+    # Maximiza a janela principal, exceto em modo rápido (onde a janela fica minimizada)
+    def _maximiza(self, session):
+        if not self.modo_rapido:
+            session.findById("wnd[0]").maximize()
+
+    # Abre a transação do zero (maximiza, starttransaction e Enter), como os fluxos gravados no SAPScripting
+    def _inicia_transacao(self, session, transacao):
+        # Troca de tela: os proxies da tela anterior obtidos neste passo não servem mais
+        self.proxies.libera_escopo()
+        self._maximiza(session)
+        session.starttransaction(transacao)
+        session.findById("wnd[0]").sendVKey(0)
+
+    # Marca a linha atual como falha (para fluxos que tratam o erro e seguem para a próxima linha)
+    def _marca_falha(self):
+        self._falhou = True
+
+    # Grava valores em várias linhas da planilha de uma só vez (ex.: {2: {'BB': 123, 'BC': '01/01/2025'}})
+    def _grava_resultados(self, arquivo, resultados):
+        """
+        Args:
+            arquivo: o caminho da planilha a ser atualizada.
+            resultados: dict {número da linha: {coluna: valor}}.
+        """
+        # Simulação: os números devolvidos pelo backend de gravação não vão para a planilha
+        if self.backend.simulado:
+            return
+        # Várias estações: os resultados vão para o banco de reservas e são gravados na planilha ao final
+        if self.coordenador is not None:
+            self.coordenador.conclui(self._fluxo_atual, resultados)
+            return
+        # Execução com várias contas: os resultados são acumulados e gravados de uma só vez no final
+        if self.resultados_acumulados is not None:
+            for linha, valores in resultados.items():
+                self.resultados_acumulados.setdefault(linha, {}).update(valores)
+            return
+        inicio = time.perf_counter()
+        if self.gravacao_direta:
+            try:
+                grava_celulas(arquivo, resultados)
+                # A pasta de trabalho carregada pelo openpyxl (se houver) deixou de refletir o arquivo
+                self._planilha = None
+            except EstruturaNaoSuportada as e:
+                logging.warning(f"Gravação direta indisponível para '{os.path.basename(arquivo)}' ({e}); usando o openpyxl.")
+                self.gravacao_direta = False
+        if not self.gravacao_direta:
+            # Carrega a planilha uma única vez por execução
+            if self._planilha is None or self._planilha[0] != arquivo:
+                self._planilha = (arquivo, load_workbook(arquivo))
+            wb = self._planilha[1]
+            ws = wb.active
+            for linha, valores in resultados.items():
+                for coluna, valor in valores.items():
+                    ws[coluna + str(linha)].value = valor
+            wb.save(arquivo)
+        if self.incremental:
+            self._conclui_incremental(resultados)
+        self.metricas.incrementa("tempo_segundos_total", time.perf_counter() - inicio,
+                                 fluxo=self._fluxo_atual, origem="excel")
+        self._registra_passo("planilha", time.perf_counter() - inicio)
+
+    # Acumula os valores de uma linha; a planilha é gravada quando houver gravar_a_cada linhas pendentes
+    # e ao fim do fluxo (_percorre), em vez de reescrever o arquivo a cada linha
+    def _grava_linha(self, arquivo, linha, valores):
+        self._gravacoes_pendentes.setdefault(linha, {}).update(valores)
+        if len(self._gravacoes_pendentes) >= self.gravar_a_cada:
+            self._descarrega_gravacoes(arquivo)
+
+    # Grava na planilha, de uma só vez, as linhas acumuladas por _grava_linha
+    def _descarrega_gravacoes(self, arquivo):
+        pendentes, self._gravacoes_pendentes = self._gravacoes_pendentes, {}
+        if pendentes:
+            self._grava_resultados(arquivo, pendentes)
+    
     # Cria requisições com base na lista de dados e as salva na planilha
+    @_medido("requisicao")
     def _requisicao(self, lista, arquivo):
         """
         Gera requisição.
@@ -146,276 +567,207 @@ class mm:
 
         """
 
+        if self._usa_motor_rfc("requisicao"):
+            # Os dados mestres são conferidos também no motor RFC, antes de qualquer BAPI
+            dados_mestres = self._carrega_dados_mestres(self._sessao_medida(), "requisicao", lista, arquivo)
+            return self.motor_rfc.executa(self, "requisicao", lista, arquivo, dados_mestres)
         # Verifica a sessão disponível, maximiza a janela e abre a ME51N (gera requisições)
-        session = self.session
-        if not session:
+        session = self._sessao_medida()
+        if not session and not self.backend.simulado:
             logging.error("Sessão não disponível para _requisicao.")
             return
-        session.findById("wnd[0]").maximize()
-        session.starttransaction("ME51n")
-        session.findById("wnd[0]").sendVKey(0)
-        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON").press()
-        id = 1 #contador de item        
-        codcusto = session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell")
+        dados_mestres = self._carrega_dados_mestres(session, "requisicao", lista, arquivo)
+        # Lista grande: várias requisições menores, agrupadas pela classificação contábil e criadas em paralelo
+        indices = range(len(lista)) if self.linhas_selecionadas is None else list(self.linhas_selecionadas)
+        if (self.tamanho_lote_requisicao and len(indices) > self.tamanho_lote_requisicao
+                and self.resultados_acumulados is None and self.coordenador is None and not self.backend.simulado):
+            # Execução incremental: os lotes só levam as linhas ainda não concluídas (as já concluídas
+            # ganhariam uma segunda RC); abaixo do limite, o _percorre filtra como nos demais fluxos
+            if self.incremental:
+                indices = self._filtra_incremental(lista, "requisicao", arquivo, indices)
+            if len(indices) > self.tamanho_lote_requisicao:
+                # A gravação de todos os lotes (e a conclusão no índice incremental) é feita por esta instância
+                self._fluxo_atual = "requisicao"
+                RequisicoesEmLotes(self, self.tamanho_lote_requisicao, self.sessoes_requisicao,
+                                   self.agrupar_requisicao_por).executa(lista, arquivo, list(indices))
+                return
+        with self._passo("inicia_requisicao"):
+            self.backend.inicia_requisicao(session)
+        id = 1 #contador de item (a linha do grid é id-1)
+        itens = []
         # Percorre a lista(cada j é uma linha da planilha)
-        for i, j  in enumerate(lista):                            
-        # Primeiro item da requisição
-            if id == 1:                  
-                # Preenche dados no SAP, se for K (Centro de Custo)
-                if len(j[11]) == 7:             
-            
-                    codcusto.modifyCell(i,"BNFPO",id)
-                    codcusto.modifyCell(i,"KNTTP","K")
-                    codcusto.modifyCell(i,"EKGRP","F85")
-                    codcusto.modifyCell(i,"TXZ01","HOSPEDAGEM NF {}".format(j[10]))
-                    codcusto.modifyCell(i,"BEDNR",j[10])
-                    codcusto.modifyCell(i,"WGBEZ","094300")
-                    codcusto.modifyCell(i,"EPSTP","D")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").currentCellColumn = "EPSTP"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
-                    time.sleep(1)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = "HOSPEDAGEM NF {}".format(j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = "1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = "un"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = j[12]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").text = j[11]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").caretPosition = 7
-                    session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = "8.8"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
-                    session.findById("wnd[0]").sendVKey(0)
-
-                # Preenche dados do item, se for N (Ordem e Operação)
-                elif j[11][0] == '1':
-
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BNFPO", id)
-                    codcusto.modifyCell(i,"KNTTP","N")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EKGRP","F85")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"TXZ01","HOSPEDAGEM NF {}".format(j[10]))
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BEDNR", j[10])
-                    codcusto.modifyCell(i,"WGBEZ","094300")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EPSTP","D")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").currentCellColumn = "EPSTP"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
-                    time.sleep(1)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = "HOSPEDAGEM NF {}".format(j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = "1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = "UN"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = j[12]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-NPLNR").text = j[11][0:10]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").text = j[11][-4:]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").setFocus()
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").caretPosition = 2
-                    session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = "8.8"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
-                    session.findById("wnd[0]").sendVKey(0)
-                
-                # Preenche dados do item, se for P (Projeto)
-                else:
-
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BNFPO", id)
-                    codcusto.modifyCell(i,"KNTTP","P")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EKGRP","F85")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"TXZ01", "HOSPEDAGEM NF {}".format(j[10]))
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BEDNR", j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"WGBEZ","094300")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EPSTP","D")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").currentCellColumn = "EPSTP"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
-                    time.sleep(1)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = "HOSPEDAGEM NF {}".format(j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = "1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = "UN"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = j[12]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").text = j[11]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").setFocus()
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").caretPosition = 0
-                    session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = "8.8"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
-                    session.findById("wnd[0]").sendVKey(0)
-                    
-            # Percorre a lista, a partir do segundo item da requisição
-            else:               
-
-                codcust1 = session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell")
-
-                # Preenche dados no SAP, se for K (Centro de Custo)  
-                if len(j[11]) == 7: 
-
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BNFPO",id)
-                    codcust1.modifyCell(i,"KNTTP","K")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EKGRP","F85")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"TXZ01","HOSPEDAGEM NF {}".format(j[10]))
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BEDNR", j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EPSTP","D")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").setCurrentCell(i,"EPSTP")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
-                    time.sleep(1)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = "HOSPEDAGEM NF {}".format(j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = "1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = "un"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = j[12]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").text = j[11]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KOSTL").caretPosition = 7
-                    session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = "8.8"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
-                    session.findById("wnd[0]").sendVKey(0)
-
-                # Preenche dados do item, se for N (Ordem e Operação)
-                elif j[11][0] == '1':              
-
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BNFPO",id)
-                    codcust1.modifyCell(i,"KNTTP","N")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EKGRP","F85")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"TXZ01","HOSPEDAGEM NF {}".format(j[10]))
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BEDNR", j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EPSTP","D")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").setCurrentCell(i,"EPSTP")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
-                    time.sleep(1)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = "HOSPEDAGEM NF {}".format(j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = "1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = "UN"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = j[12]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-NPLNR").text = j[11][0:10]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").text = j[11][-4:]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").setFocus()
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-VORNR").caretPosition = 4
-                    session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = "8.8"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
-                    session.findById("wnd[0]").sendVKey(0)
-                    
-                # Preenche dados do item, se for P (Projeto)
-                else:
-
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BNFPO",id)
-                    codcust1.modifyCell(i,"KNTTP","P")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EKGRP","F85")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"TXZ01","HOSPEDAGEM NF {}".format(j[10]))
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"BEDNR",j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").modifyCell(i,"EPSTP","D")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").setCurrentCell(i,"EPSTP")
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").firstVisibleColumn = "MEINS"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:3212/cntlGRIDCONTROL/shellcont/shell").pressEnter()
-                    time.sleep(1)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-KTEXT1[1,0]").text = "HOSPEDAGEM NF {}".format(j[10])
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-MENGE[2,0]").text = "1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").text = "UN"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/txtESLL-TBTWR[3,0]").text = j[12]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").setFocus
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/tblSAPLMLSPTC_VIEW/ctxtESLL-MEINS[5,0]").caretPosition = 2
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").text = j[11]
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").setFocus()
-                    session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-PS_POSID").caretPosition = 24
-                    session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").text = "8.8"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:3303/tabsREQ_ITEM_DETAIL/tabpTABREQDT15/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1318/ssubCUSTOMER_DATA_ITEM:SAPLXM02:0111/tabsTABSTRIP_0111/tabpTAB3/ssubSUB03:SAPLXM02:1070/ctxtEBAN_CI-ZZTPCOD_TLC").caretPosition = 3
-                    session.findById("wnd[0]").sendVKey(0)
-                    
-            # Incrementa o item para próxima linha
+        for i, j  in self._percorre(lista, "requisicao", arquivo):
+            if self._dados_mestres_invalidos(dados_mestres, "requisicao", i, j):
+                continue
+            # Preenche o item com os campos mapeados da linha (ver core/documentos.py)
+            with self._passo("adiciona_item_rc"):
+                self.backend.adiciona_item_rc(session, item_requisicao(j, id))
+            # Guarda a linha da planilha e o número do item, e incrementa o item para próxima linha
+            itens.append((i, id))
             id+=1
 
-        # Após inserir os itens, salva a requisição e extrai  o número gerado na barra de status, preenchendo e 
+        if not itens:
+            print("Nenhuma linha a incluir na requisição.")
+            return
+
+        # Após inserir os itens, salva a requisição e extrai  o número gerado, preenchendo e
         # gravando nas colunas AT (número da requisição), AU (número do item), AS (data da criação)
-        # e AV (data da conclusão) da planilha
-        session.findById("wnd[0]/tbar[0]/btn[11]").press()
-        poCode = session.findById("wnd[0]/sbar").text
-        poCode = poCode.split()
-        poCode = poCode[6]
-        poCode = int(poCode)
+        # e AV (data da conclusão) da planilha.
+        # Só as linhas incluídas nesta RC são gravadas (até a versão original, todas as linhas até ws.max_row
+        # recebiam o número, com AU = linha - 1): com linhas puladas, selecionadas por conta/estação ou já
+        # processadas em outra execução, gravar todas sobrescreveria RCs de outras linhas e criaria itens
+        # que não existem na RC.
+        with self._passo("grava_requisicao"):
+            poCode = self.backend.grava_requisicao(session)
         print('RC nº {}'.format(poCode))
-        wb = load_workbook(arquivo)
-        ws = wb.active
         hoje = dt.date.today().strftime("%d/%m/%Y")
+        resultados = {}
+        for i, item in itens:
+            resultados[i+2] = {'AT': poCode, 'AU': item, 'AS': hoje, 'AV': hoje}
+        self._grava_resultados(arquivo, resultados)
+    print("Script finalizado")
 
-        for i in range(2, ws.max_row+1):
-            ws['AT'+str(i)].value = poCode
+    # Confere os documentos criados no período contra a planilha com uma única consulta no SAP (ver core/conciliacao.py)
+    def _concilia(self, fluxo, lista, arquivo, desde=None):
+        """
+        Args:
+            fluxo: "requisicao", "pedido", "frs" ou "gd".
+            lista: linhas retornadas por _relatorio.
+            arquivo: o caminho da planilha.
+            desde: primeiro dia da execução (padrão: hoje).
 
-        for i in range(2, ws.max_row+1):
-            ws['AU'+str(i)].value = i-1
-            ws['AS'+str(i)].value = hoje
-            ws['AV'+str(i)].value = hoje
+        Returns:
+            dict {situação: quantidade de linhas sinalizadas}.
+        """
+        session = self._sessao_medida()
+        if not session:
+            logging.error("Sessão não disponível para a conciliação.")
+            return {}
+        inicio = time.perf_counter()
+        try:
+            return concilia_execucao(session, fluxo, lista, arquivo, desde)
+        finally:
+            # A conciliação sai da tela do fluxo (SE16N / MLGDC)
+            self.navegador.invalida()
+            self.metricas.incrementa("tempo_segundos_total", time.perf_counter() - inicio, fluxo=fluxo, origem="conciliacao")
+
+    # Foto dos controles da tela (ver core/arvore_tela.py): existência, leiaute e textos sem um findById por controle
+    def foto_tela(self, session=None, raiz="wnd[0]"):
+        """
+        Args:
+            session: a sessão a fotografar (padrão: a sessão do mm).
+            raiz: controle de partida (ex.: "wnd[0]", "wnd[0]/sbar").
 
+        Returns:
+            FotoTela (uma chamada ao SAP) ou, sem GetObjectTree, FotoPorChamada; None sem sessão.
+        """
+        session = session or self._sessao_medida()
+        if not session:
+            return None
+        foto, da_arvore = fotografa(session, raiz, self.arvore_tela)
+        if self.arvore_tela and not da_arvore:
+            logging.info("SAP GUI sem GetObjectTree: a tela será lida controle por controle nesta execução.")
+            self.arvore_tela = False
+        return foto
 
-        wb.save(arquivo)
-    print("Script finalizado")
+    # Texto da barra de status (mensagem da gravação), com uma chamada quando há GetObjectTree
+    def texto_barra(self, session):
+        return self.foto_tela(session, "wnd[0]/sbar").texto("wnd[0]/sbar")
 
     # Função auxiliar que trata o leiaute dinâmico (id_1 e id_2) da tela da transação ME21N,  
     # impedindo assim erro de execução do scrit de Criação de Pedido. 
-    def encontrar_elemento(self, id_1, id_2):
-        
-        # Identifica a sessão disponível    
-        session = self.session
-
+    def encontrar_elemento(self, id_1, id_2, foto=None):
         """
         Tenta encontrar um elemento na tela do SAP usando dois IDs possíveis.
 
+        O leiaute é identificado na foto da tela (uma chamada), sem tentar um findById que falharia;
+        só o elemento encontrado é obtido do SAP.
+
         Args:
-            session: O objeto de sessão ativa do SAP.
             id_1: A primeira variação do ID a ser tentada.
             id_2: A segunda variação do ID a ser tentada.
+            foto: foto da tela atual já tirada (opcional; ver foto_tela()).
 
         Returns:
             O objeto de tela encontrado, ou None se nenhum ID funcionar.
         """
+        # Identifica a sessão disponível
+        session = self._sessao_medida()
         if not session:
             logging.error("Sessão SAP não está ativa.")
             return None
+        foto = foto or self.foto_tela(session)
+        id_elemento = foto.primeiro(id_1, id_2)
+        if id_elemento is None:
+            logging.error(f"Elemento não encontrado com os IDs '{id_1}' ou '{id_2}'.")
+            return None
+        return foto.obtem(session, id_elemento)
+
+    # Monta o índice do pedido para as linhas que serão processadas; sem índice, o _pedido usa as ajudas de pesquisa
+    def _carrega_indice_pedido(self, session, lista, arquivo):
+        if not self.usar_indice_pedido or self.backend.simulado:
+            return None
+        indices = range(len(lista)) if self.linhas_selecionadas is None else self.linhas_selecionadas
+        inicio = time.perf_counter()
         try:
-            # Tenta encontrar com o primeiro ID
-            elemento = session.findById(id_1)
-            return elemento
-        except:
-            try:
-                # Se o primeiro falhar, tenta com o segundo
-                elemento = session.findById(id_2)
-                return elemento
-            except Exception as e:
-                # Se ambos falharem, registra o erro e retorna None
-                logging.error(f"Elemento não encontrado com os IDs '{id_1}' ou '{id_2}'.")
-                return None
-            
+            indice = IndicePedido.carrega(session, [lista[i] for i in indices], os.path.dirname(arquivo))
+        except Exception as e:
+            logging.warning(f"Não foi possível montar o índice do pedido; as ajudas de pesquisa serão usadas: {e}")
+            indice = None
+        # As consultas saem da ME21N: a próxima linha precisa abrir a transação
+        self.navegador.invalida()
+        self.metricas.incrementa("tempo_segundos_total", time.perf_counter() - inicio, fluxo="pedido", origem="indice")
+        return indice
+
+    # Atualiza o cache de dados mestres (só o que estiver vencido ou faltando) para as linhas do fluxo
+    def _carrega_dados_mestres(self, session, fluxo, lista, arquivo):
+        if not self.validar_dados_mestres or self.backend.simulado:
+            return None
+        if self.dados_mestres is None:
+            self.dados_mestres = CacheDadosMestres(os.path.dirname(arquivo))
+        indices = range(len(lista)) if self.linhas_selecionadas is None else self.linhas_selecionadas
+        inicio = time.perf_counter()
+        try:
+            if self.dados_mestres.atualiza(session, fluxo, [lista[i] for i in indices]):
+                # As consultas saem da transação do fluxo: a próxima linha precisa abri-la
+                self.navegador.invalida()
+        except Exception as e:
+            logging.warning(f"Não foi possível atualizar o cache de dados mestres; o SAP fará a validação: {e}")
+            return None
+        self.metricas.incrementa("tempo_segundos_total", time.perf_counter() - inicio, fluxo=fluxo, origem="dados_mestres")
+        return self.dados_mestres
+
+    # Recusa a linha com dado mestre inválido antes de qualquer chamada ao SAP
+    def _dados_mestres_invalidos(self, cache, fluxo, i, j):
+        if cache is None:
+            return False
+        problemas = cache.problemas(fluxo, j)
+        if not problemas:
+            return False
+        self._marca_falha()
+        print(f"Erro na linha {i+2}: {'; '.join(problemas)}. Corrija a planilha (a linha não foi enviada ao SAP).")
+        return True
+
+    # Inicia o envio dos anexos em outra sessão; sem ela, os anexos são feitos na própria sessão do fluxo
+    def _inicia_anexos(self, session, pasta):
+        if not self.anexos_em_paralelo or self.backend.simulado:
+            return None
+        try:
+            return TrabalhadorAnexos(session, pasta, self.metricas)
+        except Exception as e:
+            logging.warning(f"Não foi possível abrir a sessão de anexos; os anexos serão feitos a cada pedido: {e}")
+            return None
+
+    # Anexa o arquivo ao pedido: enfileira para a sessão de anexos ou, sem ela, anexa na sessão do fluxo
+    def _anexa_nf(self, session, anexos, pedido, pasta, nome_arquivo):
+        if anexos is not None:
+            anexos.enfileira(pedido, nome_arquivo)
+            return
+        with self._passo("anexa_nf_pedido"):
+            self.backend.anexa_nf_pedido(session, pedido, pasta, nome_arquivo)
+
     # Cria pedidos com base na lista de dados e os grava na planilha
+    @_medido("pedido")
     def _pedido(self, lista, arquivo):
         """
         Gera pedido.
@@ -425,207 +777,63 @@ class mm:
             arquivo: o caminho da pasta com o nome da planilha a ser atualizada, conforme execução do script.
 
         """
+        if self._usa_motor_rfc("pedido"):
+            return self.motor_rfc.executa(self, "pedido", lista, arquivo)
     # Verifica a sessão disponível, maximiza a janela e abre a ME51N (gera requisições)
-        session = self.session
-        if not session:
+        session = self._sessao_medida()
+        if not session and not self.backend.simulado:
             logging.error("Sessão não disponível para _pedido.")
             return
-        
-        # Percorre a lista de dados das planilha, maximiza a janela e abre a ME51N (gera requisições)
-        for i, j  in enumerate(lista):
+        hoje = dt.date.today().strftime("%d/%m/%Y")
+        indice = self._carrega_indice_pedido(session, lista, arquivo)
+        # Os documentos fiscais (NF) ficam na pasta da planilha
+        caminho = os.path.dirname(arquivo)
+        anexos = self._inicia_anexos(session, caminho)
+        try:
+            self._gera_pedidos(session, lista, arquivo, hoje, indice, caminho, anexos)
+        finally:
+            if anexos is not None:
+                anexos.finaliza()
+        self.backend.encerra(session)
+
+    # Cria um pedido para cada linha e grava o número na planilha
+    def _gera_pedidos(self, session, lista, arquivo, hoje, indice, caminho, anexos):
+        # Percorre a lista de dados das planilha e cria o pedido de cada linha
+        for i, j  in self._percorre(lista, "pedido", arquivo):
 
                 try:
 
-                    session.findById("wnd[0]").maximize()
-                    session.findById("wnd[0]/tbar[0]/okcd").text = "/NME21N"
-                    session.findById("wnd[0]").sendVKey(0)
-                    # IDs possíveis para o superfield
-                    id_superfield_13 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-SUPERFIELD"
-                    id_superfield_16 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-SUPERFIELD"
-
-                    
-                    # Encontra o elemento UMA VEZ do leiaute dinâmico
-                    campo_superfield = self.encontrar_elemento(id_superfield_13, id_superfield_16)
-
-                    # Realiza TODAS as ações na variável
-                    if campo_superfield:
-                        campo_superfield.caretPosition = 0
-                        campo_superfield.setFocus()
-                    else:
-                        logging.warning(f"Pedido {i}: Campo Superfield não encontrado. Pulando item.")
+                    # Item de RC eliminado ou já convertido em pedido: o SAP recusaria a referência
+                    if indice is not None and indice.item_rc_aberto(j[2], j[3]) is False:
+                        logging.warning(f"Pedido da linha {i+2}: item {j[3]} da RC {j[2]} eliminado ou já atendido. Pulando item.")
+                        self._marca_falha()
+                        continue
+
+                    # Fornecedor e linha da reserva já localizados pelo índice dispensam as ajudas de pesquisa
+                    fornecedor = indice.fornecedor(j[0]) if indice is not None else None
+                    linha_reserva = indice.linha_reserva(j[9]) if indice is not None and not pd.isnull(j[9]) else None
+                    with self._passo("cria_pedido"):
+                        criado = self.backend.cria_pedido(session, pedido(j, fornecedor, linha_reserva))
+                    if criado is None:
+                        logging.warning(f"Pedido da linha {i+2}: pedido não iniciado. Pulando item.")
                         continue # Pula para o próximo item do loop
-                    
-                    session.findById("wnd[0]").sendVKey(4)
-                    session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/btnG_SELFLD_TAB-MORE[6,56]").press()
-                    session.findById("wnd[2]/usr/tabsTAB_STRIP/tabpNOSV").select()
-                    session.findById("wnd[2]/usr/tabsTAB_STRIP/tabpNOSV/ssubSCREEN_HEADER:SAPLALDB:3030/tblSAPLALDBSINGLE_E/ctxtRSCSEL_255-SLOW_E[1,0]").text = "X"
-                    session.findById("wnd[2]/usr/tabsTAB_STRIP/tabpNOSV/ssubSCREEN_HEADER:SAPLALDB:3030/tblSAPLALDBSINGLE_E/ctxtRSCSEL_255-SLOW_E[1,0]").caretPosition = 1
-                    session.findById("wnd[2]/tbar[0]/btn[8]").press()
-                    session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[7,24]").text = j[0]
-                    session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[7,24]").setFocus()
-                    session.findById("wnd[1]/usr/tabsG_SELONETABSTRIP/tabpTAB001/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[7,24]").caretPosition = 14
-                    session.findById("wnd[1]").sendVKey(0)
-                    session.findById("wnd[1]").sendVKey(0)
-                    
-                    # IDs possíveis para o campo de data
-                    id_data_13 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-BEDAT"
-                    id_data_16 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB0:SAPLMEGUI:0030/subSUB1:SAPLMEGUI:1105/ctxtMEPO_TOPLINE-BEDAT"
-
-                    # Encontra o elemento UMA VEZ
-                    campo_data = self.encontrar_elemento(session, id_data_13, id_data_16)
-                    print(campo_data)
-
-                    # Realiza TODAS as ações na variável
-                    if campo_data:
-                        campo_data.text = j[1]
-                        campo_data.setFocus()
-                        campo_data.caretPosition = 2              
-                    
-                    # IDs possíveis para o botão
-                    id_botao_13 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON"
-                    id_botao_16 = "wnd[0]/usr/subSUB0:SAPLMEGUI:0016/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON"
-
-                    # Encontra o elemento UMA VEZ
-                    botao_visao_geral = self.encontrar_elemento(session, id_botao_13, id_botao_16)
-
-                    # Realiza a ação na variável
-                    if botao_visao_geral:
-                        botao_visao_geral.press()
-                    
-                    # Linhas de código extraídas do SAPScripting que navega em campos e telas do SAP
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT9/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1221/ctxtMEPO1222-EKGRP").text = "F85"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT9/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1221/ctxtMEPO1222-EKGRP").caretPosition = 3
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT1").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT1/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1226/ctxtMEPO1226-INCO1").text = "ZSE"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/ctxtMEPO1211-BANFN[25,0]").text = j[2]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/txtMEPO1211-BNFPO[26,0]").text = j[3]
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/txtMEPO1211-BNFPO[26,0]").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0013/subSUB2:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1211/tblSAPLMEGUITC_1211/txtMEPO1211-BNFPO[26,0]").caretPosition = 2
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT7/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1317/ctxtMEPO1317-MWSKZ").text = "D0"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT7/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1317/ctxtMEPO1317-MWSKZ").caretPosition = 2
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT6").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT6/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1313/txtMEPO1313-PLIFZ").text = "1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT6/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1313/txtMEPO1313-PLIFZ").caretPosition = 1
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1320/tblSAPLMEGUITC_1320/ctxtMEPO1320-EEIND[2,0]").text = mes
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1320/tblSAPLMEGUITC_1320/ctxtMEPO1320-EEIND[2,0]").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT5/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1320/tblSAPLMEGUITC_1320/ctxtMEPO1320-EEIND[2,0]").caretPosition = 10
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0015/subSUB1:SAPLMEVIEWS:1100/subSUB1:SAPLMEVIEWS:4000/btnDYN_4000-BUTTON").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMODLICIT").text = "DP1"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMULTA").text = "0"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZTPOBJ").text = "S"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZBNAME").text = "SD0H"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMULTA").setFocus()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/ctxtEKKO_CI-ZZMULTA").caretPosition = 1
-                    session.findById("wnd[0]").sendVKey(0)
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB1_0101/ssubSUB01:SAPLXM06:9101/btnBT_GERFIS").press()
-                    session.findById("wnd[1]/usr/btnBT_INSERT_FIS").press()
-                    session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").text = "M359"
-                    session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").caretPosition = 4
-                    session.findById("wnd[2]/tbar[0]/btn[8]").press()
-                    session.findById("wnd[1]/usr/btnBT_INSERT_FIS").press()
-                    session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").text = "T3HV"
-                    session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").caretPosition = 4
-                    session.findById("wnd[2]/tbar[0]/btn[8]").press()
-                    session.findById("wnd[1]/usr/btnBT_INSERT_FIS").press()
-                    session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").text = "TFEX"
-                    session.findById("wnd[2]/usr/ctxtEG_DADOS-CHAVE").caretPosition = 4
-                    session.findById("wnd[2]/tbar[0]/btn[8]").press()
-                    session.findById("wnd[1]/tbar[0]/btn[8]").press()
-                    session.findById("wnd[1]/tbar[0]/btn[8]").press()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB4_0101").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB4_0101/ssubSUB04:SAPLXM06:9104/ctxtEKKO_CI-ZZTPCOD_TLC").text = "8.8"
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT11/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1227/ssubCUSTOMER_DATA_HEADER:SAPLXM06:0101/tabsTABSTRIP_0101/tabpTAB4_0101/ssubSUB04:SAPLXM06:9104/ctxtEKKO_CI-ZZTPCOD_TLC").caretPosition = 3
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT3").select()
-                    session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT3/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1230/subTEXTS:SAPLMMTE:0100/subEDITOR:SAPLMMTE:0101/cntlTEXT_EDITOR_0101/shellcont/shell").text = f'{j[4]} - {j[5]} - {j[8]} - {j[6]} a {j[7]}'
-                    
-                    # Verifique que não há reserva de recursos, 
-                    # salva o pedido e extrai  o número gerado na barra de status, preenchendo e 
-                    # gravando nas colunas AY (número da pedido), AX (data da criação), AZ (data da conclusão)
-                    # e BA (status) da planilha
-                    if pd.isnull(j[9]):
-    
-                        session.findById("wnd[0]/tbar[0]/btn[11]").press()
-                        pc = session.findById("wnd[0]/sbar").text
-                        pc = pc.split()
-                        st = pc[4]
-                        pc = pc[8]
-                        pc = int(pc)
-                        print(pc)
-                        hoje = dt.date.today().strftime("%d/%m/%Y")
-                        ws['AY'+str(i+2)].value = pc
-                        ws['AX'+str(i+2)].value = hoje
-                        ws['AZ'+str(i+2)].value = hoje
-                        ws['BA'+str(i+2)].value = st                
-                        wb.save(arquivo)
-                        
-                        # Acessa a transação ME23N (Consulta Pedido), encontra documento fiscal correspondente na pasta,
-                        # e o anexa no pedido
-                        session.findById("wnd[0]/tbar[0]/okcd").text = "/NME23N"
-                        session.findById("wnd[0]").sendVKey(0)
-                        session.findById("wnd[0]/titl/shellcont/shell").pressContextButton("%GOS_TOOLBOX")
-                        session.findById("wnd[0]/titl/shellcont/shell").selectContextMenuItem("%GOS_PCATTA_CREA")
-                        session.findById("wnd[1]/usr/ctxtDY_PATH").text = caminho
-                        session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = "NF {}.pdf".format(j[10])
-                        session.findById("wnd[1]/usr/ctxtDY_FILENAME").caretPosition = 9
-                        session.findById("wnd[1]/tbar[0]/btn[0]").press()                  
-                        
-
-                    # Preenche o número da reserva de recursos, 
-                    # salva o pedido e extrai  o número gerado na barra de status, preenchendo e 
-                    # gravando nas colunas AY (número do pedido), AX (data da criação), AZ (data da conclusão)
+
+                    # Grava nas colunas AY (número do pedido), AX (data da criação), AZ (data da conclusão)
                     # e BA (status) da planilha
+                    pc, st = criado
+                    print(pc)
+                    self._grava_linha(arquivo, i+2, {'AY': pc, 'AX': hoje, 'AZ': hoje, 'BA': st})
 
-                    else:
-                        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB1:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1102/tabsHEADER_DETAIL/tabpTABHDT3/ssubTABSTRIPCONTROL2SUB:SAPLMEGUI:1230/subTEXTS:SAPLMMTE:0100/subEDITOR:SAPLMMTE:0101/cntlTEXT_EDITOR_0101/shellcont/shell").setSelectionIndexes(9,9)
-                        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0010/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT1").select()
-                        session.findById("wnd[0]/usr/subSUB0:SAPLMEGUI:0019/subSUB3:SAPLMEVIEWS:1100/subSUB2:SAPLMEVIEWS:1200/subSUB1:SAPLMEGUI:1301/subSUB2:SAPLMEGUI:1303/tabsITEM_DETAIL/tabpTABIDT1/ssubTABSTRIPCONTROL1SUB:SAPLMEGUI:1328/subSUB0:SAPLMLSP:0400/btnACCASS").press()
-                        session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KBLNR").text = j[9]
-                        session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KBLPOS").setFocus()
-                        session.findById("wnd[1]/usr/subKONTBLOCK:SAPLKACB:1101/ctxtCOBL-KBLPOS").caretPosition = 0
-                        session.findById("wnd[1]").sendVKey(4)
-                        session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/txtG_SELFLD_TAB-LOW[2,24]").text = j[9]
-                        session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/ctxtG_SELFLD_TAB-LOW[7,24]").text = "45510003"
-                        session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/ctxtG_SELFLD_TAB-LOW[7,24]").setFocus()
-                        session.findById("wnd[2]/usr/tabsG_SELONETABSTRIP/tabpTAB003/ssubSUBSCR_PRESEL:SAPLSDH4:0220/sub:SAPLSDH4:0220/ctxtG_SELFLD_TAB-LOW[7,24]").caretPosition = 8
-                        session.findById("wnd[2]").sendVKey(0)
-                        session.findById("wnd[2]").sendVKey(0)
-                        session.findById("wnd[1]").sendVKey(0)
-                        session.findById("wnd[0]/tbar[0]/btn[11]").press()
-                        session.findById("wnd[1]/usr/btnSPOP-VAROPTION1").press() 
-                        pc = session.findById("wnd[0]/sbar").text
-                        pc = pc.split()
-                        st = pc[4]
-                        pc = pc[8]
-                        pc = int(pc)
-                        print(pc)
-                        ws['AY'+str(i+2)].value = pc
-                        ws['AX'+str(i+2)].value = hoje
-                        ws['AZ'+str(i+2)].value = hoje
-                        ws['BA'+str(i+2)].value = st                
-                        wb.save(arquivo)
-                        
-                        # Acessa a transação ME23N (Consulta Pedido), encontra documento fiscal correspondente na pasta,
-                        # e o anexa no pedido
-                        session.findById("wnd[0]/tbar[0]/okcd").text = "/NME23N"
-                        session.findById("wnd[0]").sendVKey(0)
-                        session.findById("wnd[0]/titl/shellcont/shell").pressContextButton("%GOS_TOOLBOX")
-                        session.findById("wnd[0]/titl/shellcont/shell").selectContextMenuItem("%GOS_PCATTA_CREA")
-                        session.findById("wnd[1]/usr/ctxtDY_PATH").text = caminho
-                        session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = "NF {}.pdf".format(j[10])
-                        session.findById("wnd[1]/usr/ctxtDY_FILENAME").caretPosition = 9
-                        session.findById("wnd[1]/tbar[0]/btn[0]").press()
+                    # Anexa o documento fiscal correspondente ao pedido (na outra sessão, se disponível)
+                    self._anexa_nf(session, anexos, pc, caminho, "NF {}.pdf".format(j[10]))
 
                 except Exception as e:
-                    print(f"Erro ao processar pedido {i}: {e}")            
-
-        session.findById("wnd[0]/tbar[0]/btn[15]").press()
+                    self._marca_falha()
+                    print(f"Erro ao processar pedido da linha {i+2}: {e}")            
     print("Script finalizado")
 
     # Registra as folhas de serviço e as grava na planilha
+    @_medido("frs")
     def _frs(self, lista, arquivo):
         
         """
@@ -636,57 +844,66 @@ class mm:
             arquivo: o caminho da pasta com o nome da planilha a ser atualizada, conforme execução do script.
 
         """
+        if self._usa_motor_rfc("frs"):
+            dados_mestres = self._carrega_dados_mestres(self._sessao_medida(), "frs", lista, arquivo)
+            return self.motor_rfc.executa(self, "frs", lista, arquivo, dados_mestres)
         # Identifica a sessão disponível
-        session = self.session
-        if not session:
+        session = self._sessao_medida()
+        if not session and not self.backend.simulado:
             logging.error("Sessão não disponível para _frs.")
             return
+        dados_mestres = self._carrega_dados_mestres(session, "frs", lista, arquivo)
+        hoje = dt.date.today().strftime("%d/%m/%Y")
         
         # Percorre a lista de dados das planilha, maximiza a janela e abre a Ml81N (gera as FRS)
-        for i, j  in enumerate(lista):
-            session.findById("wnd[0]").maximize()
-            session.starttransaction("ML81N")
-            session.findById("wnd[0]").sendVKey(0)
-            
-            # Linhas de código extraídas do SAPScripting que navega em campos e telas do SAP
-            session.findById("wnd[1]/usr/ctxtRM11R-EBELN").text = j[13]
-            session.findById("wnd[1]/usr/ctxtRM11R-EBELN").caretPosition = 10
-            session.findById("wnd[1]").sendVKey(0)
-            session.findById("wnd[0]/tbar[1]/btn[13]").press()
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA").select()
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG").select()
-            session.findById("wnd[0]/usr/txtESSR-TXZ01").text = "PGTO {}".format(j[14][:30])
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-LBLNE").text = j[10]
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/ctxtESSR-DLORT").text = j[15]
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/ctxtESSR-LZVON").text = j[6]
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/ctxtESSR-LZBIS").text = j[7]
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-SBNAMAN").text = "SOLANO"
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA/ssubSUB_ACCEPTANCE:SAPLMLSR:0420/ctxtESSR-BLDAT").text = j[1]
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA/ssubSUB_ACCEPTANCE:SAPLMLSR:0420/txtESSR-XBLNR").text = j[10]
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGA/ssubSUB_ACCEPTANCE:SAPLMLSR:0420/txtESSR-BKTXT").text = "PGTO HOSPEDAGEM"
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-SBNAMAN").setFocus()
-            session.findById("wnd[0]/usr/tabsTAB_HEADER/tabpREGG/ssubSUB_HEADER:SAPLMLSR:0410/txtESSR-SBNAMAN").caretPosition = 6
-            session.findById("wnd[0]/usr/subSERVICE:SAPLMLSP:0400/btnSELEKTION").press()
-            session.findById("wnd[1]/tbar[0]/btn[0]").press()
-            session.findById("wnd[0]/tbar[1]/btn[9]").press()
-            session.findById("wnd[0]/tbar[0]/btn[11]").press()
-            session.findById("wnd[1]/tbar[0]/btn[9]").press()        
-            
-            # Grava a FRS e extrai  o número gerado na barra de status, preenchendo e 
-            # salvando nas colunas BB (número da FRS), BC (data da criação) e BD (data da conclusão)
-            session.findById("wnd[1]/tbar[0]/btn[8]").press()
-            frs = session.findById("wnd[0]/sbar").text
-            frs = frs[31:42]
-            frs = int(frs)
-            print(frs)      
-            ws['BB'+str(i+2)].value = frs
-            ws['BC'+str(i+2)].value = hoje
-            ws['BD'+str(i+2)].value = hoje
-            wb.save(arquivo)
-        session.findById("wnd[0]/tbar[0]/btn[15]").press()
+        for i, j  in self._percorre(lista, "frs", arquivo):
+            if self._dados_mestres_invalidos(dados_mestres, "frs", i, j):
+                continue
+            with self._linha_protegida(i):
+                # Lança a FRS com os campos mapeados da linha (ver core/documentos.py) e grava o número
+                # nas colunas BB (número da FRS), BC (data da criação) e BD (data da conclusão)
+                with self._passo("lanca_frs"):
+                    frs = self.backend.lanca_frs(session, folha_servico(j))
+                print(frs)      
+                self._grava_linha(arquivo, i+2, {'BB': frs, 'BC': hoje, 'BD': hoje})
+        self.backend.encerra(session)
     print('Script finalizado')
 
+    # Gera o arquivo de batch input (BDC) das FRS, sem sessão SAP, para processamento em uma única pasta (SM35)
+    def _frs_bdc(self, lista, arquivo):
+        """
+        Os números das FRS não voltam para a planilha: eles só existem depois que a pasta é
+        processada no servidor (confira com a conciliação ou pelo log da SM35). As folhas geradas
+        entram no índice incremental do FRS, com ou sem "Só linhas novas", para que uma execução
+        incremental posterior (pela ML81N ou outro BDC) não as lance de novo; a pasta é carregada
+        no SAP pelo programa sap/zcarga_bdc_frs.abap.
+
+        Args:
+            lista: linhas retornadas por _relatorio.
+            arquivo: o caminho da planilha; o batch input é gravado em '<planilha>.frs.bdc.txt'.
+
+        Returns:
+            O caminho do arquivo gerado.
+        """
+        indices = range(len(lista)) if self.linhas_selecionadas is None else list(self.linhas_selecionadas)
+        if self.incremental:
+            indices = self._filtra_incremental(lista, "frs", arquivo, indices)
+        destino = os.path.splitext(arquivo)[0] + ".frs.bdc.txt"
+        roteiro = carrega_roteiro(os.path.dirname(arquivo))
+        geradas, recusadas = gera_bdc_frs(lista, indices, destino, roteiro)
+        for i, problemas in recusadas.items():
+            print(f"AVISO: Linha {i+2} fora do batch input: {'; '.join(problemas)}.")
+        if self.indice_incremental is None:
+            self.indice_incremental = IndiceIncremental(arquivo)
+        if self._impressoes is None or self._impressoes[0] is not lista:
+            self._impressoes = (lista, impressoes(lista))
+        self._fluxo_atual = "frs"
+        self._conclui_incremental({i + 2: {} for i in geradas})
+        print(f"Batch input (FRS): {len(geradas)} folha(s) em '{destino}'; {len(recusadas)} linha(s) recusada(s).")
+        return destino
+
     # Registra os protocolos com a documentação  e os encaminha ao Setor Responsável para agendar o pagamento
+    @_medido("gd")
     def _gd(self, lista, arquivo):
         
         """
@@ -697,70 +914,61 @@ class mm:
             arquivo: o caminho da pasta com o nome da planilha a ser atualizada, conforme execução do script.
 
         """
-            # Identifica a sessão disponível
-            session = self.session
-            if not session:
-                logging.error("Sessão não disponível.")
-                return
-            # Percorre a lista de dados da planilha, maximiza a janela e abre a MlGD (gera protocolos)
-            for i, j  in enumerate(lista):
-                session.findById("wnd[0]").maximize()
-                session.starttransaction("MLGD")
-                session.findById("wnd[0]").sendVKey(0)
-                
-                # Linhas de código extraídas do SAPScripting que navegam em campos e telas do SAP
-                session.findById("wnd[0]/usr/radRB_NF_SERVICO").setFocus()
-                session.findById("wnd[0]/usr/radRB_NF_SERVICO").select()                        
-                session.findById("wnd[0]/usr/txtV_SF_TOMA").text = "000111"
-                session.findById("wnd[0]/usr/txtV_NFS").text = j[10]
-                session.findById("wnd[0]/usr/ctxtW_PROTCAB-BLDAT").text = j[1]
-                session.findById("wnd[0]/usr/ctxtW_PROTCAB-STCD1").text = j[0]
-                session.findById("wnd[0]/usr/ctxtW_PROTCAB-TXJCD").text = j[15]
-                session.findById("wnd[0]/usr/ctxtGV_FRS").text = j[16]
-                session.findById("wnd[0]/usr/ctxtGV_FRS").setFocus()
-                session.findById("wnd[0]/usr/ctxtGV_FRS").caretPosition = 10
-                session.findById("wnd[0]/tbar[1]/btn[8]").press()
-                session.findById("wnd[1]/usr/btnBT_SIM").press()
-                session.findById("wnd[1]/usr/radRB_LOCAL").select()
-                session.findById("wnd[1]/usr/radRB_LOCAL").setFocus()
-                session.findById("wnd[1]/usr/btnBT_OK").press()
-                session.findById("wnd[1]/usr/ctxtDY_PATH").setFocus()
-                session.findById("wnd[1]/usr/ctxtDY_PATH").caretPosition = 0
-                session.findById("wnd[1]").sendVKey(4)
-                #Localiza a pasta onde fica o documento fiscal e o anexa ao protocolo
-                session.findById("wnd[2]/usr/ctxtDY_PATH").text = pastaNF
-                session.findById("wnd[2]/usr/ctxtDY_FILENAME").text = "NF {}.pdf".format(j[10])
-                session.findById("wnd[2]/usr/ctxtDY_FILENAME").caretPosition = 13
-                session.findById("wnd[2]/tbar[0]/btn[0]").press()
-                # Grava o protocolo e extrai  o número gerado na barra de status, preenchendo e 
-                # salvando nas colunas BF (número do protocolo), BC (data da criação) e BD (data da conclusão)
-                session.findById("wnd[1]/tbar[0]/btn[0]").press()
-                gd = session.findById("wnd[0]/sbar").text
-                GD = gd[10:20]
-                GD = int(GD)
+        # Identifica a sessão disponível
+        session = self._sessao_medida()
+        if not session and not self.backend.simulado:
+            logging.error("Sessão não disponível.")
+            return
+        hoje = dt.date.today().strftime("%d/%m/%Y")
+        # Os documentos fiscais (NF) e as folhas de registro de serviço (FRS) ficam na pasta da planilha
+        pastaNF = pastaFRS = os.path.dirname(arquivo)
+        # Protocolos criados nesta execução ({protocolo: nota fiscal}), anexados de uma só vez ao final
+        protocolos = {}
+        try:
+            self._gera_protocolos(session, lista, arquivo, hoje, pastaNF, protocolos)
+        finally:
+            if protocolos:
+                self._anexa_frs_protocolos(session, protocolos, pastaFRS)
+        self.backend.encerra(session)
+
+    # Cria um protocolo na MLGD para cada linha, anexando a NF, e guarda os números criados em protocolos
+    def _gera_protocolos(self, session, lista, arquivo, hoje, pastaNF, protocolos):
+        dados_mestres = self._carrega_dados_mestres(session, "gd", lista, arquivo)
+        # Percorre a lista de dados da planilha, maximiza a janela e abre a MlGD (gera protocolos)
+        for i, j  in self._percorre(lista, "gd", arquivo):
+            if self._dados_mestres_invalidos(dados_mestres, "gd", i, j):
+                continue
+            with self._linha_protegida(i):
+                # Cria o protocolo com a NF anexada e grava o número nas colunas BF (número do protocolo),
+                # BG (data da criação) e BH (data da conclusão)
+                with self._passo("cria_protocolo"):
+                    GD = self.backend.cria_protocolo(session, protocolo(j), pastaNF)
                 print(GD)        
-                ws['BF'+str(i+2)].value = GD
-                ws['BG'+str(i+2)].value = hoje
-                ws['BH'+str(i+2)].value = hoje
-                wb.save(arquivo)
-                
-                # Acessa a transação MLGDC (Consulta protoco), encontra folha de registro de serviço correspondente na pastaFRS,
-                # e o anexa ao protocolo
-                session.starttransaction("MLGDC")
-                session.findById("wnd[0]").sendVKey(0)
-                session.findById("wnd[0]/usr/ctxtSO_BUKRS-LOW").text = "01"
-                session.findById("wnd[0]/usr/ctxtSO_PROTC-LOW").text = GD
-                session.findById("wnd[0]/usr/ctxtSO_PROTC-LOW").setFocus()
-                session.findById("wnd[0]/usr/ctxtSO_PROTC-LOW").caretPosition = 10
-                session.findById("wnd[0]/tbar[1]/btn[8]").press()
-                session.findById("wnd[0]/usr/shell").selectedRows = "0"
-                session.findById("wnd[0]/tbar[1]/btn[13]").press()
-                session.findById("wnd[1]/usr/radRB_LOCAL").select()
-                session.findById("wnd[1]/usr/radRB_LOCAL").setFocus()
-                session.findById("wnd[1]/usr/btnBT_OK").press()
-                session.findById("wnd[1]/usr/ctxtDY_PATH").text = pastaFRS
-                session.findById("wnd[1]/usr/ctxtDY_FILENAME").text = "FRS {}.pdf".format(j[10])
-                session.findById("wnd[1]/usr/ctxtDY_FILENAME").caretPosition = 11
-                session.findById("wnd[1]/tbar[0]/btn[0]").press()            
-            session.findById("wnd[0]/tbar[0]/btn[15]").press
-    print("Script finalizado")
\ No newline at end of file
+                self._grava_linha(arquivo, i+2, {'BF': GD, 'BG': hoje, 'BH': hoje})
+                protocolos[GD] = j[10]
+
+    # Anexa as FRS aos protocolos criados com uma única execução da MLGDC (seleção múltipla de protocolos)
+    def _anexa_frs_protocolos(self, session, protocolos, pastaFRS):
+        """
+        Args:
+            session: a sessão SAP.
+            protocolos: dict {número do protocolo: nota fiscal} dos protocolos criados na execução.
+            pastaFRS: pasta onde estão os arquivos "FRS <nota>.pdf".
+
+        Returns:
+            Lista dos protocolos que ficaram sem anexo.
+        """
+        pendentes = dict(protocolos)
+        inicio = time.perf_counter()
+        try:
+            with self._passo("anexa_frs_protocolos"):
+                self.backend.anexa_frs_protocolos(session, pendentes, pastaFRS)
+        except Exception as e:
+            logging.error(f"Falha no anexo das FRS na MLGDC: {e}")
+        finally:
+            self.metricas.incrementa("tempo_segundos_total", time.perf_counter() - inicio, fluxo="gd", origem="anexos")
+        anexados = len(protocolos) - len(pendentes)
+        print(f"FRS anexadas: {anexados} de {len(protocolos)} protocolo(s).")
+        for protocolo, nota in sorted(pendentes.items()):
+            print(f"AVISO: Protocolo {protocolo} (NF {nota}) ficou sem a FRS anexada.")
+        return sorted(pendentes)
\ No newline at end of file
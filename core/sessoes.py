@@ -0,0 +1,52 @@
+# Sessões extras do SAP GUI na mesma conexão, usadas por threads que trabalham em paralelo com o fluxo
+import time
+
+import win32com.client
+
+# Limite de sessões (modos) por conexão no SAP GUI
+MAXIMO_SESSOES = 6
+
+
+# Abre até n sessões extras na conexão da sessão informada (chamar na thread dona da sessão)
+def abre_sessoes(session, n):
+    """
+    Args:
+        session: uma sessão da conexão.
+        n: quantidade de sessões extras desejadas.
+
+    Returns:
+        Números (Info.SessionNumber) das sessões abertas; podem ser menos que n se o limite for atingido.
+    """
+    connection = session.Parent
+    existentes = {connection.Children(k).Info.SessionNumber for k in range(connection.Children.Count)}
+    n = max(0, min(n, MAXIMO_SESSOES - len(existentes)))
+    for _ in range(n):
+        session.createSession()
+    novas = set()
+    for _ in range(40):
+        atuais = {connection.Children(k).Info.SessionNumber for k in range(connection.Children.Count)}
+        novas = atuais - existentes
+        if len(novas) >= n:
+            break
+        time.sleep(0.5)  # cada sessão nova leva um instante para aparecer
+    return sorted(novas)
+
+
+# Localiza, a partir da thread atual (com o COM já inicializado), a sessão do usuário com o número informado
+def localiza_sessao(usuario, sistema, numero):
+    application = win32com.client.GetObject("SAPGUI").GetScriptingEngine
+    for i in range(application.Children.Count):
+        connection = application.Children(i)
+        for k in range(connection.Children.Count):
+            session = connection.Children(k)
+            info = session.Info
+            if info.User == usuario and info.SystemName == sistema and info.SessionNumber == numero:
+                return session
+    raise RuntimeError(f"sessão {numero} do usuário '{usuario}' em {sistema} não encontrada")
+
+
+def fecha_sessao(session):
+    try:
+        session.Parent.CloseSession(session.Id)
+    except Exception:
+        pass
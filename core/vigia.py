@@ -0,0 +1,295 @@
+# Vigia de travamentos: prazo por passo de scripting, foto das janelas abertas e respostas a popups conhecidos
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import pythoncom
+
+from .sessoes import localiza_sessao
+from .arvore_tela import foto_arvore, ArvoreIndisponivel
+
+# Arquivo opcional, na pasta da planilha, com regras extras (lista JSON no mesmo formato de REGRAS_PADRAO)
+ARQUIVO_REGRAS = "popups.json"
+
+# Popups e avisos conhecidos e como respondê-los. Campos de cada regra:
+#   nome: identificação no log;
+#   janela / texto: expressões regulares (sem distinção de maiúsculas) para o título e os textos do popup;
+#   sbar_tipo: se informado, a regra vale para a barra de status da janela principal (ex.: "W" = aviso);
+#   acao: "enter", "cancelar", "sim", "nao" ou o ID de um botão relativo à janela (ex.: "usr/btnBUTTON_1");
+#   abortar: se true, depois da ação a linha é abortada (LinhaAbortada) em vez de o passo ser repetido.
+# As regras padrão nunca confirmam: cancelam o popup e a linha vira falha, para o operador conferir. Confirmar
+# (ex.: "acao": "enter" no aviso de orçamento) é uma escolha explícita, feita no popups.json da pasta da planilha
+REGRAS_PADRAO = [
+    {"nome": "aviso de orçamento", "texto": r"or[cç]amento|budget", "acao": "cancelar", "abortar": True},
+    {"nome": "nota fiscal duplicada", "texto": r"j[aá] (foi )?(registrad|lan[cç]ad|entrad)|duplicad",
+     "acao": "cancelar", "abortar": True},
+    {"nome": "aviso na barra de status", "sbar_tipo": "W", "acao": "cancelar", "abortar": True},
+]
+
+# Prazo (s) de cada passo por método de scripting; os demais usam o prazo padrão
+PRAZOS_PADRAO = {"press": 120, "sendvkey": 120, "starttransaction": 90}
+
+
+# A linha em andamento foi abortada pelo vigia (travamento sem regra conhecida ou popup de uma regra que aborta)
+class LinhaAbortada(Exception):
+    pass
+
+
+# Carrega as regras da pasta da planilha (se houver) na frente das regras padrão
+def carrega_regras(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_REGRAS)
+    if not os.path.exists(caminho):
+        return list(REGRAS_PADRAO)
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            extras = json.load(f)
+        return list(extras) + list(REGRAS_PADRAO)
+    except Exception as e:
+        logging.warning(f"Regras de popups em '{caminho}' ilegíveis; usando só as padrão: {e}")
+        return list(REGRAS_PADRAO)
+
+
+# Fotografa a sessão: janelas abertas (título e textos da área de usuário) e a barra de status; com
+# GetObjectTree, tudo em uma chamada, senão lendo controle por controle
+def instantaneo(session):
+    """
+    Returns:
+        {"janelas": [{"id": "wnd[0]", "titulo": ..., "textos": [...]}, ...],
+         "sbar": {"texto": ..., "tipo": ...}}
+    """
+    try:
+        return _instantaneo_arvore(foto_arvore(session))
+    except ArvoreIndisponivel:
+        pass
+    janelas = []
+    for k in range(session.Children.Count):
+        janela = session.Children(k)
+        textos = []
+        if k > 0:
+            try:
+                usr = janela.findById("usr")
+                for c in range(usr.Children.Count):
+                    texto = str(usr.Children(c).Text).strip()
+                    if texto:
+                        textos.append(texto)
+            except Exception:
+                pass
+        janelas.append({"id": str(janela.Id).rsplit("/", 1)[-1], "titulo": str(janela.Text), "textos": textos})
+    try:
+        sbar = session.findById("wnd[0]/sbar")
+        barra = {"texto": str(sbar.Text), "tipo": str(sbar.MessageType)}
+    except Exception:
+        barra = {"texto": "", "tipo": ""}
+    return {"janelas": janelas, "sbar": barra}
+
+
+# Mesma foto montada a partir da árvore de controles da sessão, lida em uma única chamada
+def _instantaneo_arvore(arvore):
+    janelas = []
+    for janela in arvore.janelas():
+        textos = []
+        if janela != "wnd[0]":
+            textos = [texto for texto in (arvore.texto(c).strip() for c in arvore.filhos(f"{janela}/usr")) if texto]
+        janelas.append({"id": janela, "titulo": arvore.texto(janela), "textos": textos})
+    barra = {"texto": arvore.texto("wnd[0]/sbar"), "tipo": str(arvore.propriedade("wnd[0]/sbar", "MessageType"))}
+    return {"janelas": janelas, "sbar": barra}
+
+
+# Escolhe a regra que se aplica à foto: o popup do topo ou, sem popup, o aviso da barra de status
+def regra_para(regras, foto):
+    """
+    Returns:
+        (regra, id da janela a responder) ou (None, None).
+    """
+    popups = foto["janelas"][1:]
+    for regra in regras:
+        if regra.get("sbar_tipo"):
+            barra = foto["sbar"]
+            if (not popups and barra["tipo"] == regra["sbar_tipo"]
+                    and re.search(regra.get("texto", ""), barra["texto"], re.I)):
+                return regra, "wnd[0]"
+            continue
+        if not popups:
+            continue
+        topo = popups[-1]
+        if (re.search(regra.get("janela", ""), topo["titulo"], re.I)
+                and re.search(regra.get("texto", ""), " ".join([topo["titulo"]] + topo["textos"]), re.I)):
+            return regra, topo["id"]
+    return None, None
+
+
+def aplica_acao(session, janela, acao):
+    alvo = session.findById(janela)
+    if acao == "enter":
+        alvo.sendVKey(0)
+    elif acao == "cancelar":
+        alvo.sendVKey(12)
+    elif acao == "sim":
+        session.findById(f"{janela}/usr/btnSPOP-OPTION1").press()
+    elif acao == "nao":
+        session.findById(f"{janela}/usr/btnSPOP-OPTION2").press()
+    else:
+        session.findById(f"{janela}/{acao}").press()
+
+
+# Fecha os popups abertos (do topo para baixo), deixando a sessão pronta para a próxima linha
+def fecha_popups(session):
+    for k in range(session.Children.Count - 1, 0, -1):
+        try:
+            session.Children(k).sendVKey(12)
+        except Exception:
+            try:
+                session.Children(k).close()
+            except Exception:
+                pass
+
+
+# Acompanha os passos do fluxo (via SessaoMedida) e intervém quando um passo trava ou falha por um popup
+class Vigia:
+    """
+    Dois caminhos de intervenção:
+      - falha: uma chamada de scripting falhou com um popup (ou aviso) na tela; a regra correspondente
+        é aplicada na própria thread do fluxo e a chamada é repetida uma vez (ver SessaoMedida), ou,
+        se a regra abortar, a linha é registrada como falha;
+      - travamento: um passo passou do prazo; a thread do vigia localiza a mesma sessão, fotografa as
+        janelas e aplica a regra. Sem regra, fecha os popups e aborta a linha: a próxima chamada do
+        fluxo levanta LinhaAbortada e a linha é registrada como falha.
+
+    Args:
+        regras: regras de popups (ver REGRAS_PADRAO e carrega_regras()).
+        prazo_passo: prazo padrão (s) de um passo.
+        prazos: prazos por método de scripting (nomes em minúsculas).
+        respostas_por_linha: quantas regras podem ser aplicadas em uma mesma linha.
+        metricas: registro de métricas (opcional).
+    """
+
+    def __init__(self, regras=None, prazo_passo=60, prazos=None, respostas_por_linha=3, metricas=None):
+        self.regras = list(REGRAS_PADRAO if regras is None else regras)
+        self.prazo_passo = prazo_passo
+        self.prazos = dict(PRAZOS_PADRAO if prazos is None else prazos)
+        self.respostas_por_linha = respostas_por_linha
+        self.metricas = metricas
+        self._session = None
+        self._passo = None
+        self._linha = None
+        self._respostas = 0
+        self._abortada = False
+        self._parar = None
+
+    # Nova instância com a mesma configuração (uma por sessão)
+    def copia(self):
+        return Vigia(self.regras, self.prazo_passo, self.prazos, self.respostas_por_linha, self.metricas)
+
+    # ----------------------- Ciclo de vida -----------------------
+    def inicia(self, session):
+        self.para()
+        self._session = session
+        info = session.Info
+        self._identificacao = (info.User, info.SystemName, info.SessionNumber)
+        self._parar = threading.Event()
+        threading.Thread(target=self._laco, args=(self._parar,), name="vigia-travamentos", daemon=True).start()
+
+    def para(self):
+        if self._parar is not None:
+            self._parar.set()
+            self._parar = None
+        self._session = None
+        self._passo = None
+        self._abortada = False
+
+    # Nova linha: `numero` é o da planilha (o cabeçalho é a linha 1), o mesmo das mensagens do fluxo
+    def inicia_linha(self, numero):
+        self._linha = numero
+        self._respostas = 0
+        self._abortada = False
+
+    # ----------------------- Passos (chamados pela SessaoMedida) -----------------------
+    def inicia_passo(self, metodo, id_elemento):
+        if self._abortada:
+            raise LinhaAbortada(f"linha {self._linha} abortada pelo vigia de travamentos")
+        self._passo = (str(metodo).lower(), id_elemento, time.monotonic())
+
+    def conclui_passo(self):
+        self._passo = None
+
+    # Chamada de scripting falhou: responde ao popup conhecido, se houver. Devolve True para repetir a chamada;
+    # se a regra abortar a linha, levanta LinhaAbortada (a linha é registrada como falha e o fluxo segue)
+    def trata_falha(self):
+        session = self._session
+        if session is None or self._abortada or self._respostas >= self.respostas_por_linha:
+            return False
+        try:
+            # Verificação barata antes da foto completa: sem popup e sem aviso, não há o que responder
+            if session.Children.Count < 2 and session.findById("wnd[0]/sbar").MessageType != "W":
+                return False
+            repetir = self._responde(session, "falha")
+        except Exception as e:
+            logging.debug(f"Vigia: não foi possível examinar a tela após a falha: {e}")
+            return False
+        if self._abortada:
+            raise LinhaAbortada(f"linha {self._linha} abortada pelo vigia: popup cancelado pela regra de popups")
+        return repetir
+
+    # ----------------------- Intervenção -----------------------
+    def _responde(self, session, origem):
+        foto = instantaneo(session)
+        regra, janela = regra_para(self.regras, foto)
+        if regra is None:
+            logging.warning(f"Vigia ({origem}, linha {self._linha}): nenhuma regra para a tela {json.dumps(foto, ensure_ascii=False)}")
+            return False
+        logging.warning(f"Vigia ({origem}, linha {self._linha}): regra '{regra.get('nome', '')}' "
+                        f"aplicada em {janela} ({regra['acao']}); tela: {json.dumps(foto, ensure_ascii=False)}")
+        aplica_acao(session, janela, regra["acao"])
+        self._respostas += 1
+        self._conta("regra")
+        if regra.get("abortar"):
+            # O popup indica um problema da linha: o passo não é repetido e a próxima chamada do fluxo falha
+            self._abortada = True
+            self._conta("abortada")
+            logging.error(f"Vigia: linha {self._linha} abortada pela regra '{regra.get('nome', '')}'.")
+            return False
+        return True
+
+    def _prazo(self, metodo):
+        return self.prazos.get(metodo, self.prazo_passo)
+
+    def _laco(self, parar):
+        pythoncom.CoInitialize()
+        session = None
+        try:
+            while not parar.wait(1.0):
+                passo = self._passo
+                if passo is None or self._abortada:
+                    continue
+                metodo, id_elemento, inicio = passo
+                if time.monotonic() - inicio < self._prazo(metodo):
+                    continue
+                self._conta("travamento")
+                logging.warning(f"Vigia: passo '{metodo}' ({id_elemento or '-'}) da linha {self._linha} "
+                                f"sem resposta há {time.monotonic() - inicio:.0f} s.")
+                try:
+                    if session is None:
+                        session = localiza_sessao(*self._identificacao)
+                    if self._respostas < self.respostas_por_linha and self._responde(session, "travamento"):
+                        # Novo prazo para o mesmo passo, que deve seguir depois da resposta
+                        if self._passo is passo:
+                            self._passo = (metodo, id_elemento, time.monotonic())
+                        continue
+                    if self._abortada:
+                        continue  # a regra já respondeu e abortou a linha
+                    fecha_popups(session)
+                except Exception as e:
+                    logging.error(f"Vigia: não foi possível intervir na sessão travada: {e}")
+                self._abortada = True
+                self._conta("abortada")
+                logging.error(f"Vigia: linha {self._linha} abortada (passo '{metodo}' travado, sem regra conhecida).")
+        finally:
+            session = None
+            pythoncom.CoUninitialize()
+
+    def _conta(self, evento):
+        if self.metricas is not None:
+            self.metricas.incrementa("vigia_total", evento=evento)
@@ -8,6 +8,7 @@ Unifica as funcionalidades de:
 - Registro de Serviço (btn_frs) -> mm._frs()
 - Gestão de Documentos (btn_gd) -> mm._gd()
 - Gerenciador de Senhas (btn_senha) -> keyring (cadastro/consulta)
+- Cancelar (btn_cancelar) -> mm.cancelar() / ExecucaoFragmentada.cancelar()
 
 Requisitos:
   pip install PySide2 keyring
@@ -19,6 +20,7 @@ plainTextEdit e txt_path).
 
 import sys
 import os
+import threading
 from datetime import datetime
 
 try:
@@ -26,13 +28,39 @@ try:
 except Exception:
     keyring = None  # permite abrir a UI mesmo sem keyring instalado
 
+from PySide2.QtCore import QObject, Signal, QTimer
 from PySide2.QtWidgets import (
     QApplication, QMainWindow, QMessageBox, QFileDialog, QDialog,
-    QVBoxLayout, QFormLayout, QLineEdit, QPushButton
+    QVBoxLayout, QFormLayout, QGridLayout, QGroupBox, QLineEdit, QPushButton, QCheckBox
 )
 
 from ui_main import Ui_MainWindow
+from tabela_linhas import PainelLinhas
+from painel_desempenho import PainelDesempenho
 from mm.servicos import mm
+from mm.metricas import Metricas
+from mm.fragmentacao import ExecucaoFragmentada, carrega_contas, ARQUIVO_CONTAS
+from mm.registro import inicia_registro, para_registro
+from mm.coordenacao import ExecucaoCoordenada
+from mm.vigia import Vigia, carrega_regras
+from mm.motor_rfc import MotorRfc, ARQUIVO_RFC
+from mm.backends import BackendGravacao
+
+# Porta local onde as métricas das automações ficam disponíveis (http://127.0.0.1:9108/metrics)
+PORTA_METRICAS = 9108
+
+# Com "Requisições em lotes" marcado, requisições com mais itens que isto são divididas em várias RCs
+# (pela classificação contábil), criadas em paralelo em até SESSOES_REQUISICAO sessões do SAP
+TAMANHO_LOTE_REQUISICAO = 50
+SESSOES_REQUISICAO = 3
+
+# Intervalo (ms) em que os estados das linhas recebidos dos fluxos são aplicados à tabela
+INTERVALO_TABELA_MS = 300
+
+# Pasta dos logs em JSON lines (ao lado do executável, quando empacotado com o PyInstaller)
+PASTA_LOGS = os.path.join(
+    os.path.dirname(sys.executable if getattr(sys, "frozen", False) else os.path.abspath(__file__)), "logs"
+)
 
 
 # ------------------------------------------------------------------
@@ -43,15 +71,23 @@ from mm.servicos import mm
 # diretamente na interface gráfica.
 
 
-class EmissorDeLog:
+class EmissorDeLog(QObject):
+    # O texto é entregue ao widget pela thread da interface, mesmo quando o print vem de outra thread
+    mensagem_recebida = Signal(str)
+
     def __init__(self, widget):
+        super(EmissorDeLog, self).__init__()
         self.widget = widget
+        self.mensagem_recebida.connect(self._acrescenta)
 
     def write(self, mensagem):
+        texto = (mensagem or "").rstrip("\n")
+        if texto:
+            self.mensagem_recebida.emit(texto)
+
+    def _acrescenta(self, texto):
         try:
-            texto = (mensagem or "").rstrip("\n")
-            if texto:
-                self.widget.appendPlainText(texto)
+            self.widget.appendPlainText(texto)
         except Exception:
             # Em último caso, evita travar se o widget ainda não estiver pronto
             pass
@@ -205,10 +241,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             super(MainWindow, self).__init__()
             self.setupUi(self)
             self.setWindowTitle("Sistema Gestor de Hospedagem")
+            # Espaço para a tabela de linhas ao lado do log e para o painel de desempenho abaixo dele
+            self.resize(max(self.width(), 1100), max(self.height(), 700))
             # Redireciona prints para o QPlainTextEdit
             self._stdout_original = sys.stdout
             sys.stdout = EmissorDeLog(self.plainTextEdit)
 
+            # Registros do logging: gravados em JSON lines por uma thread própria; avisos e erros também aparecem aqui
+            try:
+                print(f"Log detalhado em: {inicia_registro(PASTA_LOGS)}")
+            except OSError as e:
+                print(f"AVISO: Não foi possível iniciar o log em '{PASTA_LOGS}': {e}")
+
             # Ligações dos botões (mantendo a mesma UI)
             self.btn_abrir.clicked.connect(self.open_file)
             self.btn_rc.clicked.connect(self.process_requisicao)
@@ -217,6 +261,104 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.btn_gd.clicked.connect(self.process_gd)
             self.btn_senha.clicked.connect(self.open_password_dialog)
 
+            # Cancelar: habilitado enquanto um fluxo roda; ele para ao final da linha atual
+            self.btn_cancelar = QPushButton("Cancelar")
+            self.btn_cancelar.setToolTip("Interrompe o processo em andamento ao final da linha atual; "
+                                         "os documentos já criados são gravados na planilha")
+            self.btn_cancelar.setEnabled(False)
+            self.btn_cancelar.clicked.connect(self.cancel_process)
+            self.horizontalLayout.addWidget(self.btn_cancelar)
+            # Automação (ou execução com várias contas) que o botão Cancelar interrompe
+            self._cancelavel = None
+            # Fluxo em andamento (a janela não fecha durante ele) e pedido para fechar assim que ele terminar
+            self._em_execucao = False
+            self._fechar_ao_terminar = False
+
+            # Modo rápido: vale para o fluxo iniciado enquanto estiver marcado
+            self.chk_rapido = QCheckBox("Modo rápido")
+            self.chk_rapido.setToolTip("Trava a interface do SAP e mantém a janela minimizada durante a execução")
+
+            # Várias contas: divide as linhas entre os usuários de 'sap_users.txt' (senhas no keyring)
+            self.chk_contas = QCheckBox("Várias contas")
+            self.chk_contas.setToolTip(f"Divide as linhas entre os usuários listados em '{ARQUIVO_CONTAS}', na pasta da planilha")
+
+            # Só linhas novas: processa apenas as linhas ainda não concluídas no fluxo (índice ao lado da planilha)
+            self.chk_incremental = QCheckBox("Só linhas novas")
+            self.chk_incremental.setToolTip("Ignora as linhas já processadas neste fluxo e avisa sobre as alteradas depois disso")
+
+            # Várias estações: as máquinas que abrirem a mesma planilha (pasta compartilhada) dividem as linhas
+            self.chk_estacoes = QCheckBox("Várias estações")
+            self.chk_estacoes.setToolTip("Reserva as linhas em lotes no arquivo '<planilha>.reservas.sqlite', ao lado da planilha, "
+                                         "para que outras estações trabalhem a mesma planilha sem duplicar documentos")
+
+            # Motor RFC: requisição, pedido e FRS criados por BAPIs (parâmetros em 'sap_rfc.json', na pasta da planilha)
+            self.chk_rfc = QCheckBox("Motor RFC")
+            self.chk_rfc.setToolTip(f"Cria os documentos por RFC/BAPI, com commit em lotes, usando os parâmetros de '{ARQUIVO_RFC}' "
+                                    "na pasta da planilha (requer pyrfc); a Gestão de Documentos continua pelo SAP GUI")
+            # Motores RFC já criados, por pasta: as conexões ficam abertas entre as execuções
+            self._motores_rfc = {}
+
+            # Simulação: os documentos são montados e registrados em '<planilha>.simulacao.jsonl', sem SAP e sem gravar a planilha
+            self.chk_simulacao = QCheckBox("Simulação")
+            self.chk_simulacao.setToolTip("Percorre a planilha e registra cada documento (com os tempos) em '<planilha>.simulacao.jsonl', "
+                                          "sem conectar ao SAP nem gravar a planilha (execução com uma conta)")
+
+            # FRS em lote: o botão FRS gera o batch input '<planilha>.frs.bdc.txt' em vez de lançar as folhas pela ML81N
+            self.chk_bdc = QCheckBox("FRS em lote (BDC)")
+            self.chk_bdc.setToolTip("Gera as folhas de serviço como batch input, para processamento no servidor em uma única "
+                                    "pasta (SM35), sem conectar ao SAP nem gravar a planilha")
+
+            # Conciliar: ao final do fluxo, confere os documentos do dia contra a planilha com uma única consulta no SAP
+            self.chk_conciliar = QCheckBox("Conciliar ao final")
+            self.chk_conciliar.setToolTip("Exporta de uma vez os documentos criados hoje e sinaliza os ausentes, duplicados "
+                                          "ou com número/valor divergente em '<planilha>.conciliacao_<fluxo>.xlsx'")
+
+            # Validar dados mestres: confere os centros de custo e domicílios em um cache local antes de chamar o SAP
+            self.chk_dados_mestres = QCheckBox("Validar dados mestres")
+            self.chk_dados_mestres.setToolTip("Baixa do SE16N (em 'dados_mestres.json', na pasta da planilha) os centros de custo, "
+                                              "redes, PEP e domicílios e recusa antes do SAP as linhas com valor inexistente")
+
+            # Índice do pedido: fornecedores, itens de RC e reservas consultados de uma vez antes do primeiro pedido
+            self.chk_indice_pedido = QCheckBox("Índice do pedido")
+            self.chk_indice_pedido.setToolTip("No Pedido, consulta de uma vez no SE16N (LFA1, EBAN e KBLP) os fornecedores, "
+                                              "itens de RC e reservas da planilha, sem abrir as ajudas de pesquisa a cada pedido")
+
+            # Anexos em paralelo: os anexos dos pedidos seguem por uma segunda sessão enquanto os pedidos são criados
+            self.chk_anexos = QCheckBox("Anexos em paralelo")
+            self.chk_anexos.setToolTip("No Pedido, abre uma sessão SAP extra só para anexar as NFs, "
+                                       "sem esperar cada anexo antes do próximo pedido")
+
+            # Gravação direta: só as células alteradas são reescritas no XML da planilha, sem o openpyxl
+            self.chk_gravacao_direta = QCheckBox("Gravação direta")
+            self.chk_gravacao_direta.setToolTip("Grava os números dos documentos direto no XML da planilha ativa, sem carregar "
+                                                "a pasta de trabalho inteira (recomendado para planilhas grandes)")
+
+            # Requisições em lotes: listas grandes viram várias RCs criadas em paralelo em sessões extras
+            self.chk_lotes_requisicao = QCheckBox("Requisições em lotes")
+            self.chk_lotes_requisicao.setToolTip(f"Na Requisição, divide listas com mais de {TAMANHO_LOTE_REQUISICAO} linhas "
+                                                 f"em várias RCs, criadas em paralelo em até {SESSOES_REQUISICAO} sessões do SAP")
+
+            # Opções agrupadas em colunas acima dos botões dos processos
+            self.grp_opcoes = QGroupBox("Opções", self.centralwidget)
+            grade_opcoes = QGridLayout(self.grp_opcoes)
+            opcoes = (self.chk_rapido, self.chk_contas, self.chk_estacoes, self.chk_incremental,
+                      self.chk_rfc, self.chk_simulacao, self.chk_bdc, self.chk_conciliar,
+                      self.chk_dados_mestres, self.chk_indice_pedido, self.chk_anexos,
+                      self.chk_gravacao_direta, self.chk_lotes_requisicao)
+            for n, opcao in enumerate(opcoes):
+                grade_opcoes.addWidget(opcao, n // 5, n % 5)
+            self.verticalLayout_2.insertWidget(self.verticalLayout_2.indexOf(self.frame_5), self.grp_opcoes)
+            # Opções que a execução com várias contas não usa ficam desabilitadas enquanto ela estiver marcada
+            self.chk_contas.toggled.connect(self._atualiza_opcoes)
+            self.chk_estacoes.toggled.connect(self._atualiza_opcoes)
+
+            # Tabela com a situação de cada linha, ao lado do log (só as linhas visíveis são desenhadas)
+            self.painel_linhas = PainelLinhas(self.frame)
+            self.horizontalLayout_3.addWidget(self.painel_linhas, 2)
+            self._temporizador_linhas = QTimer(self)
+            self._temporizador_linhas.timeout.connect(self.painel_linhas.modelo.aplica_pendentes)
+            self._temporizador_linhas.start(INTERVALO_TABELA_MS)
+
             # Texto padrão (a UI já tem placeholder, mas deixo um valor inicial visível)
             if not self.txt_path.text().strip():
                 self.txt_path.setText("Planilha com dados ---- >")
@@ -226,14 +368,54 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self._sap_environment = "F04 - SAP Scripting Produção"
             self._sap_logon_path = r"C:\\Program Files (x86)\\SAP\\FrontEnd\\SAPgui\\saplogon.exe"
 
+            # Métricas das automações: servidor HTTP local (formato Prometheus) e arquivo JSON na pasta da planilha
+            self._metricas = Metricas()
+            try:
+                self._metricas.inicia_servidor(porta=PORTA_METRICAS)
+                print(f"Métricas disponíveis em http://127.0.0.1:{PORTA_METRICAS}/metrics")
+            except OSError as e:
+                print(f"AVISO: Não foi possível publicar as métricas na porta {PORTA_METRICAS}: {e}")
+
+            # Painel de desempenho abaixo do log: vazão, término previsto, latência e passos mais lentos,
+            # lidos das métricas uma vez por segundo
+            self.painel_desempenho = PainelDesempenho(self._metricas, self.centralwidget)
+            self.verticalLayout_2.insertWidget(self.verticalLayout_2.indexOf(self.frame) + 1, self.painel_desempenho)
+
     # ----------------------- UI -----------------------
     def closeEvent(self, event):
+        # Com um fluxo em andamento, a thread dele ainda usa o log, as métricas e o motor RFC:
+        # a janela só fecha depois que ele para (ao final da linha atual, se o usuário confirmar)
+        if self._em_execucao:
+            event.ignore()
+            if self._fechar_ao_terminar:
+                return
+            resposta = QMessageBox.question(
+                self, "Processo em andamento",
+                "Um processo está em andamento. Cancelar e fechar a janela ao final da linha atual?",
+            )
+            if resposta == QMessageBox.Yes:
+                self._fechar_ao_terminar = True
+                self.cancel_process()
+            return
         try:
             sys.stdout = self._stdout_original
         except Exception:
             pass
+        self._metricas.para()
+        for motor in self._motores_rfc.values():
+            motor.pool.fecha()
+        para_registro()
         super().closeEvent(event)
 
+    # Desabilita as opções ignoradas pela combinação marcada: com "Várias contas", as linhas já são divididas
+    # entre as contas e cada conta segue pelo SAP GUI, sem estações, RFC, simulação, BDC, lotes nem conciliação
+    def _atualiza_opcoes(self):
+        contas = self.chk_contas.isChecked()
+        for opcao in (self.chk_estacoes, self.chk_rfc, self.chk_simulacao, self.chk_bdc,
+                      self.chk_conciliar, self.chk_lotes_requisicao):
+            opcao.setEnabled(not contas)
+        self.chk_contas.setEnabled(not self.chk_estacoes.isChecked())
+
     def open_password_dialog(self):
         # Abre a caixa de diálogo de gerenciamento de senhas
         dlg = PasswordDialog(self)
@@ -268,27 +450,198 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             return ""
         return caminho
 
+    # Pede ao processo em andamento que pare ao final da linha atual
+    def cancel_process(self):
+        if self._cancelavel is None:
+            return
+        self._cancelavel.cancelar()
+        self.btn_cancelar.setEnabled(False)
+        print("Cancelamento solicitado: o processo para ao final da linha atual.")
+
+    # Executa a função em uma thread própria e mantém a janela respondendo (log, tabela e o botão Cancelar)
+    # até ela terminar; a exceção da thread é relançada aqui, na thread da interface
+    def _em_segundo_plano(self, cancelavel, funcao, caminho_excel):
+        """
+        Args:
+            cancelavel: objeto com cancelar() (mm ou ExecucaoFragmentada) acionado pelo botão Cancelar.
+            funcao: trabalho sem argumentos; objetos COM (sessão SAP) devem ser obtidos dentro dela.
+            caminho_excel: planilha do fluxo; enquanto ele roda, as métricas são gravadas em 'metricas.json',
+                na pasta dela.
+
+        Returns:
+            O retorno da função.
+        """
+        resultado = {}
+
+        def alvo():
+            try:
+                resultado["valor"] = funcao()
+            except Exception as e:
+                resultado["erro"] = e
+
+        # Os botões dos fluxos ficam desabilitados: um clique durante a espera iniciaria outro fluxo
+        botoes = (self.btn_abrir, self.btn_rc, self.btn_pc, self.btn_frs, self.btn_gd)
+        for botao in botoes:
+            botao.setEnabled(False)
+        self._cancelavel = cancelavel
+        self._em_execucao = True
+        self.btn_cancelar.setEnabled(True)
+        self._metricas.inicia_exportacao_json(os.path.join(os.path.dirname(caminho_excel), "metricas.json"))
+        trabalho = threading.Thread(target=alvo, name="fluxo-sap", daemon=True)
+        trabalho.start()
+        try:
+            while trabalho.is_alive():
+                QApplication.processEvents()
+                trabalho.join(0.1)
+        finally:
+            self._metricas.para_exportacao_json()
+            self._cancelavel = None
+            self._em_execucao = False
+            self.btn_cancelar.setEnabled(False)
+            for botao in botoes:
+                botao.setEnabled(True)
+            # Fechamento pedido durante o fluxo: a janela fecha depois que o chamador terminar de gravar o log
+            if self._fechar_ao_terminar:
+                QTimer.singleShot(0, self.close)
+        if "erro" in resultado:
+            raise resultado["erro"]
+        return resultado.get("valor")
+
     # ----------------------- Conexão ao SAP ----------------------
-    def _conectar_sap(self):
-        # Cria a instância da automação (mm) e estabelece a sessão no SAP
-        # Se a conexão falhar, exibe um aviso e retorna None
-        print("Iniciando conexão com o SAP...")
+    def _nova_automacao_sap(self):
+        # Cria a instância da automação (mm); a sessão no SAP é estabelecida depois, na thread do fluxo
+        # (_executa_fluxo), porque os objetos COM pertencem à thread que inicializou o COM
         automacao_sap = mm(
             sap_user=self._sap_user,
             sap_environment=self._sap_environment,
             sap_logon_path=self._sap_logon_path,
+            metricas=self._metricas,
         )
-        sessao_ativa = automacao_sap._conecta()
-        if sessao_ativa:
-            print("Conexão com o SAP estabelecida com sucesso.")
-            return automacao_sap
-        else:
+        # Simulação: nenhuma conexão; o backend de gravação registra os documentos ao lado da planilha
+        if self.chk_simulacao.isChecked():
+            caminho_excel = self.txt_path.text().strip()
+            automacao_sap.backend = BackendGravacao(os.path.splitext(caminho_excel)[0] + ".simulacao.jsonl")
+            print(f"Simulação: documentos registrados em '{automacao_sap.backend.arquivo}'.")
+        return automacao_sap
+
+    # Conecta e executa o fluxo em uma thread própria (a janela e o botão Cancelar seguem respondendo);
+    # com "Várias estações", as linhas são reservadas em lotes e, com "Conciliar ao final", os documentos
+    # criados desde o início são conferidos contra a planilha
+    def _executa_fluxo(self, automacao_sap, fluxo, lista, caminho_excel):
+        """
+        Returns:
+            False se não foi possível conectar ao SAP (o aviso já foi exibido); True caso contrário.
+        """
+        desde = datetime.now().date()
+        self._acompanha_linhas(automacao_sap, lista)
+        automacao_sap.vigia = self._novo_vigia(caminho_excel)
+        simulacao = automacao_sap.backend.simulado
+        automacao_sap.motor_rfc = (self._motor_rfc(caminho_excel, automacao_sap)
+                                   if self.chk_rfc.isChecked() and not simulacao else None)
+        # As opções são lidas aqui: a thread do fluxo não consulta os widgets
+        coordenada = self.chk_estacoes.isChecked() and not simulacao
+        conciliar = self.chk_conciliar.isChecked() and not simulacao
+
+        def trabalho():
+            try:
+                if not simulacao:
+                    print("Iniciando conexão com o SAP...")
+                    if not automacao_sap._conecta():
+                        return False
+                    print("Conexão com o SAP estabelecida com sucesso.")
+                if coordenada:
+                    ExecucaoCoordenada().executa(automacao_sap, fluxo, lista, caminho_excel)
+                else:
+                    getattr(automacao_sap, "_" + fluxo)(lista, caminho_excel)
+                if conciliar:
+                    print(f"Conciliando {fluxo} com o SAP...")
+                    automacao_sap._concilia(fluxo, lista, caminho_excel, desde)
+                return True
+            finally:
+                # Libera os objetos COM da execução e encerra o COM iniciado pela conexão
+                automacao_sap._encerra_com()
+
+        if self._em_segundo_plano(automacao_sap, trabalho, caminho_excel):
+            return True
+        QMessageBox.warning(
+            self,
+            "Erro",
+            "Não foi possível conectar ao SAP. Verifique as configurações ou se o SAP GUI está instalado."
+        )
+        return False
+
+    # Opções marcadas na janela que valem para o fluxo iniciado (na automação ou na execução com várias contas)
+    def _aplica_opcoes(self, alvo):
+        alvo.modo_rapido = self.chk_rapido.isChecked()
+        alvo.incremental = self.chk_incremental.isChecked()
+        alvo.validar_dados_mestres = self.chk_dados_mestres.isChecked()
+        alvo.usar_indice_pedido = self.chk_indice_pedido.isChecked()
+        alvo.anexos_em_paralelo = self.chk_anexos.isChecked()
+        alvo.gravacao_direta = self.chk_gravacao_direta.isChecked()
+
+    # Exibe as linhas da lista na tabela e passa a receber os estados que o fluxo informa
+    def _acompanha_linhas(self, automacao_sap, lista):
+        self.painel_linhas.modelo.carrega(lista)
+        automacao_sap.ouvinte_linhas = self.painel_linhas.modelo.registra
+
+    # Vigia de travamentos com as regras de popups padrão e as de 'popups.json', na pasta da planilha
+    def _novo_vigia(self, caminho_excel):
+        return Vigia(carrega_regras(os.path.dirname(caminho_excel)), metricas=self._metricas)
+
+    # Motor RFC da pasta da planilha (criado uma vez e reaproveitado); None se não houver parâmetros
+    def _motor_rfc(self, caminho_excel, automacao_sap):
+        pasta = os.path.dirname(caminho_excel)
+        if pasta not in self._motores_rfc:
+            senha = keyring.get_password(automacao_sap.keyring_system, automacao_sap.user) if keyring else None
+            try:
+                motor = MotorRfc.da_pasta(pasta, automacao_sap.user, senha)
+            except Exception as e:
+                print(f"AVISO: Motor RFC indisponível ({e}); o fluxo segue pelo SAP GUI.")
+                return None
+            if motor is None:
+                print(f"AVISO: '{ARQUIVO_RFC}' não encontrado na pasta da planilha; o fluxo segue pelo SAP GUI.")
+                return None
+            self._motores_rfc[pasta] = motor
+        return self._motores_rfc[pasta]
+
+    # ----------------------- Várias contas ----------------------
+    def _processa_fragmentado(self, fluxo, caminho_excel, inicio):
+        # Executa o fluxo dividido entre as contas de 'sap_users.txt', cada uma com sua conexão SAP
+        # Os resultados de cada conta são gravados na planilha assim que ela termina
+        if self.chk_simulacao.isChecked():
+            QMessageBox.warning(self, "Erro", "A simulação vale para a execução com uma conta; desmarque 'Várias contas'.")
+            return
+        contas = carrega_contas(os.path.dirname(caminho_excel))
+        if not contas:
             QMessageBox.warning(
-                self,
-                "Erro",
-                "Não foi possível conectar ao SAP. Verifique as configurações ou se o SAP GUI está instalado."
+                self, "Erro",
+                f"Nenhum usuário encontrado em '{ARQUIVO_CONTAS}'. Informe um usuário SAP por linha, "
+                "na pasta da planilha, e cadastre a senha de cada um no botão 'Senha'."
             )
-            return None
+            return
+        execucao = ExecucaoFragmentada(
+            contas,
+            sap_environment=self._sap_environment,
+            sap_logon_path=self._sap_logon_path,
+            metricas=self._metricas,
+        )
+        self._aplica_opcoes(execucao)
+        execucao.ouvinte_linhas = self.painel_linhas.modelo.registra
+        execucao.vigia = self._novo_vigia(caminho_excel)
+        try:
+            print(f"Preparando dados para {fluxo} com {len(contas)} conta(s)...")
+            lista = execucao._nova_automacao(contas[0])._relatorio(caminho_excel)
+            self.painel_linhas.modelo.carrega(lista)
+            # Mantém a janela respondendo (log, tabela e o botão Cancelar) enquanto as contas trabalham
+            erros = self._em_segundo_plano(execucao, lambda: execucao.executa(fluxo, lista, caminho_excel),
+                                           caminho_excel)
+            for conta, erro in erros.items():
+                print(f"Conta '{conta}' falhou: {erro}")
+            print(f"Processo de {fluxo} com várias contas finalizado.")
+        except Exception as e:
+            QMessageBox.critical(self, f"Erro em {fluxo}", f"Falha no processamento:\n{e}")
+        finally:
+            print(f"Tempo total de execução ({fluxo}, várias contas): {datetime.now() - inicio}")
 
     # ----------------------- Fluxos ---------------------------
     def process_requisicao(self):
@@ -307,14 +660,21 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.plainTextEdit.clear()
         inicio = datetime.now()
 
-        automacao_sap = self._conectar_sap()
-        if not automacao_sap:
+        if self.chk_contas.isChecked():
+            self._processa_fragmentado("requisicao", caminho_excel, inicio)
             return
+
+        automacao_sap = self._nova_automacao_sap()
+        self._aplica_opcoes(automacao_sap)
         try:
+            if self.chk_lotes_requisicao.isChecked():
+                automacao_sap.tamanho_lote_requisicao = TAMANHO_LOTE_REQUISICAO
+                automacao_sap.sessoes_requisicao = SESSOES_REQUISICAO
             print("Preparando dados para a requisição...")
             lista = automacao_sap._relatorio(caminho_excel)
             print("Iniciando a automação da requisição...")
-            automacao_sap._requisicao(lista, caminho_excel)
+            if not self._executa_fluxo(automacao_sap, "requisicao", lista, caminho_excel):
+                return
             print("Processo de requisição finalizado.")
         except Exception as e:
             QMessageBox.critical(self, "Erro na requisição", f"Falha no processamento:\n{e}")
@@ -337,14 +697,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.plainTextEdit.clear()
         inicio = datetime.now()
 
-        automacao_sap = self._conectar_sap()
-        if not automacao_sap:
+        if self.chk_contas.isChecked():
+            self._processa_fragmentado("pedido", caminho_excel, inicio)
             return
+
+        automacao_sap = self._nova_automacao_sap()
+        self._aplica_opcoes(automacao_sap)
         try:
             print("Preparando dados para o pedido...")
             lista = automacao_sap._relatorio(caminho_excel)
             print("Iniciando a automação do pedido...")
-            automacao_sap._pedido(lista, caminho_excel)
+            if not self._executa_fluxo(automacao_sap, "pedido", lista, caminho_excel):
+                return
             print("Processo de pedido finalizado.")
         except Exception as e:
             QMessageBox.critical(self, "Erro no pedido", f"Falha no processamento:\n{e}")
@@ -367,20 +731,47 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.plainTextEdit.clear()
         inicio = datetime.now()
 
-        automacao_sap = self._conectar_sap()
-        if not automacao_sap:
+        if self.chk_contas.isChecked():
+            self._processa_fragmentado("frs", caminho_excel, inicio)
+            return
+
+        if self.chk_bdc.isChecked():
+            self._gera_bdc_frs(caminho_excel, inicio)
             return
+
+        automacao_sap = self._nova_automacao_sap()
+        self._aplica_opcoes(automacao_sap)
         try:
             print("Preparando dados para Registro de Serviço (FRS)...")
             lista = automacao_sap._relatorio(caminho_excel)
             print("Iniciando a automação do FRS...")
-            automacao_sap._frs(lista, caminho_excel)
+            if not self._executa_fluxo(automacao_sap, "frs", lista, caminho_excel):
+                return
             print("Processo de FRS finalizado.")
         except Exception as e:
             QMessageBox.critical(self, "Erro no FRS", f"Falha no processamento:\n{e}")
         finally:
             print(f"Tempo total de execução (FRS): {datetime.now() - inicio}")
 
+    def _gera_bdc_frs(self, caminho_excel, inicio):
+        # FRS em lote: monta o batch input a partir da planilha, sem sessão SAP (a pasta é processada na SM35)
+        automacao_sap = mm(
+            sap_user=self._sap_user,
+            sap_environment=self._sap_environment,
+            sap_logon_path=self._sap_logon_path,
+            metricas=self._metricas,
+        )
+        automacao_sap.incremental = self.chk_incremental.isChecked()
+        try:
+            print("Preparando dados para o batch input das FRS...")
+            lista = automacao_sap._relatorio(caminho_excel)
+            destino = automacao_sap._frs_bdc(lista, caminho_excel)
+            print(f"Processe o arquivo '{destino}' em uma pasta de batch input (SM35).")
+        except Exception as e:
+            QMessageBox.critical(self, "Erro no FRS", f"Falha na geração do batch input:\n{e}")
+        finally:
+            print(f"Tempo total de execução (FRS em lote): {datetime.now() - inicio}")
+
     def process_gd(self):
         # Fluxo da Gestão de Documentos (GD): lê dados e chama mm._gd()
         # O caminho do Excel é validado e o SAP é conectado antes de iniciar o GD
@@ -398,14 +789,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.plainTextEdit.clear()
         inicio = datetime.now()
 
-        automacao_sap = self._conectar_sap()
-        if not automacao_sap:
+        if self.chk_contas.isChecked():
+            self._processa_fragmentado("gd", caminho_excel, inicio)
             return
+
+        automacao_sap = self._nova_automacao_sap()
+        self._aplica_opcoes(automacao_sap)
         try:
             print("Preparando dados para Gestão de Documentos (GD)...")
             lista = automacao_sap._relatorio(caminho_excel)
             print("Iniciando a automação do GD...")
-            automacao_sap._gd(lista, caminho_excel)
+            if not self._executa_fluxo(automacao_sap, "gd", lista, caminho_excel):
+                return
             print("Processo de GD finalizado.")
         except Exception as e:
             QMessageBox.critical(self, "Erro no GD", f"Falha no processamento:\n{e}")
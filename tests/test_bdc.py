@@ -0,0 +1,44 @@
+# Arquivo de batch input das FRS (core/bdc.py) comparado com o de referência em tests/dados/frs.bdc.txt
+import json
+import os
+
+from core.bdc import ROTEIRO_ML81N, gera_bdc_frs
+
+DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados")
+
+
+def _linhas():
+    with open(os.path.join(DADOS, "frs_bdc_linhas.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _le(caminho):
+    with open(caminho, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_arquivo_igual_ao_de_referencia(tmp_path):
+    destino = str(tmp_path / "hospedagem.frs.bdc.txt")
+    geradas, recusadas = gera_bdc_frs(_linhas(), range(5), destino)
+
+    assert geradas == [0, 1, 4]
+    assert sorted(recusadas) == [2, 3]
+    assert _le(destino) == _le(os.path.join(DADOS, "frs.bdc.txt"))
+
+
+def test_linhas_recusadas_trazem_o_motivo(tmp_path):
+    _, recusadas = gera_bdc_frs(_linhas(), [2, 3], str(tmp_path / "x.bdc.txt"))
+
+    assert recusadas[2] == ["pedido inválido 'SEM PEDIDO'"]
+    assert recusadas[3] == ["BLDAT fora do formato dd.mm.aaaa ('2025-01-09')"]
+
+
+def test_uma_tela_por_passo_do_roteiro_em_cada_folha(tmp_path):
+    destino = str(tmp_path / "x.bdc.txt")
+    gera_bdc_frs(_linhas(), [0, 1], destino)
+    registros = [linha.split("\t") for linha in _le(destino).splitlines()[1:]]
+
+    for transacao, linha in (("1", "2"), ("2", "3")):
+        telas = [r for r in registros if r[0] == transacao and r[5] == "X"]
+        assert [(r[3], r[4]) for r in telas] == [(t["programa"], t["tela"]) for t in ROTEIRO_ML81N]
+        assert all(r[1] == linha and r[2] == "ML81N" for r in registros if r[0] == transacao)
@@ -0,0 +1,197 @@
+# Ida e volta da gravação direta (core/celulas_xlsx.py) em um pacote com as partes e o XML que o Excel grava
+import io
+import struct
+import zipfile
+
+import pytest
+from openpyxl import load_workbook
+
+from core.celulas_xlsx import grava_celulas
+
+_NS = ('xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+       'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+       'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" mc:Ignorable="x14ac xr xr2 xr3" '
+       'xmlns:x14ac="http://schemas.microsoft.com/office/spreadsheetml/2009/9/ac" '
+       'xmlns:xr="http://schemas.microsoft.com/office/spreadsheetml/2014/revision"')
+
+# Partes como o Excel as grava: strings compartilhadas, estilos, cadeia de cálculo, uma segunda aba,
+# "spans"/x14ac:dyDescent nas linhas e a miniatura sem compressão
+PARTES = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="jpeg" ContentType="image/jpeg"/>'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet2.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '<Override PartName="/xl/calcChain.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.calcChain+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/thumbnail" Target="docProps/thumbnail.jpeg"/>'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    "docProps/thumbnail.jpeg": b"\xff\xd8\xff\xe0" + bytes(range(256)) * 4 + b"\xff\xd9",
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        f'<workbook {_NS}><bookViews><workbookView xWindow="-120" yWindow="-120" windowWidth="29040" '
+        'windowHeight="15840" activeTab="0"/></bookViews><sheets>'
+        '<sheet name="Hospedagem" sheetId="1" r:id="rId1"/><sheet name="Apoio" sheetId="2" r:id="rId2"/>'
+        '</sheets><calcPr calcId="191029"/></workbook>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId6" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain" Target="calcChain.xml"/>'
+        '<Relationship Id="rId5" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+        '<Relationship Id="rId4" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet2.xml"/>'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+    "xl/worksheets/sheet1.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        f'<worksheet {_NS} xr:uid="{{00000000-0001-0000-0000-000000000000}}"><dimension ref="A1:C3"/>'
+        '<sheetViews><sheetView tabSelected="1" workbookViewId="0"/></sheetViews>'
+        '<sheetFormatPr defaultRowHeight="15" x14ac:dyDescent="0.25"/><sheetData>'
+        '<row r="1" spans="1:3" x14ac:dyDescent="0.25"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c>'
+        '<c r="C1" t="s"><v>2</v></c></row>'
+        '<row r="2" spans="1:3" x14ac:dyDescent="0.25"><c r="A2" s="1"><v>12345678000190</v></c>'
+        '<c r="B2" s="2"><v>150.5</v></c><c r="C2"><f>B2*2</f><v>301</v></c></row>'
+        '<row r="3" spans="1:3" x14ac:dyDescent="0.25"><c r="A3" s="1"><v>98765432000110</v></c>'
+        '<c r="B3" s="2"><v>80</v></c><c r="C3"><f>B3*2</f><v>160</v></c></row>'
+        '</sheetData><pageMargins left="0.511811024" right="0.511811024" top="0.78740157499999996" '
+        'bottom="0.78740157499999996" header="0.31496062000000002" footer="0.31496062000000002"/></worksheet>'),
+    "xl/worksheets/sheet2.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        f'<worksheet {_NS}><dimension ref="A1"/><sheetData>'
+        '<row r="1" spans="1:1" x14ac:dyDescent="0.25"><c r="A1" t="s"><v>3</v></c></row>'
+        '</sheetData></worksheet>'),
+    "xl/sharedStrings.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="4" uniqueCount="4">'
+        '<si><t>CNPJ_Fornecedor</t></si><si><t>Valor</t></si><si><t>Dobro</t></si><si><t>apoio</t></si></sst>'),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="00000000000000"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>'),
+    "xl/calcChain.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+        '<calcChain xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<c r="C2" i="1"/><c r="C3"/></calcChain>'),
+}
+
+
+# Grava o pacote; sequencial=True imita um gravador sem seek (descritor de dados após cada parte)
+def _gera_pacote(caminho, sequencial=False):
+    destino = io.BytesIO()
+    alvo = _SemSeek(destino) if sequencial else destino
+    with zipfile.ZipFile(alvo, "w") as pacote:
+        for nome, conteudo in PARTES.items():
+            compressao = zipfile.ZIP_STORED if nome.endswith(".jpeg") else zipfile.ZIP_DEFLATED
+            dados = conteudo if isinstance(conteudo, bytes) else conteudo.encode("utf-8")
+            pacote.writestr(zipfile.ZipInfo(nome, (2025, 1, 2, 3, 4, 6)), dados, compress_type=compressao)
+    with open(caminho, "wb") as f:
+        f.write(destino.getvalue())
+
+
+class _SemSeek(io.RawIOBase):
+    def __init__(self, destino):
+        self.destino = destino
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        return self.destino.write(dados)
+
+    def tell(self):
+        return self.destino.tell()
+
+    def seekable(self):
+        return False
+
+
+# Bytes comprimidos de uma parte, lidos direto do arquivo
+def _bruto(caminho, nome):
+    with zipfile.ZipFile(caminho) as pacote:
+        info = pacote.getinfo(nome)
+    with open(caminho, "rb") as f:
+        f.seek(info.header_offset)
+        cabecalho = f.read(30)
+        tamanho_nome, tamanho_extra = struct.unpack("<HH", cabecalho[26:30])
+        f.seek(tamanho_nome + tamanho_extra, 1)
+        return info.compress_type, info.CRC, f.read(info.compress_size)
+
+
+@pytest.fixture(params=[False, True], ids=["com_seek", "descritor_de_dados"])
+def planilha(tmp_path, request):
+    caminho = str(tmp_path / "hospedagem.xlsx")
+    _gera_pacote(caminho, sequencial=request.param)
+    return caminho
+
+
+def test_valores_gravados_sao_lidos_pelo_openpyxl(planilha):
+    grava_celulas(planilha, {2: {"AT": 4500012345, "AU": 10, "AS": "02/01/2025"}, 3: {"AT": "10012345"}})
+
+    ws = load_workbook(planilha).active
+    assert ws.title == "Hospedagem"
+    assert ws["AT2"].value == 4500012345
+    assert ws["AU2"].value == 10
+    assert ws["AS2"].value == "02/01/2025"
+    assert ws["AT3"].value == "10012345"
+    # Células existentes (texto compartilhado, estilo e fórmula) continuam como estavam
+    assert ws["A1"].value == "CNPJ_Fornecedor"
+    assert ws["A2"].number_format == "00000000000000"
+    assert ws["C2"].value == "=B2*2"
+    assert ws.max_column == 47
+
+
+def test_partes_nao_alteradas_sao_copiadas_sem_recompressao(planilha):
+    intactas = [nome for nome in PARTES if nome != "xl/worksheets/sheet1.xml"]
+    antes = {nome: _bruto(planilha, nome) for nome in intactas}
+
+    grava_celulas(planilha, {2: {"AT": 4500012345}})
+
+    for nome in intactas:
+        assert _bruto(planilha, nome) == antes[nome], nome
+    with zipfile.ZipFile(planilha) as pacote:
+        assert pacote.testzip() is None
+        assert [info.filename for info in pacote.infolist()] == list(PARTES)
+        assert pacote.getinfo("docProps/thumbnail.jpeg").compress_type == zipfile.ZIP_STORED
+        assert pacote.getinfo("xl/worksheets/sheet1.xml").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_formula_sobrescrita_remove_a_cadeia_de_calculo(planilha):
+    grava_celulas(planilha, {2: {"C": 7}})
+
+    with zipfile.ZipFile(planilha) as pacote:
+        nomes = pacote.namelist()
+        tipos = pacote.read("[Content_Types].xml").decode("utf-8")
+        relacoes = pacote.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    assert "xl/calcChain.xml" not in nomes
+    assert "calcChain" not in tipos and "calcChain" not in relacoes
+    ws = load_workbook(planilha).active
+    assert ws["C2"].value == 7
+    assert ws["C3"].value == "=B3*2"
+
+
+def test_gravacoes_sucessivas_acumulam(planilha):
+    for linha in range(2, 6):
+        grava_celulas(planilha, {linha: {"BB": f"FRS{linha}"}})
+
+    ws = load_workbook(planilha).active
+    assert [ws[f"BB{linha}"].value for linha in range(2, 6)] == ["FRS2", "FRS3", "FRS4", "FRS5"]
+    assert ws["A3"].value == 98765432000110
+    assert load_workbook(planilha)["Apoio"]["A1"].value == "apoio"
@@ -0,0 +1,75 @@
+# Reservas de linhas entre estações (core/coordenacao.py): chave de negócio, falhas e trava da planilha
+import sqlite3
+import time
+
+from core.coordenacao import Coordenador
+
+
+def _linha(nota, cnpj="12.345.678/0001-90"):
+    return [cnpj, "02.01.2025", "", "", "123", "JOAO", "01.01.2025", "02.01.2025", "SP",
+            "", str(nota), "1234567", "100,00", "", "HOTEL", "SAO PAULO", "", ""]
+
+
+def _coordenador(arquivo, dono="estacao-1", duracao=300):
+    return Coordenador(arquivo, dono, tamanho_lote=10, duracao=duracao)
+
+
+def test_linhas_inseridas_e_reordenadas_nao_herdam_o_estado_de_outras(tmp_path):
+    arquivo = str(tmp_path / "hospedagem.xlsx")
+    lista = [_linha(1), _linha(2), _linha(3)]
+    coordenador = _coordenador(arquivo)
+    assert list(coordenador.linhas("frs", lista, range(3))) == [0, 1, 2]
+    coordenador.conclui("frs", {2: {"BB": 100}, 3: {"BB": 101}})
+    coordenador.falha("frs", 2)
+    coordenador.fecha()
+
+    # Nova linha no topo: as notas 1 e 2 já foram concluídas, a 3 falhou na execução anterior
+    nova = [_linha(9), _linha(3), _linha(2), _linha(1)]
+    seguinte = _coordenador(arquivo)
+    assert sorted(seguinte.linhas("frs", nova, range(4))) == [0, 1]
+    seguinte.fecha()
+
+
+def test_falha_nao_volta_na_mesma_execucao(tmp_path):
+    arquivo = str(tmp_path / "hospedagem.xlsx")
+    lista = [_linha(1), _linha(2)]
+    coordenador = _coordenador(arquivo)
+    assert list(coordenador.linhas("pedido", lista, range(2))) == [0, 1]
+    coordenador.falha("pedido", 0)
+    coordenador.conclui("pedido", {3: {"AY": 1}})
+
+    assert list(coordenador.linhas("pedido", lista, range(2))) == []
+    assert coordenador.resumo("pedido") == {"concluida": 1, "falha": 1}
+    coordenador.fecha()
+
+
+def test_resultados_gravados_na_linha_atual_da_chave(tmp_path):
+    arquivo = str(tmp_path / "hospedagem.xlsx")
+    lista = [_linha(1), _linha(2)]
+    coordenador = _coordenador(arquivo)
+    list(coordenador.linhas("frs", lista, range(2)))
+    coordenador.conclui("frs", {2: {"BB": 100}, 3: {"BB": 101}})
+
+    class _Automacao:
+        gravado = None
+
+        def _grava_resultados(self, arquivo, resultados):
+            _Automacao.gravado = resultados
+
+    # Outra leitura da planilha, com as linhas invertidas, antes de gravar
+    list(coordenador.linhas("frs", [_linha(2), _linha(1)], range(2)))
+    assert coordenador.grava_planilha("frs", _Automacao(), arquivo) == 2
+    assert _Automacao.gravado == {2: {"BB": 101}, 3: {"BB": 100}}
+    coordenador.fecha()
+
+
+def test_trava_da_planilha_renovada_durante_a_gravacao(tmp_path):
+    arquivo = str(tmp_path / "hospedagem.xlsx")
+    coordenador = _coordenador(arquivo, duracao=0.3)
+    with coordenador.trava_planilha():
+        time.sleep(0.6)
+        bd = sqlite3.connect(coordenador.caminho)
+        expira = bd.execute("SELECT expira FROM travas WHERE nome = 'planilha'").fetchone()[0]
+        bd.close()
+        assert expira > time.time()
+    coordenador.fecha()
@@ -0,0 +1,44 @@
+# Índice da execução incremental (core/incremental.py): linhas identificadas pela nota fiscal + CNPJ
+from core.incremental import IndiceIncremental, chaves, impressoes
+
+
+def _linha(nota, cnpj="12.345.678/0001-90", valor="100,00"):
+    return [cnpj, "02.01.2025", "", "", "123", "JOAO", "01.01.2025", "02.01.2025", "SP",
+            "", str(nota), "1234567", valor, "", "HOTEL", "SAO PAULO", "", ""]
+
+
+def _conclui(indice, fluxo, lista, indices):
+    linhas = impressoes(lista)
+    for i in indices:
+        indice.conclui(fluxo, linhas[i])
+    indice.grava()
+
+
+def test_chave_por_nota_e_cnpj_com_repeticoes():
+    lista = [_linha("00123"), _linha(123, cnpj="12345678000190"), _linha(124), _linha(123, cnpj="99.999.999/0001-99")]
+    assert chaves(lista) == ["123|12345678000190", "123|12345678000190#2", "124|12345678000190",
+                             "123|99999999000199"]
+
+
+def test_linhas_inseridas_e_reordenadas_nao_trocam_de_identidade(tmp_path):
+    arquivo = str(tmp_path / "hospedagem.xlsx")
+    lista = [_linha(1), _linha(2), _linha(3)]
+    _conclui(IndiceIncremental(arquivo), "frs", lista, [0, 1, 2])
+
+    # Nova linha no topo e duas linhas trocadas de lugar
+    nova = [_linha(9), _linha(3), _linha(1), _linha(2)]
+    pendentes, alteradas = IndiceIncremental(arquivo).pendentes("frs", impressoes(nova), range(4))
+    assert (pendentes, alteradas) == ([0], [])
+
+
+def test_linha_alterada_depois_de_concluida_e_relatada(tmp_path):
+    arquivo = str(tmp_path / "hospedagem.xlsx")
+    lista = [_linha(1), _linha(2)]
+    _conclui(IndiceIncremental(arquivo), "pedido", lista, [0, 1])
+
+    lista[1] = _linha(2, valor="150,00")
+    # Colunas preenchidas pelos fluxos (ex.: PC) não contam como alteração
+    lista[0][13] = "4500000001"
+    indice = IndiceIncremental(arquivo)
+    assert indice.pendentes("pedido", impressoes(lista), range(2)) == ([], [1])
+    assert indice.pendentes("frs", impressoes(lista), range(2)) == ([0, 1], [])
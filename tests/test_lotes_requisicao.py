@@ -0,0 +1,72 @@
+# Requisições em lotes (core/lotes_requisicao.py) com a execução incremental: só as linhas novas vão aos lotes
+import pytest
+
+pytest.importorskip("pythoncom")  # pywin32: o mm conecta ao SAP GUI por COM
+
+from openpyxl import Workbook
+
+from core import servicos
+from core.incremental import IndiceIncremental, impressoes
+from core.lotes_requisicao import RequisicoesEmLotes
+from core.servicos import mm
+
+
+def _linha(nota, centro="1234567"):
+    return ["12.345.678/0001-90", "02.01.2025", "", "", "123", "JOAO", "01.01.2025", "02.01.2025", "SP",
+            "", str(nota), centro, "100,00", "", "HOTEL", "SAO PAULO", "", ""]
+
+
+# Lotes que não abrem sessões: guardam as linhas recebidas e gravam uma RC por linha, como o executa() real
+class _LotesGravados:
+    recebidas = None
+
+    def __init__(self, principal, tamanho, sessoes, agrupar_por):
+        self.principal = principal
+
+    def executa(self, lista, arquivo, indices):
+        _LotesGravados.recebidas = list(indices)
+        self.principal._grava_resultados(arquivo, {i + 2: {"AT": f"1000{i}", "AU": 1} for i in indices})
+        return []
+
+
+@pytest.fixture
+def planilha(tmp_path):
+    arquivo = str(tmp_path / "hospedagem.xlsx")
+    Workbook().save(arquivo)
+    return arquivo
+
+
+def _automacao():
+    automacao = mm(sap_user="TESTE", sap_environment="X", sap_logon_path="")
+    automacao.session = object()
+    automacao.incremental = True
+    automacao.tamanho_lote_requisicao = 2
+    return automacao
+
+
+def test_lotes_so_com_as_linhas_novas_e_indice_atualizado(planilha, monkeypatch):
+    monkeypatch.setattr(servicos, "RequisicoesEmLotes", _LotesGravados)
+    lista = [_linha(n) for n in range(1, 7)]
+    indice = IndiceIncremental(planilha)
+    linhas = impressoes(lista)
+    for i in (0, 1):
+        indice.conclui("requisicao", linhas[i])
+    indice.grava()
+
+    _automacao()._requisicao(lista, planilha)
+
+    assert _LotesGravados.recebidas == [2, 3, 4, 5]
+    pendentes, _ = IndiceIncremental(planilha).pendentes("requisicao", linhas, range(6))
+    assert pendentes == []
+
+
+def test_sessoes_dos_lotes_recebem_o_indice_incremental():
+    principal = _automacao()
+    principal.indice_incremental = object()
+    principal._impressoes = ([], [])
+
+    automacao = RequisicoesEmLotes(principal, tamanho=2)._nova_automacao()
+
+    assert automacao.incremental is True
+    assert automacao.indice_incremental is principal.indice_incremental
+    assert automacao._impressoes is principal._impressoes
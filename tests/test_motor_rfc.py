@@ -0,0 +1,235 @@
+# Motor RFC (core/motor_rfc.py) contra a ConexaoSimulada: mapeamento dos campos, commits em lotes e rollback
+from contextlib import contextmanager
+from decimal import Decimal
+
+from core.motor_rfc import ConexaoSimulada, MotorRfc, PoolRfc
+
+CNPJ = "12.345.678/0001-90"
+
+
+# Linha como as devolvidas por _relatorio (j[0] ... j[17])
+def _linha(nota, centro="1234567", valor="1.234,56", rc="10000123", reserva=""):
+    return [CNPJ, "02.01.2025", rc, "10", "JOAO DA SILVA", "OBRA X", "01.01.2025", "02.01.2025", "SP",
+            reserva, str(nota), centro, valor, "4500000999", "HOTEL CENTRAL LTDA", "SAO PAULO", "", ""]
+
+
+# O mínimo do mm que o motor usa: percorre todas as linhas e guarda o que seria gravado na planilha
+class _Automacao:
+    tamanho_lote_requisicao = None
+    agrupar_requisicao_por = "categoria"
+    coordenador = None
+
+    def __init__(self, conexao=None):
+        self.gravacoes = []
+        self.falhas = []
+        self.estados = {}
+        self._i = None
+        # Chamadas feitas ao SAP antes de cada linha ser entregue ao fluxo
+        self.conexao = conexao
+        self.chamadas_por_linha = {}
+
+    def _indices_do_fluxo(self, lista, fluxo, arquivo):
+        return range(len(lista))
+
+    def _percorre(self, lista, fluxo, arquivo, indices=None):
+        for i in (self._indices_do_fluxo(lista, fluxo, arquivo) if indices is None else indices):
+            self._i = i
+            if self.conexao is not None:
+                self.chamadas_por_linha[i] = len(self.conexao.chamadas)
+            yield i, lista[i]
+
+    @contextmanager
+    def _passo(self, passo, remoto=False):
+        yield
+
+    def _grava_resultados(self, arquivo, resultados):
+        self.gravacoes.append(dict(resultados))
+
+    def _marca_falha(self):
+        self.falhas.append(self._i)
+
+    def _notifica_linha(self, i, estado):
+        self.estados[i] = estado
+
+    def _sessao_medida(self):
+        return None
+
+    def _dados_mestres_invalidos(self, cache, fluxo, i, j):
+        if cache is None or not cache.problemas(fluxo, j):
+            return False
+        self._marca_falha()
+        return True
+
+
+# Cache de dados mestres que recusa os centros de custo e domicílios informados
+class _DadosMestres:
+    def __init__(self, *invalidos):
+        self.invalidos = set(invalidos)
+
+    def problemas(self, fluxo, j):
+        valor = j[11] if fluxo == "requisicao" else j[15]
+        return [f"'{valor}' inexistente"] if valor in self.invalidos else []
+
+
+def _motor(tamanho_commit=20, **simulada):
+    conexao = ConexaoSimulada(**simulada)
+    motor = MotorRfc(PoolRfc({}, tamanho=1, fabrica=lambda **_: conexao), centro="0001",
+                     tamanho_commit=tamanho_commit)
+    return motor, conexao
+
+
+def _funcoes(conexao):
+    return [funcao for funcao, _ in conexao.chamadas]
+
+
+def test_frs_mapeia_os_campos_da_planilha():
+    motor, conexao = _motor()
+    automacao = _Automacao()
+
+    motor.frs(automacao, [_linha(321)], "planilha.xlsx")
+
+    funcao, parametros = conexao.chamadas[0]
+    assert funcao == "BAPI_ENTRYSHEET_CREATE"
+    cabecalho = parametros["ENTRYSHEETHEADER"]
+    assert (cabecalho["PO_NUMBER"], cabecalho["EXT_NUMBER"], cabecalho["REF_DOC_NO"]) == ("4500000999", "321", "321")
+    assert (cabecalho["BEGDATE"], cabecalho["ENDDATE"], cabecalho["DOC_DATE"]) == ("20250101", "20250102", "20250102")
+    assert cabecalho["SHORT_TEXT"] == "PGTO HOTEL CENTRAL LTDA"
+    assert parametros["ENTRYSHEETSERVICES"][1]["GR_PRICE"] == Decimal("1234.56")
+    assert list(automacao.gravacoes[0]) == [2]
+    assert automacao.gravacoes[0][2]["BB"] == 1000000000
+
+
+def test_requisicao_uma_rc_por_categoria_com_itens_numerados():
+    motor, conexao = _motor()
+    automacao = _Automacao()
+    lista = [_linha(1), _linha(2, centro="A-0001-01-01"), _linha(3)]
+
+    motor.requisicao(automacao, lista, "planilha.xlsx")
+
+    criacoes = [p for f, p in conexao.chamadas if f == "BAPI_REQUISITION_CREATE"]
+    assert [[item["ACCTASSCAT"] for item in p["REQUISITION_ITEMS"]] for p in criacoes] == [["K", "K"], ["P"]]
+    assert criacoes[0]["REQUISITION_ACCOUNT_ASSIGNMENT"][1]["COST_CTR"] == "1234567"
+    assert criacoes[1]["REQUISITION_ACCOUNT_ASSIGNMENT"][0]["WBS_ELEM"] == "A-0001-01-01"
+    gravado = automacao.gravacoes[0]
+    assert {linha: (v["AT"], v["AU"]) for linha, v in gravado.items()} == {
+        2: (10000000, 10), 4: (10000000, 20), 3: (10000001, 10)}
+
+
+def test_pedido_usa_o_fornecedor_do_cnpj():
+    motor, conexao = _motor(fornecedores={"12345678000190": "100200"})
+    automacao = _Automacao()
+    lista = [_linha(1, reserva="5000000123"), [CNPJ.replace("9", "8")] + _linha(2)[1:]]
+
+    motor.pedido(automacao, lista, "planilha.xlsx")
+
+    pedidos = [p for f, p in conexao.chamadas if f == "BAPI_PO_CREATE1"]
+    assert len(pedidos) == 1
+    assert pedidos[0]["POHEADER"]["VENDOR"] == "100200"
+    assert pedidos[0]["POITEM"][0]["PREQ_ITEM"] == "00010"
+    assert pedidos[0]["POACCOUNT"][0]["EARMARKED_FUNDS"] == "5000000123"
+    assert automacao.falhas == [1]
+    assert [list(g) for g in automacao.gravacoes] == [[2]]
+    assert automacao.gravacoes[0][2]["AY"] == 4500000000
+
+
+def test_commit_a_cada_tamanho_commit_linhas():
+    motor, conexao = _motor(tamanho_commit=2)
+    automacao = _Automacao()
+
+    motor.frs(automacao, [_linha(n) for n in range(1, 6)], "planilha.xlsx")
+
+    assert _funcoes(conexao).count("BAPI_TRANSACTION_COMMIT") == 3
+    assert [sorted(g) for g in automacao.gravacoes] == [[2, 3], [4, 5], [6]]
+    assert len(conexao.confirmados) == 5
+
+
+def test_documento_recusado_desfaz_a_luw_e_recria_os_demais():
+    motor, conexao = _motor(tamanho_commit=3, falhas={"3"})
+    automacao = _Automacao()
+
+    motor.frs(automacao, [_linha(n) for n in range(1, 6)], "planilha.xlsx")
+
+    funcoes = _funcoes(conexao)
+    # Nenhum commit entre a BAPI recusada e o rollback
+    recusa = funcoes.index("BAPI_TRANSACTION_ROLLBACK") - 1
+    assert funcoes[recusa] == "BAPI_ENTRYSHEET_CREATE"
+    assert "BAPI_TRANSACTION_COMMIT" not in funcoes[:recusa]
+    # As duas folhas desfeitas são recriadas, cada uma com o seu commit, e o fluxo segue
+    assert funcoes[recusa + 1:recusa + 6] == ["BAPI_TRANSACTION_ROLLBACK",
+                                              "BAPI_ENTRYSHEET_CREATE", "BAPI_TRANSACTION_COMMIT",
+                                              "BAPI_ENTRYSHEET_CREATE", "BAPI_TRANSACTION_COMMIT"]
+    assert automacao.falhas == [2]
+    gravado = {linha: v["BB"] for g in automacao.gravacoes for linha, v in g.items()}
+    assert sorted(gravado) == [2, 3, 5, 6]
+    # Só os números confirmados vão para a planilha (os desfeitos pelo rollback, 1000000000 e 1000000001, não)
+    assert sorted(gravado.values()) == sorted(int(n) for _, n in conexao.confirmados)
+    assert not {1000000000, 1000000001} & set(gravado.values())
+
+
+def test_recriacao_recusada_marca_a_linha_como_falha():
+    motor, conexao = _motor(tamanho_commit=5)
+    automacao = _Automacao()
+    original = conexao.call
+
+    # A segunda folha passa na primeira vez e é recusada ao ser recriada depois do rollback
+    def call(funcao, **parametros):
+        if funcao == "BAPI_TRANSACTION_ROLLBACK":
+            conexao.falhas.add("2")
+        return original(funcao, **parametros)
+
+    conexao.call = call
+    conexao.falhas.add("3")
+    motor.frs(automacao, [_linha(n) for n in range(1, 5)], "planilha.xlsx")
+
+    gravado = {linha: v["BB"] for g in automacao.gravacoes for linha, v in g.items()}
+    assert sorted(gravado) == [2, 5]
+    assert automacao.estados == {1: "falha"}
+    assert automacao.falhas == [2]
+
+
+def test_requisicao_criada_ao_chegar_ao_lote_e_nao_depois_de_todas_as_linhas():
+    motor, conexao = _motor()
+    automacao = _Automacao(conexao)
+    automacao.tamanho_lote_requisicao = 2
+    lista = [_linha(n) for n in range(1, 6)]
+
+    motor.requisicao(automacao, lista, "planilha.xlsx")
+
+    # Lotes [0, 1], [2, 3] e [4]: cada RC é criada na primeira linha do seu lote
+    assert automacao.chamadas_por_linha == {0: 0, 1: 1, 2: 1, 3: 2, 4: 2}
+
+
+def test_requisicao_recusada_marca_todas_as_linhas_do_lote():
+    motor, conexao = _motor(falhas={"2"})
+    automacao = _Automacao()
+    automacao.tamanho_lote_requisicao = 2
+    lista = [_linha(n) for n in range(1, 6)]
+
+    motor.requisicao(automacao, lista, "planilha.xlsx")
+
+    assert automacao.falhas == [0, 1]
+    gravado = {linha: v["AT"] for g in automacao.gravacoes for linha, v in g.items()}
+    assert sorted(gravado) == [4, 5, 6]
+
+
+def test_dados_mestres_invalidos_nao_chegam_as_bapis():
+    motor, conexao = _motor()
+    automacao = _Automacao()
+    lista = [_linha(1), _linha(2, centro="7654321"), _linha(3)]
+
+    motor.executa(automacao, "requisicao", lista, "planilha.xlsx", _DadosMestres("7654321"))
+
+    criacoes = [p for f, p in conexao.chamadas if f == "BAPI_REQUISITION_CREATE"]
+    assert [[a["COST_CTR"] for a in p["REQUISITION_ACCOUNT_ASSIGNMENT"]] for p in criacoes] == [["1234567", "1234567"]]
+    assert automacao.falhas == [1]
+    assert sorted(automacao.gravacoes[0]) == [2, 4]
+
+    motor, conexao = _motor()
+    automacao = _Automacao()
+    lista = [_linha(1), _linha(2)]
+    lista[0][15] = "CIDADE INEXISTENTE"
+
+    motor.executa(automacao, "frs", lista, "planilha.xlsx", _DadosMestres("CIDADE INEXISTENTE"))
+
+    assert [p["ENTRYSHEETHEADER"]["EXT_NUMBER"] for f, p in conexao.chamadas if f == "BAPI_ENTRYSHEET_CREATE"] == ["2"]
+    assert automacao.falhas == [0]
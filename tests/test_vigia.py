@@ -0,0 +1,116 @@
+# Qual regra de popups o vigia (core/vigia.py) aplica a cada foto da tela, e o que acontece depois dela
+import json
+
+import pytest
+
+pytest.importorskip("pythoncom")  # pywin32: o vigia roda só no Windows, com o SAP GUI
+
+from core import vigia
+from core.vigia import REGRAS_PADRAO, LinhaAbortada, Vigia, carrega_regras, regra_para
+
+
+def _foto(*popups, sbar_texto="", sbar_tipo=""):
+    janelas = [{"id": "wnd[0]", "titulo": "Criar folha de registro de serviços", "textos": []}]
+    for k, (titulo, textos) in enumerate(popups, start=1):
+        janelas.append({"id": f"wnd[{k}]", "titulo": titulo, "textos": list(textos)})
+    return {"janelas": janelas, "sbar": {"texto": sbar_texto, "tipo": sbar_tipo}}
+
+
+@pytest.mark.parametrize("foto, nome, janela", [
+    (_foto(("Informação", ["Orçamento excedido em 10%"])), "aviso de orçamento", "wnd[1]"),
+    (_foto(("Budget", ["Budget exceeded for WBS element"])), "aviso de orçamento", "wnd[1]"),
+    (_foto(("Nota fiscal", ["A nota fiscal 123 já foi registrada"])), "nota fiscal duplicada", "wnd[1]"),
+    (_foto(("Aviso", ["Documento duplicado"])), "nota fiscal duplicada", "wnd[1]"),
+    (_foto(sbar_texto="Data de lançamento no futuro", sbar_tipo="W"), "aviso na barra de status", "wnd[0]"),
+    # Popups empilhados: vale o do topo
+    (_foto(("Nota fiscal", ["já registrada"]), ("Informação", ["orçamento"])), "aviso de orçamento", "wnd[2]"),
+])
+def test_regra_padrao_por_foto(foto, nome, janela):
+    regra, alvo = regra_para(REGRAS_PADRAO, foto)
+    assert regra["nome"] == nome
+    assert alvo == janela
+
+
+@pytest.mark.parametrize("foto", [
+    _foto(),
+    _foto(sbar_texto="Documento 4500012345 gravado", sbar_tipo="S"),
+    _foto(sbar_texto="Centro de custo inexistente", sbar_tipo="E"),
+    _foto(("Gravar documento", ["Deseja gravar?"])),
+    # Com um popup aberto, o aviso da barra de status não é respondido: o popup é que trava o passo
+    _foto(("Gravar documento", ["Deseja gravar?"]), sbar_texto="Verificar entradas", sbar_tipo="W"),
+])
+def test_sem_regra_padrao(foto):
+    assert regra_para(REGRAS_PADRAO, foto) == (None, None)
+
+
+def test_regras_padrao_cancelam_e_abortam_a_linha():
+    assert all(regra["acao"] == "cancelar" and regra["abortar"] for regra in REGRAS_PADRAO)
+
+
+def test_popups_json_confirma_por_escolha_do_operador(tmp_path):
+    extras = [{"nome": "orçamento confirmado", "texto": "or[cç]amento", "acao": "enter"},
+              {"nome": "confirmar gravação", "janela": "^Gravar", "acao": "sim"}]
+    (tmp_path / "popups.json").write_text(json.dumps(extras), encoding="utf-8")
+    regras = carrega_regras(str(tmp_path))
+
+    regra, _ = regra_para(regras, _foto(("Informação", ["Orçamento excedido"])))
+    assert (regra["nome"], regra["acao"], regra.get("abortar")) == ("orçamento confirmado", "enter", None)
+    regra, janela = regra_para(regras, _foto(("Gravar documento", ["Deseja gravar?"])))
+    assert (regra["nome"], janela) == ("confirmar gravação", "wnd[1]")
+    # O que o arquivo não cobre continua com as regras padrão
+    regra, _ = regra_para(regras, _foto(("Nota fiscal", ["já registrada"])))
+    assert regra["nome"] == "nota fiscal duplicada"
+
+
+def test_popups_json_ilegivel_usa_as_padrao(tmp_path):
+    (tmp_path / "popups.json").write_text("[{", encoding="utf-8")
+    assert carrega_regras(str(tmp_path)) == REGRAS_PADRAO
+
+
+class _Elemento:
+    def __init__(self, acoes, id_elemento):
+        self.acoes, self.id = acoes, id_elemento
+        self.MessageType = "W"
+
+    def sendVKey(self, tecla):
+        self.acoes.append((self.id, tecla))
+
+    def press(self):
+        self.acoes.append((self.id, "press"))
+
+
+class _Sessao:
+    def __init__(self, janelas):
+        self.acoes = []
+        self.Children = type("Filhos", (), {"Count": janelas})()
+
+    def findById(self, id_elemento):
+        return _Elemento(self.acoes, id_elemento)
+
+
+def _vigia_com_foto(monkeypatch, foto, regras=None):
+    monkeypatch.setattr(vigia, "instantaneo", lambda session: foto)
+    v = Vigia(regras)
+    v._session = _Sessao(len(foto["janelas"]))
+    v.inicia_linha(5)
+    return v
+
+
+def test_falha_com_popup_padrao_cancela_e_aborta_a_linha(monkeypatch):
+    v = _vigia_com_foto(monkeypatch, _foto(("Nota fiscal", ["A nota fiscal já foi registrada"])))
+
+    with pytest.raises(LinhaAbortada):
+        v.trata_falha()
+    assert v._session.acoes == [("wnd[1]", 12)]
+    # As chamadas seguintes da mesma linha também falham, sem tocar no SAP
+    with pytest.raises(LinhaAbortada):
+        v.inicia_passo("press", "wnd[0]/tbar[0]/btn[11]")
+
+
+def test_falha_com_regra_do_operador_confirma_e_repete(monkeypatch):
+    regras = [{"nome": "orçamento", "texto": "or[cç]amento", "acao": "enter"}] + REGRAS_PADRAO
+    v = _vigia_com_foto(monkeypatch, _foto(("Informação", ["Orçamento excedido"])), regras)
+
+    assert v.trata_falha() is True
+    assert v._session.acoes == [("wnd[1]", 0)]
+    v.inicia_passo("press", "wnd[0]/tbar[0]/btn[11]")
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# Painel de desempenho do fluxo em andamento: vazão, previsão de término, histograma da latência das linhas,
+# passos mais lentos e divisão do tempo entre SAP, planilha e esperas, tudo a partir de amostras das métricas
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from PySide2.QtCore import Qt, QTimer, QRectF
+from PySide2.QtGui import QColor, QPainter, QPen
+from PySide2.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QGroupBox, QLabel
+
+from mm.metricas import LIMITES_SEGUNDOS
+
+# Intervalo (ms) entre duas leituras das métricas e janela (s) usada nas taxas e no histograma
+INTERVALO_AMOSTRA_MS = 1000
+JANELA_SEGUNDOS = 60
+# Pontos do gráfico de vazão (um por leitura: 5 minutos) e passos exibidos no ranking
+PONTOS_VAZAO = 300
+PASSOS_EXIBIDOS = 5
+
+# Partes da divisão do tempo das linhas, na ordem da barra
+PARTES_TEMPO = (("sap", "SAP", QColor(66, 133, 244)),
+                ("excel", "Planilha", QColor(52, 168, 83)),
+                ("esperas", "Esperas e programa", QColor(251, 188, 5)))
+
+
+# Leituras periódicas das métricas e os indicadores calculados sobre a janela mais recente
+class AmostrasDesempenho:
+    """
+    Cada leitura guarda apenas os totais acumulados (linhas, fila, baldes da latência, tempo por
+    origem e por passo); os indicadores são a diferença entre a leitura mais recente e a mais
+    antiga da janela. Assim o fluxo não faz nada a mais por linha: o custo é uma leitura das
+    métricas por intervalo, na thread da interface.
+
+    Args:
+        metricas: o registro de métricas compartilhado pelos fluxos.
+        janela: segundos considerados na vazão, no histograma e nos passos.
+    """
+
+    def __init__(self, metricas, janela=JANELA_SEGUNDOS):
+        self.metricas = metricas
+        self.janela = janela
+        self._leituras = deque()
+
+    def _le(self, agora):
+        m = self.metricas
+        latencia = m.agregado("linha_segundos").get(None)
+        return {
+            "momento": agora,
+            "linhas": sum(m.agregado("linhas_total").values()),
+            "fila": sum(m.agregado("fila_linhas").values()),
+            "latencia": latencia or {"baldes": [0] * len(LIMITES_SEGUNDOS), "contagem": 0, "soma": 0.0},
+            "origens": m.agregado("tempo_segundos_total", por="origem"),
+            "passos": {passo: (h["contagem"], h["soma"])
+                       for passo, h in m.agregado("passo_segundos", por="passo").items()},
+        }
+
+    def coleta(self, agora=None):
+        """
+        Returns:
+            dict com "vazao" (linhas/min), "fila", "termino" (datetime ou None), "histograma"
+            (quantidade por faixa de LIMITES_SEGUNDOS, mais a faixa acima do último limite),
+            "passos" (lista de (passo, média em s, ocorrências), do mais lento) e "divisao"
+            ({parte: segundos} de PARTES_TEMPO). None na primeira leitura.
+        """
+        agora = time.monotonic() if agora is None else agora
+        atual = self._le(agora)
+        self._leituras.append(atual)
+        # Mantém a leitura mais antiga que ainda cobre a janela inteira
+        while len(self._leituras) > 2 and self._leituras[1]["momento"] <= agora - self.janela:
+            self._leituras.popleft()
+        base = self._leituras[0]
+        segundos = atual["momento"] - base["momento"]
+        if segundos <= 0:
+            return None
+
+        linhas = atual["linhas"] - base["linhas"]
+        por_segundo = linhas / segundos
+        termino = None
+        if por_segundo > 0 and atual["fila"] > 0:
+            termino = datetime.now() + timedelta(seconds=atual["fila"] / por_segundo)
+
+        # Baldes cumulativos -> quantidade por faixa
+        acumulados = [a - b for a, b in zip(atual["latencia"]["baldes"], base["latencia"]["baldes"])]
+        total = atual["latencia"]["contagem"] - base["latencia"]["contagem"]
+        histograma = [c - (acumulados[k - 1] if k else 0) for k, c in enumerate(acumulados)]
+        histograma.append(total - (acumulados[-1] if acumulados else 0))
+
+        passos = []
+        for passo, (contagem, soma) in atual["passos"].items():
+            contagem_base, soma_base = base["passos"].get(passo, (0, 0.0))
+            if passo != "linha" and contagem > contagem_base:
+                passos.append((passo, (soma - soma_base) / (contagem - contagem_base), contagem - contagem_base))
+        passos.sort(key=lambda p: p[1], reverse=True)
+
+        def _origem(nome):
+            return atual["origens"].get(nome, 0.0) - base["origens"].get(nome, 0.0)
+
+        tempo_linhas = atual["latencia"]["soma"] - base["latencia"]["soma"]
+        divisao = {"sap": _origem("sap"), "excel": _origem("excel")}
+        divisao["esperas"] = max(0.0, tempo_linhas - divisao["sap"] - divisao["excel"])
+
+        return {"vazao": por_segundo * 60, "fila": atual["fila"], "termino": termino, "histograma": histograma,
+                "passos": passos[:PASSOS_EXIBIDOS], "divisao": divisao}
+
+
+# Linha da vazão (linhas/min) nas últimas leituras
+class GraficoVazao(QWidget):
+    def __init__(self, parent=None):
+        super(GraficoVazao, self).__init__(parent)
+        self.valores = deque(maxlen=PONTOS_VAZAO)
+        self.setMinimumSize(160, 60)
+
+    def acrescenta(self, valor):
+        self.valores.append(valor)
+        self.update()
+
+    def paintEvent(self, evento):
+        pintor = QPainter(self)
+        pintor.setRenderHint(QPainter.Antialiasing)
+        pintor.fillRect(self.rect(), self.palette().base())
+        if len(self.valores) < 2:
+            return
+        maximo = max(self.valores) or 1.0
+        largura, altura = self.width() - 1, self.height() - 1
+        passo = largura / (self.valores.maxlen - 1)
+        inicio = largura - passo * (len(self.valores) - 1)
+        pintor.setPen(QPen(QColor(66, 133, 244), 1.5))
+        anterior = None
+        for k, valor in enumerate(self.valores):
+            ponto = (inicio + k * passo, altura - valor / maximo * (altura - 4))
+            if anterior is not None:
+                pintor.drawLine(int(anterior[0]), int(anterior[1]), int(ponto[0]), int(ponto[1]))
+            anterior = ponto
+        pintor.setPen(self.palette().text().color())
+        pintor.drawText(4, 12, f"máx. {maximo:.1f}/min")
+
+
+# Barras da latência por linha, uma por faixa de LIMITES_SEGUNDOS
+class GraficoHistograma(QWidget):
+    def __init__(self, parent=None):
+        super(GraficoHistograma, self).__init__(parent)
+        self.quantidades = []
+        self.setMinimumSize(200, 60)
+        rotulos = [f"≤{limite:g}s" for limite in LIMITES_SEGUNDOS] + [f">{LIMITES_SEGUNDOS[-1]:g}s"]
+        self.setToolTip("Latência das linhas no último minuto: " + ", ".join(rotulos))
+        self._rotulos = rotulos
+
+    def define(self, quantidades):
+        self.quantidades = quantidades
+        self.update()
+
+    def paintEvent(self, evento):
+        pintor = QPainter(self)
+        pintor.fillRect(self.rect(), self.palette().base())
+        if not self.quantidades:
+            return
+        maximo = max(self.quantidades) or 1
+        largura = self.width() / len(self.quantidades)
+        altura = self.height() - 14
+        for k, quantidade in enumerate(self.quantidades):
+            barra = quantidade / maximo * (altura - 2)
+            pintor.fillRect(QRectF(k * largura + 1, altura - barra, largura - 2, barra), QColor(66, 133, 244))
+        pintor.setPen(self.palette().text().color())
+        # Rótulos só da primeira, do meio e da última faixa, para caberem
+        for k in (0, len(self.quantidades) // 2, len(self.quantidades) - 1):
+            pintor.drawText(QRectF(k * largura, altura, largura * 2, 14), Qt.AlignLeft, self._rotulos[k])
+
+
+# Barra empilhada com a divisão do tempo das linhas
+class BarraDivisao(QWidget):
+    def __init__(self, parent=None):
+        super(BarraDivisao, self).__init__(parent)
+        self.segundos = {}
+        self.setMinimumSize(160, 18)
+
+    def define(self, segundos):
+        self.segundos = segundos
+        self.update()
+
+    def paintEvent(self, evento):
+        pintor = QPainter(self)
+        pintor.fillRect(self.rect(), self.palette().base())
+        total = sum(self.segundos.values())
+        if total <= 0:
+            return
+        x = 0.0
+        for parte, _, cor in PARTES_TEMPO:
+            largura = self.width() * self.segundos.get(parte, 0.0) / total
+            pintor.fillRect(QRectF(x, 0, largura, self.height()), cor)
+            x += largura
+
+
+# Painel com os quatro quadros, atualizado por um temporizador enquanto estiver visível
+class PainelDesempenho(QWidget):
+    def __init__(self, metricas, parent=None):
+        super(PainelDesempenho, self).__init__(parent)
+        self.amostras = AmostrasDesempenho(metricas)
+
+        self.lbl_vazao = QLabel("— linhas/min", self)
+        self.lbl_termino = QLabel("Término: —", self)
+        self.grafico_vazao = GraficoVazao(self)
+        self.grafico_latencia = GraficoHistograma(self)
+        self.barra_divisao = BarraDivisao(self)
+        self.lbl_divisao = QLabel("", self)
+        self.lbl_passos = QLabel("", self)
+        self.lbl_passos.setTextFormat(Qt.PlainText)
+        self.lbl_passos.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self._quadro("Vazão", self.lbl_vazao, self.lbl_termino, self.grafico_vazao), 2)
+        layout.addWidget(self._quadro("Latência por linha (último minuto)", self.grafico_latencia), 2)
+        layout.addWidget(self._quadro("Tempo das linhas", self.barra_divisao, self.lbl_divisao), 2)
+        layout.addWidget(self._quadro("Passos mais lentos", self.lbl_passos), 2)
+        self.setMaximumHeight(140)
+
+        self._temporizador = QTimer(self)
+        self._temporizador.timeout.connect(self.atualiza)
+        self._temporizador.start(INTERVALO_AMOSTRA_MS)
+
+    def _quadro(self, titulo, *widgets):
+        quadro = QGroupBox(titulo, self)
+        layout = QVBoxLayout(quadro)
+        layout.setContentsMargins(6, 4, 6, 4)
+        for widget in widgets:
+            layout.addWidget(widget)
+        return quadro
+
+    # Lê as métricas e redesenha (chamado pelo temporizador, enquanto o fluxo roda na sua própria thread)
+    def atualiza(self):
+        if not self.isVisible():
+            return
+        dados = self.amostras.coleta()
+        if dados is None:
+            return
+        self.lbl_vazao.setText(f"{dados['vazao']:.1f} linhas/min · {dados['fila']:.0f} na fila")
+        self.lbl_termino.setText(f"Término: {dados['termino']:%H:%M:%S}" if dados["termino"] else "Término: —")
+        self.grafico_vazao.acrescenta(dados["vazao"])
+        # Sem linhas concluídas na janela, os demais quadros mantêm a última leitura
+        if not sum(dados["histograma"]):
+            return
+        self.grafico_latencia.define(dados["histograma"])
+        self.barra_divisao.define(dados["divisao"])
+        total = sum(dados["divisao"].values()) or 1.0
+        self.lbl_divisao.setText("  ".join(f"{rotulo} {dados['divisao'][parte] / total:.0%}"
+                                           for parte, rotulo, _ in PARTES_TEMPO))
+        self.lbl_passos.setText("\n".join(f"{passo}: {media:.2f}s ({ocorrencias}x)"
+                                          for passo, media, ocorrencias in dados["passos"]))
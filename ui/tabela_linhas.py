@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Tabela da situação de cada linha da planilha: modelo preguiçoso sobre a lista do _relatorio,
+# atualizações de estado em lote e ordenação/filtro por um proxy (sem copiar os dados)
+import threading
+
+from PySide2.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PySide2.QtGui import QColor
+from PySide2.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLineEdit, QTableView, QHeaderView, QAbstractItemView
+)
+
+# Estados de uma linha, na ordem em que aparecem no filtro
+ESTADOS = ("pendente", "em andamento", "concluída", "falha")
+CORES = {
+    "em andamento": QColor(255, 243, 205),
+    "concluída": QColor(212, 237, 218),
+    "falha": QColor(248, 215, 218),
+}
+
+# Colunas do relatório exibidas na tabela (índice em cada linha da lista e título)
+COLUNAS_EXIBIDAS = ((10, "Nota fiscal"), (0, "CNPJ"), (14, "Fornecedor"), (5, "Passageiro"),
+                    (11, "Centro de Custo"), (12, "Líquido"), (13, "PC"))
+
+
+# Modelo de tabela que lê as células da lista sob demanda: a view só pede as linhas visíveis
+class ModeloLinhas(QAbstractTableModel):
+    """
+    Os estados chegam por registra(), de qualquer thread, e ficam pendentes até aplica_pendentes(),
+    que os grava de uma vez e avisa a view com um dataChanged por trecho contínuo de linhas alteradas.
+    """
+
+    def __init__(self, parent=None):
+        super(ModeloLinhas, self).__init__(parent)
+        self._lista = []
+        self._estados = []
+        self._pendentes = {}
+        self._busca = []
+        self._trava = threading.Lock()
+
+    # Passa a exibir a lista (a mesma usada pelo fluxo, sem cópia), com todas as linhas pendentes
+    def carrega(self, lista):
+        self.beginResetModel()
+        self._lista = lista
+        self._estados = ["pendente"] * len(lista)
+        self._busca = [None] * len(lista)
+        with self._trava:
+            self._pendentes = {}
+        self.endResetModel()
+
+    # ----------------------- Atualizações de estado -----------------------
+    # Registra o estado da linha i (índice da lista); pode ser chamado pela thread do fluxo
+    def registra(self, i, estado):
+        with self._trava:
+            self._pendentes[i] = estado
+
+    # Grava os estados pendentes e avisa a view (chamado pelo temporizador da janela)
+    def aplica_pendentes(self):
+        with self._trava:
+            pendentes, self._pendentes = self._pendentes, {}
+        pendentes = {i: e for i, e in pendentes.items() if 0 <= i < len(self._estados)}
+        if not pendentes:
+            return
+        for i, estado in pendentes.items():
+            self._estados[i] = estado
+        # Um aviso por trecho contínuo: linhas distantes não fazem a view redesenhar tudo o que há entre elas
+        linhas = sorted(pendentes)
+        inicio = anterior = linhas[0]
+        for i in linhas[1:] + [None]:
+            if i is not None and i == anterior + 1:
+                anterior = i
+                continue
+            self.dataChanged.emit(self.index(inicio, 1), self.index(anterior, 1),
+                                  [Qt.DisplayRole, Qt.BackgroundRole, Qt.UserRole])
+            inicio = anterior = i
+
+    def contagem(self):
+        """
+        Returns:
+            dict {estado: quantidade de linhas}.
+        """
+        resultado = dict.fromkeys(ESTADOS, 0)
+        for estado in self._estados:
+            resultado[estado] = resultado.get(estado, 0) + 1
+        return resultado
+
+    def estado(self, linha):
+        return self._estados[linha]
+
+    # Texto da linha em minúsculas (número e colunas exibidas) para o filtro, montado na primeira
+    # consulta e reaproveitado nas seguintes: as colunas da lista não mudam durante o fluxo
+    def texto_busca(self, linha):
+        if self._busca[linha] is None:
+            valores = [self.data(self.index(linha, coluna), Qt.DisplayRole)
+                       for coluna in range(2, self.columnCount())]
+            self._busca[linha] = "\t".join([str(linha + 2)] + valores).lower()
+        return self._busca[linha]
+
+    # ----------------------- QAbstractTableModel -----------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lista)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2 + len(COLUNAS_EXIBIDAS)
+
+    def headerData(self, secao, orientacao, papel=Qt.DisplayRole):
+        if papel != Qt.DisplayRole:
+            return None
+        if orientacao == Qt.Vertical:
+            return None
+        if secao == 0:
+            return "Linha"
+        if secao == 1:
+            return "Situação"
+        return COLUNAS_EXIBIDAS[secao - 2][1]
+
+    def data(self, indice, papel=Qt.DisplayRole):
+        if not indice.isValid():
+            return None
+        linha, coluna = indice.row(), indice.column()
+        if papel == Qt.BackgroundRole:
+            return CORES.get(self._estados[linha])
+        if papel not in (Qt.DisplayRole, Qt.UserRole):
+            return None
+        if coluna == 0:
+            # Número da linha na planilha (o cabeçalho é a linha 1); numérico para ordenar
+            return linha + 2 if papel == Qt.UserRole else str(linha + 2)
+        if coluna == 1:
+            estado = self._estados[linha]
+            return ESTADOS.index(estado) if papel == Qt.UserRole and estado in ESTADOS else estado
+        valor = self._lista[linha][COLUNAS_EXIBIDAS[coluna - 2][0]]
+        return "" if valor is None or valor != valor else str(valor)  # valor != valor: NaN do pandas
+
+
+# Ordenação e filtro sobre o modelo: o proxy guarda apenas o mapeamento de índices
+class FiltroLinhas(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super(FiltroLinhas, self).__init__(parent)
+        self._estado = None
+        self._texto = ""
+        self.setSortRole(Qt.UserRole)
+        self.setDynamicSortFilter(True)
+
+    def define_estado(self, estado):
+        self._estado = estado or None
+        self.invalidateFilter()
+
+    def define_texto(self, texto):
+        self._texto = (texto or "").strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, linha, pai):
+        modelo = self.sourceModel()
+        if self._estado is not None and modelo.estado(linha) != self._estado:
+            return False
+        if not self._texto:
+            return True
+        return self._texto in modelo.texto_busca(linha) or self._texto in modelo.estado(linha)
+
+
+# Painel com os filtros (situação e texto) e a tabela
+class PainelLinhas(QWidget):
+    def __init__(self, parent=None):
+        super(PainelLinhas, self).__init__(parent)
+        self.modelo = ModeloLinhas(self)
+        self.filtro = FiltroLinhas(self)
+        self.filtro.setSourceModel(self.modelo)
+
+        self.cmb_estado = QComboBox(self)
+        self.cmb_estado.addItem("Todas", "")
+        for estado in ESTADOS:
+            self.cmb_estado.addItem(estado.capitalize(), estado)
+        self.cmb_estado.currentIndexChanged.connect(
+            lambda _: self.filtro.define_estado(self.cmb_estado.currentData()))
+        self.txt_filtro = QLineEdit(self)
+        self.txt_filtro.setPlaceholderText("Filtrar (NF, CNPJ, passageiro...)")
+        self.txt_filtro.textChanged.connect(self.filtro.define_texto)
+
+        self.tabela = QTableView(self)
+        self.tabela.setModel(self.filtro)
+        self.tabela.setSortingEnabled(True)
+        self.tabela.sortByColumn(0, Qt.AscendingOrder)
+        self.tabela.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabela.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabela.setWordWrap(False)
+        # Altura fixa das linhas: a view calcula a rolagem sem medir cada linha (essencial com dezenas de milhares)
+        self.tabela.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tabela.verticalHeader().setDefaultSectionSize(20)
+        self.tabela.verticalHeader().hide()
+        self.tabela.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.tabela.horizontalHeader().setStretchLastSection(True)
+
+        filtros = QHBoxLayout()
+        filtros.addWidget(self.cmb_estado)
+        filtros.addWidget(self.txt_filtro)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filtros)
+        layout.addWidget(self.tabela)